@@ -0,0 +1,122 @@
+"""Shared helpers for the benchmark scripts: timing summaries, resource usage and JSON results"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+def latency_summary(samples_s):
+    """p50/p99/p999/max of latency samples given in seconds, reported in microseconds"""
+    samples = np.asarray(samples_s, dtype=np.float64) * 1e6
+    if len(samples) == 0:
+        return {'count': 0}
+    p50, p99, p999 = np.percentile(samples, [50, 99, 99.9])
+    return {
+        'count': int(len(samples)),
+        'mean_us': round(float(samples.mean()), 2),
+        'p50_us': round(float(p50), 2),
+        'p99_us': round(float(p99), 2),
+        'p999_us': round(float(p999), 2),
+        'max_us': round(float(samples.max()), 2)
+    }
+
+class ResourceMeter:
+    """Wall time, CPU time and peak RSS over a measured section"""
+
+    def __enter__(self):
+        self.wall_start = time.perf_counter()
+        self.usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        return self
+
+    def __exit__(self, *exc_info):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.wall_s = time.perf_counter() - self.wall_start
+        self.cpu_s = ((usage.ru_utime - self.usage_start.ru_utime)
+                      + (usage.ru_stime - self.usage_start.ru_stime))
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        self.peak_rss_mb = usage.ru_maxrss * scale / (1024 * 1024)
+        return False
+
+    def as_dict(self):
+        return {
+            'wall_s': round(self.wall_s, 4),
+            'cpu_s': round(self.cpu_s, 4),
+            'cpu_utilization': round(self.cpu_s / self.wall_s, 3) if self.wall_s else 0.0,
+            'peak_rss_mb': round(self.peak_rss_mb, 1)
+        }
+
+def environment():
+    """Details needed to compare results across machines and releases"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def write_results(results, filepath):
+    """Write benchmark results as JSON"""
+    with open(filepath, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {filepath}")
+
+def _flatten(data, prefix=''):
+    """Flatten nested result dicts to dotted keys"""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare_results(current, baseline_path, higher_is_better=(), threshold=0.10,
+                    ignore=('count', 'utilization')):
+    """Compare numeric results with a baseline file; returns (rows, regressions)
+
+    Metrics named in higher_is_better regress when they drop, every other
+    latency/time/memory metric regresses when it grows by more than threshold.
+    """
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    current_flat = _flatten(current.get('results', current))
+    baseline_flat = _flatten(baseline.get('results', baseline))
+    rows, regressions = [], []
+    for key, value in current_flat.items():
+        old = baseline_flat.get(key)
+        if old in (None, 0) or key.endswith(ignore):
+            continue
+        change = (value - old) / abs(old)
+        higher = any(key.endswith(suffix) for suffix in higher_is_better)
+        regressed = change < -threshold if higher else change > threshold
+        rows.append({'metric': key, 'baseline': old, 'current': value,
+                     'change_pct': round(change * 100, 1), 'regressed': regressed})
+        if regressed:
+            regressions.append(key)
+    return rows, regressions
+
+def print_comparison(rows):
+    """Print a comparison table"""
+    print(f"{'metric':60s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regressed'] else ''
+        print(f"{row['metric']:60s} {row['baseline']:12.2f} {row['current']:12.2f} "
+              f"{row['change_pct']:7.1f}%{flag}")
@@ -0,0 +1,141 @@
+"""Dashboard load test: requests/s for /api/status and / under concurrent clients
+
+The dashboard runs in this process on the same threaded server main.py
+uses, with a background thread changing its stats as the firewall's main
+loop would. Client processes hit one path each for --duration seconds,
+behaving like browsers: they accept gzip and send If-None-Match with the
+last ETag they saw (--no-conditional turns that off). Server CPU is
+measured in this process, so it excludes the clients.
+
+    python benchmarks/dashboard_benchmark.py --clients 4 --duration 5 --output dashboard.json
+"""
+import argparse
+import http.client
+import logging
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+
+from common import ResourceMeter, compare_results, environment, latency_summary, print_comparison, write_results
+from src.monitoring.dashboard import FirewallDashboard
+
+PATHS = ('/api/status', '/')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def client(port, path, duration, conditional, results):
+    """Request path in a loop; reports (requests, latencies, status counts, body bytes)"""
+    latencies = []
+    statuses = {}
+    received = 0
+    etag = None
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        headers = {'Accept-Encoding': 'gzip'}
+        if conditional and etag:
+            headers['If-None-Match'] = etag
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        received += len(body)
+        etag = response.getheader('ETag') or etag
+    results.put((len(latencies), latencies, statuses, received))
+
+def churn(dashboard, stop, interval):
+    """Change the stats the way the firewall's monitoring loop does"""
+    packets = 0
+    while not stop.wait(interval):
+        packets += 1000
+        dashboard.update_stats(packets_processed=packets, threats_detected=packets // 50000,
+                               ips_blocked=packets // 100000)
+
+def run_path(port, path, args):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=client, args=(port, path, args.duration, not args.no_conditional, results))
+               for _ in range(args.clients)]
+    for worker in workers:
+        worker.start()
+    with ResourceMeter() as meter:
+        collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    requests = sum(count for count, _, _, _ in collected)
+    statuses = {}
+    for _, _, counts, _ in collected:
+        for status, count in counts.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    return {
+        'requests': requests,
+        # The clients' clocks start once they've imported, so divide by the requested duration
+        'requests_per_s': round(requests / args.duration, 1),
+        'latency': latency_summary([latency for _, samples, _, _ in collected for latency in samples]),
+        'bytes_per_request': round(sum(received for _, _, _, received in collected) / max(requests, 1), 1),
+        'statuses': statuses,
+        'server_cpu_ms_per_request': round(meter.cpu_s / max(requests, 1) * 1000, 4)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--update-interval', type=float, default=0.5, help="Seconds between stats changes")
+    parser.add_argument('--no-conditional', action='store_true', help="Don't send If-None-Match")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    port = free_port()
+    dashboard = FirewallDashboard(port=port)
+    from werkzeug.serving import make_server
+    # Per-request access logging would dominate the server's CPU time
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, dashboard.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stop = threading.Event()
+    threading.Thread(target=churn, args=(dashboard, stop, args.update_interval), daemon=True).start()
+
+    results = {
+        'benchmark': 'dashboard',
+        'config': vars(args),
+        'environment': environment(),
+        'results': {}
+    }
+    try:
+        for path in PATHS:
+            summary = run_path(port, path, args)
+            results['results'][path] = summary
+            print(f"{path:12s} {summary['requests_per_s']:8.0f} req/s, p99 {summary['latency'].get('p99_us', 0):.0f} us, "
+                  f"{summary['bytes_per_request']:.0f} B/request, statuses {summary['statuses']}, "
+                  f"server {summary['server_cpu_ms_per_request']:.3f} ms CPU/request")
+    finally:
+        stop.set()
+        server.shutdown()
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('per_s',), threshold=args.threshold,
+            ignore=('count', 'requests', 'statuses.200', 'statuses.304')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
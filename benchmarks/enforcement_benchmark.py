@@ -0,0 +1,82 @@
+"""Enforcement benchmark: block rate for many addresses, per-IP iptables rules vs batched set updates
+
+By default the firewall binaries are replaced by a process that reads and discards
+the generated input, so the numbers show the fork/exec and serialisation cost
+without touching the host firewall. With --execute (root required) the real
+iptables, ipset and nft commands run against the live ruleset.
+
+    python benchmarks/enforcement_benchmark.py --ips 10000 --output enforcement.json
+"""
+import argparse
+import ipaddress
+import subprocess
+import time
+
+import numpy as np
+
+from common import ResourceMeter, environment, write_results
+from src.network.enforcement import BACKENDS, run_command
+
+def dry_run_command(args, input=None):
+    """Spawn one process per command and feed it the command input"""
+    return subprocess.run(['cat'], input=input or '', text=True, check=True,
+                          stdout=subprocess.DEVNULL)
+
+def make_ips(n, seed):
+    """Distinct addresses from 10.0.0.0/8"""
+    rng = np.random.default_rng(seed)
+    base = int(ipaddress.IPv4Address('10.0.0.0'))
+    offsets = rng.choice(1 << 24, n, replace=False)
+    return [str(ipaddress.IPv4Address(base + int(offset))) for offset in offsets]
+
+def benchmark_backend(name, ips, runner, batch_size, timeout):
+    """Time blocking then unblocking every address"""
+    kwargs = {'runner': runner}
+    if name in ('ipset', 'nftables'):
+        kwargs['batch_size'] = batch_size
+    backend = BACKENDS[name](**kwargs)
+    backend.setup()
+    setup_commands = backend.commands_run
+
+    with ResourceMeter() as block_meter:
+        for start in range(0, len(ips), batch_size):
+            backend.block(ips[start:start + batch_size], timeout=timeout)
+    block_commands = backend.commands_run - setup_commands
+
+    with ResourceMeter() as unblock_meter:
+        for start in range(0, len(ips), batch_size):
+            backend.unblock(ips[start:start + batch_size])
+
+    return {
+        'block': {**block_meter.as_dict(), 'ips_per_s': round(len(ips) / block_meter.wall_s, 1),
+                  'commands': block_commands},
+        'unblock': {**unblock_meter.as_dict(), 'ips_per_s': round(len(ips) / unblock_meter.wall_s, 1)}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ips', type=int, default=10000)
+    parser.add_argument('--backends', nargs='+', default=['iptables', 'ipset', 'nftables'],
+                        choices=[name for name in BACKENDS if name != 'fake'])
+    parser.add_argument('--batch-size', type=int, default=1000, help="Addresses handed to the backend per call")
+    parser.add_argument('--timeout', type=int, default=60)
+    parser.add_argument('--execute', action='store_true', help="Run the real firewall commands (needs root)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    ips = make_ips(args.ips, args.seed)
+    runner = run_command if args.execute else dry_run_command
+    results = {}
+    for name in args.backends:
+        results[name] = benchmark_backend(name, ips, runner, args.batch_size, args.timeout)
+        block = results[name]['block']
+        print(f"{name:10s} block: {block['ips_per_s']:>12.1f} IPs/s in {block['commands']:>6d} commands "
+              f"({block['wall_s']:.2f}s), unblock: {results[name]['unblock']['ips_per_s']:>12.1f} IPs/s")
+
+    if args.output:
+        write_results({'benchmark': 'enforcement', 'config': vars(args),
+                       'environment': environment(), 'results': results}, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Event store benchmark: sustained insert rate and page latency as the table grows
+
+Events go through EventStore.record() and the writer thread as they would
+from the pipeline; when the queue is full the producer waits briefly
+instead of dropping, so every event lands. Queries then page through the
+table the way /api/events does.
+
+    python benchmarks/event_store_benchmark.py --events 1000000 --output events.json
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import ResourceMeter, compare_results, environment, latency_summary, print_comparison, write_results
+from src.monitoring.event_store import EventStore
+
+THREATS = ('DDoS', 'Port Scan', 'Brute Force', 'Malware')
+
+def fill(store, events, sources, span, seed):
+    """Record events spread evenly over the last span seconds"""
+    rng = random.Random(seed)
+    start = time.time() - span
+    step = span / events
+    waits = 0
+    with ResourceMeter() as meter:
+        for index in range(events):
+            info = {'dst_ip': '192.168.1.1', 'dst_port': rng.choice((22, 80, 443)), 'protocol': 6}
+            address = rng.randrange(sources)
+            source = f"10.{(address >> 16) & 255}.{(address >> 8) & 255}.{address & 255}"
+            while not store.record(source, rng.choice(THREATS), 0.9, info, 100, start + index * step):
+                waits += 1
+                time.sleep(0.001)
+        store.flush(timeout=600)
+    return {**meter.as_dict(), 'events_per_s': round(events / meter.wall_s, 1), 'queue_full_waits': waits}
+
+def time_pages(query, pages):
+    """Latency of following `pages` next cursors from the first page"""
+    samples = []
+    cursor = None
+    for _ in range(pages):
+        start = time.perf_counter()
+        page = query(cursor)
+        samples.append(time.perf_counter() - start)
+        cursor = page['next']
+        if cursor is None:
+            break
+    return latency_summary(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--sources', type=int, default=1 << 20, help="Distinct source addresses (roughly)")
+    parser.add_argument('--pages', type=int, default=200, help="Pages followed per query shape")
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--path', help="Database file (default: a temporary one)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = args.path or os.path.join(directory, 'events.db')
+    span = 7 * 86400
+    store = EventStore(path, retention_days=30).open()
+    try:
+        written = fill(store, args.events, args.sources, span, args.seed)
+        print(f"Wrote {args.events} events at {written['events_per_s']:.0f}/s "
+              f"({written['queue_full_waits']} waits for the writer)")
+        sample = store.query(limit=1)['events'][0]
+        now = time.time()
+        shapes = {
+            'newest': lambda cursor: store.query(args.limit, before=cursor),
+            'source': lambda cursor: store.query(args.limit, before=cursor, source_ip=sample['source_ip']),
+            'threat': lambda cursor: store.query(args.limit, before=cursor, threat_type='Malware'),
+            'last_hour': lambda cursor: store.query(args.limit, before=cursor, since=now - 3600),
+            'day_ago': lambda cursor: store.query(args.limit, before=cursor, since=now - 2 * 86400,
+                                                  until=now - 86400),
+        }
+        results = {
+            'benchmark': 'event_store',
+            'config': vars(args),
+            'environment': environment(),
+            'results': {'write': written, 'bytes': os.path.getsize(path), 'pages': {}}
+        }
+        for name, query in shapes.items():
+            summary = time_pages(query, args.pages)
+            results['results']['pages'][name] = summary
+            print(f"{name:10s} {summary['count']:4d} pages, p50 {summary['p50_us']:.0f} us, "
+                  f"p99 {summary['p99_us']:.0f} us")
+    finally:
+        store.close()
+        if not args.path:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('per_s',), threshold=args.threshold,
+            ignore=('count', 'utilization', 'waits', 'bytes')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
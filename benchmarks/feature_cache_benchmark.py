@@ -0,0 +1,88 @@
+"""Feature cache: training ETL time for a capture, first run vs repeat runs
+
+Writes a synthetic capture, then has DataManager extract its window
+features once with an empty cache (parse and extract) and --repeat more
+times (cache hits). A run with a different window size shows that a new
+feature spec misses.
+
+    python benchmarks/feature_cache_benchmark.py --packets 200000 --output feature_cache.json
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import compare_results, environment, print_comparison, write_results
+from data_manager import DataManager
+from src.network.traffic_generator import TrafficGenerator, write_pcap
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=200000)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        pcap = os.path.join(directory, 'capture.pcap')
+        write_pcap(TrafficGenerator(seed=args.seed).generate_mix(args.packets), pcap)
+        manager = DataManager(base_path=os.path.join(directory, 'data'))
+
+        (X, cold_s) = timed(lambda: manager.load_capture_features(pcap, args.window))
+        warm = [timed(lambda: manager.load_capture_features(pcap, args.window))[1] for _ in range(args.repeat)]
+        # A fresh manager, as a separate training run would have: the digest index is read from disk
+        fresh = DataManager(base_path=os.path.join(directory, 'data'))
+        _, new_process_s = timed(lambda: fresh.load_capture_features(pcap, args.window))
+        _, new_spec_s = timed(lambda: manager.load_capture_features(pcap, args.window // 2))
+        stats = manager.feature_cache.get_stats()
+    finally:
+        shutil.rmtree(directory)
+
+    warm_s = min(warm)
+    results = {
+        'benchmark': 'feature_cache',
+        'config': vars(args),
+        'environment': environment(),
+        'results': {
+            'windows': len(X),
+            'cold_s': round(cold_s, 4),
+            'warm_s': round(warm_s, 5),
+            'new_run_warm_s': round(new_process_s, 5),
+            'new_spec_s': round(new_spec_s, 4),
+            'speedup': round(cold_s / warm_s, 1),
+            'cache': stats
+        }
+    }
+    print(f"{len(X)} windows from {args.packets} packets: first run {cold_s:.2f}s, "
+          f"repeat {warm_s * 1000:.2f} ms ({cold_s / warm_s:.0f}x), new process {new_process_s * 1000:.2f} ms, "
+          f"window {args.window // 2} {new_spec_s:.2f}s")
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['saved_s']:.2f}s saved, "
+          f"{stats['bytes']} bytes")
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('speedup',), threshold=args.threshold,
+            ignore=('windows', 'hits', 'misses', 'evictions', 'entries', 'hit_rate', 'saved_s')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Logging overhead on the detection path: synchronous handlers vs the shared queue listener
+
+Each mode logs one threat warning per detection, the way the engine does
+during an attack wave, and measures what the calling thread pays per call.
+'sync' reproduces the old setup (a console and a file handler on the
+logger, written inline); 'queue' hands records to the listener thread;
+'rate_limited' adds the per-call-site flood limit. Console output goes to
+a scratch file so the terminal's speed doesn't skew the numbers.
+
+    python benchmarks/logging_benchmark.py --records 100000 --output logging.json
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from common import ResourceMeter, compare_results, environment, latency_summary, print_comparison, write_results
+from src.utils import logger as log_module
+
+MODES = ('sync', 'queue', 'rate_limited')
+
+def sync_logger(name, console, path):
+    """The previous setup_logger: its own console and file handler, written by the caller"""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    formatter = logging.Formatter(log_module.LOG_FORMAT, datefmt=log_module.DATE_FORMAT)
+    for handler in (logging.StreamHandler(console), logging.FileHandler(path)):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+def flood(logger, records, lazy):
+    """Per-call latencies for one warning per detected threat"""
+    samples = []
+    for index in range(records):
+        source = f"10.0.{(index >> 8) & 255}.{index & 255}"
+        start = time.perf_counter_ns()
+        if lazy:
+            logger.warning("Threat detected: %s (Confidence: %.2f) from %s", 'DDoS', 0.97, source)
+        else:
+            logger.warning(f"Threat detected: {'DDoS'} (Confidence: {0.97:.2f}) from {source}")
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+def run_mode(mode, records, directory):
+    console_path = os.path.join(directory, f'{mode}.console')
+    path = os.path.join(directory, f'{mode}.log')
+    with open(console_path, 'w') as console:
+        if mode == 'sync':
+            logger = sync_logger(f'bench.{mode}', console, path)
+        else:
+            stdout, sys.stdout = sys.stdout, console
+            try:
+                log_module.configure_logging(file_path=path, rate_limit={'burst': 20, 'interval': 10}
+                                             if mode == 'rate_limited' else None)
+            finally:
+                sys.stdout = stdout
+            logger = log_module.get_logger(f'bench.{mode}')
+        dropped_before = log_module._shared_handler().dropped
+
+        with ResourceMeter() as meter:
+            samples = flood(logger, records, lazy=mode == 'rate_limited')
+            caller_s = sum(samples) / 1e9
+            if mode != 'sync':
+                # Wait for the listener to write everything out
+                log_module.shutdown_logging()
+        for handler in logger.handlers if mode == 'sync' else ():
+            handler.close()
+    with open(path) as f:
+        written = sum(1 for _ in f)
+    summary = latency_summary([sample / 1e9 for sample in samples])
+    return {
+        'caller_ns_per_record': round(caller_s / records * 1e9, 1),
+        'caller_latency': summary,
+        'records_per_s': round(records / caller_s, 1),
+        'drained_s': round(meter.wall_s, 3),
+        'lines_written': written,
+        'queue_dropped': log_module._shared_handler().dropped - dropped_before if mode != 'sync' else 0,
+        'cpu_s': round(meter.cpu_s, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    results = {
+        'benchmark': 'logging',
+        'config': vars(args),
+        'environment': environment(),
+        'results': {}
+    }
+    try:
+        for mode in args.modes:
+            summary = run_mode(mode, args.records, directory)
+            results['results'][mode] = summary
+            print(f"{mode:13s} {summary['caller_ns_per_record']:8.0f} ns/record in the caller "
+                  f"(p99 {summary['caller_latency']['p99_us']:.1f} us), drained in {summary['drained_s']:.2f}s, "
+                  f"{summary['lines_written']} lines written, {summary['queue_dropped']} dropped")
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('per_s',), threshold=args.threshold,
+            ignore=('count', 'lines_written', 'queue_dropped')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Model micro-benchmark matrix: training, loading and inference cost per model type
+
+Every evaluator is run for each feature width, parameter set and batch size, and
+one row per combination is written as JSON (and optionally CSV).
+
+    python benchmarks/model_benchmark.py --widths 10 50 --param n_estimators=50,100 --output models.json
+    python benchmarks/model_benchmark.py --baseline models.json
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from common import environment, write_results
+from src.ml_models.anomaly_detector import AnomalyDetector
+from src.ml_models.classifier import ThreatClassifier
+
+DEFAULT_BATCH_SIZES = [1, 8, 64, 512, 4096, 8192]
+
+# (kind, name) -> factory returning an unbuilt model wrapper with build_model/train/predict.
+# Accelerated evaluators register here to be measured alongside the sklearn ones.
+EVALUATORS = {
+    ('anomaly', 'isolation_forest'): lambda: AnomalyDetector(model_type='isolation_forest'),
+    ('anomaly', 'svm'): lambda: AnomalyDetector(model_type='svm'),
+    ('classifier', 'random_forest'): lambda: ThreatClassifier(model_type='random_forest'),
+    ('classifier', 'neural_network'): lambda: ThreatClassifier(model_type='neural_network'),
+}
+
+def register_evaluator(kind, name, factory):
+    """Add an evaluator to the matrix"""
+    EVALUATORS[(kind, name)] = factory
+
+def make_dataset(n_rows, width, seed):
+    """Normal rows around 0 and four shifted threat classes"""
+    rng = np.random.default_rng(seed)
+    y = rng.choice(5, n_rows, p=[0.6, 0.1, 0.1, 0.1, 0.1])
+    X = rng.normal(0, 1, (n_rows, width)) + y[:, None] * 1.5
+    return X, y
+
+def build(kind, name, params):
+    """Instantiate and build an evaluator; returns it with the overrides that applied"""
+    model = EVALUATORS[(kind, name)]()
+    model.build_model()
+    valid = model.model.get_params()
+    applied = {key: value for key, value in params.items() if key in valid}
+    if applied:
+        model.model.set_params(**applied)
+    return model, applied
+
+def time_calls(func, min_calls, min_time):
+    """Latency samples of repeated calls"""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_calls or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return np.array(samples)
+
+def benchmark_model(kind, name, params, width, batch_sizes, args):
+    """Rows for one evaluator / width / parameter combination"""
+    X_train, y_train = make_dataset(args.train_rows, width, args.seed)
+    X_eval, _ = make_dataset(max(batch_sizes), width, args.seed + 1)
+
+    model, params = build(kind, name, params)
+    start = time.perf_counter()
+    if kind == 'anomaly':
+        model.train(X_train)
+    else:
+        model.train(X_train, y_train)
+    train_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.joblib')
+        start = time.perf_counter()
+        model.save_model(path)
+        save_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        load = {}
+        for mmap_mode in (None, 'r'):
+            start = time.perf_counter()
+            joblib.load(path, mmap_mode=mmap_mode)
+            load['load_mmap_s' if mmap_mode else 'load_s'] = time.perf_counter() - start
+
+    rows = []
+    for batch_size in batch_sizes:
+        batch = X_eval[:batch_size]
+        model.predict(batch)  # Warm-up
+        samples = time_calls(lambda: model.predict(batch), args.min_calls, args.min_time)
+        p50, p99 = np.percentile(samples, [50, 99])
+        rows.append({
+            'kind': kind,
+            'model': name,
+            'params': json.dumps(params, sort_keys=True),
+            'width': width,
+            'batch_size': batch_size,
+            'train_rows': args.train_rows,
+            'train_s': round(train_s, 4),
+            'save_s': round(save_s, 4),
+            'load_s': round(load['load_s'], 4),
+            'load_mmap_s': round(load['load_mmap_s'], 4),
+            'artifact_bytes': size,
+            'calls': len(samples),
+            'p50_us': round(p50 * 1e6, 1),
+            'p99_us': round(p99 * 1e6, 1),
+            'rows_per_s': round(batch_size / p50, 1)
+        })
+        print(f"{kind:10s} {name:16s} w={width:<4d} {rows[-1]['params']:28s} batch={batch_size:<5d} "
+              f"p50={rows[-1]['p50_us']:>10.1f}us rows/s={rows[-1]['rows_per_s']:>12.1f}")
+    return rows
+
+def parse_params(values):
+    """--param key=v1,v2 ... -> list of parameter dicts (cartesian product)"""
+    grid = {}
+    for value in values or []:
+        key, options = value.split('=', 1)
+        grid[key] = [_coerce(option) for option in options.split(',')]
+    if not grid:
+        return [{}]
+    keys = sorted(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(grid[key] for key in keys))]
+
+def _coerce(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+def row_key(row):
+    return (row['kind'], row['model'], row['params'], row['width'], row['batch_size'])
+
+def compare_with_baseline(rows, baseline_path, threshold):
+    """Print per-row latency and throughput changes; returns regressed rows"""
+    with open(baseline_path, 'r') as f:
+        baseline = {row_key(row): row for row in json.load(f)['results']}
+
+    regressions = []
+    print(f"{'model':28s} {'width':>5s} {'batch':>6s} {'p50 base':>10s} {'p50 now':>10s} "
+          f"{'rows/s change':>14s}")
+    for row in rows:
+        old = baseline.get(row_key(row))
+        if old is None:
+            continue
+        change = (row['rows_per_s'] - old['rows_per_s']) / old['rows_per_s']
+        flag = '  REGRESSION' if change < -threshold else ''
+        if flag:
+            regressions.append(row)
+        print(f"{row['kind'] + '/' + row['model']:28s} {row['width']:5d} {row['batch_size']:6d} "
+              f"{old['p50_us']:10.1f} {row['p50_us']:10.1f} {change * 100:13.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='*', help="kind/name pairs, e.g. anomaly/svm (default: all)")
+    parser.add_argument('--widths', type=int, nargs='+', default=[50])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--param', action='append', help="Model parameter grid, e.g. n_estimators=50,100")
+    parser.add_argument('--train-rows', type=int, default=2000)
+    parser.add_argument('--min-calls', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per batch size")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--csv', help="Also write the result table as CSV")
+    parser.add_argument('--baseline', help="Compare against a previous JSON results file")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('src.'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    selected = EVALUATORS if not args.models else [tuple(m.split('/', 1)) for m in args.models]
+    rows, seen = [], set()
+    for (kind, name), params, width in itertools.product(selected, parse_params(args.param), args.widths):
+        _, applied = build(kind, name, params)
+        combo = (kind, name, json.dumps(applied, sort_keys=True), width)
+        if combo in seen:  # Grid entries that don't apply to this model collapse together
+            continue
+        seen.add(combo)
+        rows.extend(benchmark_model(kind, name, params, width, args.batch_sizes, args))
+
+    results = {'benchmark': 'models', 'config': vars(args), 'environment': environment(), 'results': rows}
+    if args.output:
+        write_results(results, args.output)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    if args.baseline:
+        regressions = compare_with_baseline(rows, args.baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""End-to-end pipeline benchmark: replay capture -> parse/features -> inference -> in-memory enforcement
+
+Traffic comes from TrafficGenerator with a fixed seed, so runs are reproducible.
+Without --rate the replay runs flat out, so packet latency includes time spent
+queued behind the slowest stage; pass --rate to measure latency at a given load.
+By default every window is scored inline, one at a time; --orchestrated runs the
+staged Pipeline instead, with batched inference and configurable worker pools.
+
+    python benchmarks/pipeline_benchmark.py --packets 200000 --output pipeline.json
+    python benchmarks/pipeline_benchmark.py --orchestrated --feature-workers 2 --feature-mode process
+    python benchmarks/pipeline_benchmark.py --baseline pipeline.json --fail-on-regression
+"""
+import argparse
+import logging
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from common import (ResourceMeter, compare_results, environment, latency_summary,
+                    print_comparison, write_results)
+from src.ml_models.anomaly_detector import AnomalyDetector
+from src.ml_models.classifier import ThreatClassifier
+from src.network.enforcement import FakeBackend
+from src.network.firewall_engine import AIFirewallEngine
+from src.network.packet_analyzer import PacketAnalyzer
+from src.network.packet_capture import ReplayCapture
+from src.monitoring.metrics import get_metrics
+from src.network.pipeline import Pipeline
+from src.network.traffic_generator import TrafficGenerator
+
+def train_models(generator, analyzer, window, windows_per_scenario=40):
+    """Train both models on window features of every scenario"""
+    X, y = generator.training_set(analyzer, window, windows_per_scenario)
+
+    detector = AnomalyDetector()
+    detector.build_model()
+    detector.train(X)
+    classifier = ThreatClassifier()
+    classifier.build_model()
+    classifier.train(X, y)
+    return detector, classifier
+
+def run_pipeline(traffic, engine, analyzer, window, rate, queue_size, fast_path=True):
+    """Drive the replayed traffic through the pipeline and collect timings"""
+    capture = ReplayCapture(traffic, max_pps=queue_size, rate=rate)
+    if fast_path:
+        capture.set_filter(engine.fast_path.capture_filter)
+    packet_latency = np.empty(len(traffic), dtype=np.float64)
+    verdict_latency = []
+    stage_time = Counter()
+    processed = 0
+    threats = 0
+    pending = []
+
+    def process_window(packets):
+        nonlocal processed, threats
+        start = time.perf_counter()
+        infos = [analyzer.extract_packet_info(packet) for packet in packets]
+        parsed = time.perf_counter()
+        features = analyzer.create_traffic_features(packets)
+        featured = time.perf_counter()
+        source = Counter(info.get('src_ip') for info in infos).most_common(1)[0][0]
+        is_threat, _, _ = engine.analyze_traffic(features, {'src_ip': source})
+        verdict = time.perf_counter()
+
+        stage_time['parse'] += parsed - start
+        stage_time['features'] += featured - parsed
+        stage_time['inference'] += verdict - featured
+        verdict_latency.append(verdict - featured)
+        threats += int(is_threat)
+
+        now = time.time()
+        for packet in packets:
+            packet_latency[processed] = now - packet['timestamp']
+            processed += 1
+
+    with ResourceMeter() as meter:
+        capture.start_capture()
+        while True:
+            packets = capture.get_packets(256)
+            if not packets:
+                if capture.finished and not capture.packets_queue:
+                    break
+                time.sleep(0.0001)
+                continue
+            pending.extend(packets)
+            while len(pending) >= window:
+                process_window(pending[:window])
+                del pending[:window]
+        if pending:
+            process_window(pending)
+        capture.stop_capture()
+
+    return {
+        'packets': processed,
+        'fast_path_skipped': capture.packets_replayed - processed,
+        'windows': len(verdict_latency),
+        'threat_verdicts': threats,
+        'blocked_ips': len(engine.blocked_ips),
+        'sustained_pps': round(processed / meter.wall_s, 1),
+        'packet_latency': latency_summary(packet_latency[:processed]),
+        'verdict_latency': latency_summary(verdict_latency),
+        'stage_us_per_packet': {name: round(seconds / processed * 1e6, 3)
+                                for name, seconds in stage_time.items()},
+        'resources': meter.as_dict()
+    }
+
+def run_orchestrated(traffic, engine, analyzer, window, rate, queue_size, stages, fast_path=True,
+                     transport='ring'):
+    """Drive the replayed traffic through the staged Pipeline"""
+    metrics = get_metrics()
+    metrics.reset()
+    capture = ReplayCapture(traffic, max_pps=queue_size, rate=rate)
+    if fast_path:
+        capture.set_filter(engine.fast_path.capture_filter)
+    pipeline = Pipeline(capture, engine, analyzer, window=window, stages=stages, transport=transport)
+    peak_depth = {}
+
+    with ResourceMeter() as meter:
+        pipeline.start()
+        while not pipeline.join(0.05):
+            for name, stage in pipeline.status()['stages'].items():
+                peak_depth[name] = max(peak_depth.get(name, 0), stage['queue_depth'])
+        pipeline.stop()
+
+    status = pipeline.status()
+    latency = metrics.snapshot()['histograms'].get('pipeline_latency')
+    processed = status['packets_processed']
+    return {
+        'packets': processed,
+        'fast_path_skipped': capture.packets_replayed - processed,
+        'windows': status['windows'],
+        'blocked_ips': len(engine.blocked_ips),
+        'sustained_pps': round(processed / meter.wall_s, 1),
+        'window_latency': {
+            'p50_us': round(latency.percentile(50) * 1e6, 2),
+            'p99_us': round(latency.percentile(99) * 1e6, 2)
+        } if latency else {},
+        'peak_queue_depth': peak_depth,
+        'resources': meter.as_dict()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=100000)
+    parser.add_argument('--window', type=int, default=100, help="Packets per verdict")
+    parser.add_argument('--rate', type=float, help="Replay rate in pps (default: as fast as possible)")
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-fast-path', action='store_true', help="Score every packet, even from known sources")
+    parser.add_argument('--orchestrated', action='store_true', help="Run the staged Pipeline instead of the inline loop")
+    parser.add_argument('--feature-workers', type=int, default=1)
+    parser.add_argument('--feature-mode', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--transport', choices=('ring', 'queue'), default='ring',
+                        help="How packets reach feature worker processes")
+    parser.add_argument('--inference-batch', type=int, default=16, help="Queue items merged per model call")
+    parser.add_argument('--log-level', default='ERROR', help="Level for firewall loggers during the run")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('src.'):
+            logging.getLogger(name).setLevel(args.log_level)
+
+    generator = TrafficGenerator(seed=args.seed)
+    analyzer = PacketAnalyzer()
+    detector, classifier = train_models(generator, analyzer, args.window)
+    engine = AIFirewallEngine(detector, classifier, backend=FakeBackend())
+    traffic = generator.generate_mix(args.packets)
+
+    results = {
+        'benchmark': 'pipeline',
+        'config': vars(args),
+        'environment': environment(),
+    }
+    if args.orchestrated:
+        stages = {
+            'features': {'workers': args.feature_workers, 'mode': args.feature_mode},
+            'inference': {'batch': args.inference_batch}
+        }
+        results['results'] = run_orchestrated(traffic, engine, analyzer, args.window, args.rate,
+                                              args.queue_size, stages, fast_path=not args.no_fast_path,
+                                              transport=args.transport)
+    else:
+        results['results'] = run_pipeline(traffic, engine, analyzer, args.window, args.rate,
+                                          args.queue_size, fast_path=not args.no_fast_path)
+
+    summary = results['results']
+    print(f"Sustained throughput: {summary['sustained_pps']:.0f} pps over {summary['packets']} packets")
+    if args.orchestrated:
+        print(f"Window latency: {summary['window_latency']}")
+        print(f"Peak queue depth: {summary['peak_queue_depth']}")
+    else:
+        print(f"Packet latency:  {summary['packet_latency']}")
+        print(f"Verdict latency: {summary['verdict_latency']}")
+        print(f"Stage cost (us/packet): {summary['stage_us_per_packet']}")
+    print(f"Resources: {summary['resources']}")
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('pps',), threshold=args.threshold,
+            ignore=('count', 'utilization', 'packets', 'windows', 'verdicts', 'blocked_ips', 'skipped',
+                    'depth')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
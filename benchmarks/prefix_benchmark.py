@@ -0,0 +1,91 @@
+"""Prefix table benchmark: build time, memory and lookup rate at 1M prefixes, plus rule savings from aggregation
+
+    python benchmarks/prefix_benchmark.py --prefixes 1000000 --output prefixes.json
+"""
+import argparse
+
+import numpy as np
+
+from common import ResourceMeter, environment, latency_summary, write_results
+from src.network.prefix_table import PrefixTable, aggregate, format_prefix
+
+# Rough shape of a routing table: mostly /24s, some shorter aggregates and host routes
+LENGTH_MIX = {8: 0.001, 12: 0.004, 16: 0.04, 20: 0.12, 22: 0.15, 24: 0.6, 28: 0.035, 32: 0.05}
+
+def make_prefixes(n, rng):
+    lengths = rng.choice(list(LENGTH_MIX), n, p=list(LENGTH_MIX.values()))
+    networks = rng.integers(0, 1 << 32, n, dtype=np.uint64)
+    return [format_prefix(4, int(network) >> (32 - int(length)) << (32 - int(length)), int(length))
+            for network, length in zip(networks, lengths)]
+
+def benchmark_lookups(table, addresses, batch=1000):
+    """Lookup rate over all addresses and per-batch latency samples"""
+    samples = []
+    hits = 0
+    for start in range(0, len(addresses), batch):
+        chunk = addresses[start:start + batch]
+        with ResourceMeter() as meter:
+            for address in chunk:
+                if table.lookup(address) is not None:
+                    hits += 1
+        samples.append(meter.wall_s / len(chunk))
+    total = sum(samples) * batch
+    return {
+        'lookups_per_s': round(len(addresses) / total, 1),
+        'hit_ratio': round(hits / len(addresses), 4),
+        'per_lookup': latency_summary(samples)
+    }
+
+def benchmark_aggregation(rng, subnets, per_subnet, max_collateral):
+    """Installed rules for attack traffic from a few dense subnets plus scattered sources"""
+    ips = []
+    for network in rng.integers(0, 1 << 24, subnets):
+        hosts = rng.choice(256, per_subnet, replace=False)
+        ips.extend(format_prefix(4, (int(network) << 8) | int(host), 32) for host in hosts)
+    ips.extend(format_prefix(4, int(address), 32) for address in rng.integers(0, 1 << 32, per_subnet * 2))
+    with ResourceMeter() as meter:
+        groups = aggregate(ips, max_collateral=max_collateral)
+    return {'addresses': len(ips), 'rules': len(groups), 'aggregate_s': round(meter.wall_s, 4)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prefixes', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    prefixes = make_prefixes(args.prefixes, rng)
+
+    with ResourceMeter() as build:
+        table = PrefixTable(prefixes)
+    print(f"Built {len(table)} prefixes in {build.wall_s:.2f}s (peak RSS {build.peak_rss_mb:.0f} MB)")
+
+    addresses = [format_prefix(4, int(address), 32)
+                 for address in rng.integers(0, 1 << 32, args.lookups, dtype=np.uint64)]
+    lookups = benchmark_lookups(table, addresses)
+    print(f"Lookups: {lookups['lookups_per_s']:.0f}/s, hit ratio {lookups['hit_ratio']:.3f}, "
+          f"p99 {lookups['per_lookup']['p99_us']:.2f} us")
+
+    aggregation = {
+        f"collateral_{collateral}": benchmark_aggregation(rng, 20, 220, collateral)
+        for collateral in (0.0, 0.25, 0.5)
+    }
+    for name, result in aggregation.items():
+        print(f"Aggregation {name}: {result['addresses']} addresses -> {result['rules']} rules")
+
+    if args.output:
+        write_results({
+            'benchmark': 'prefixes',
+            'config': vars(args),
+            'environment': environment(),
+            'results': {
+                'build': {**build.as_dict(), 'prefixes': len(table)},
+                'lookup': lookups,
+                'aggregation': aggregation
+            }
+        }, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Restart-to-enforcing benchmark: journal replay and batched reinstall of saved blocks
+
+A journal with --entries live blocks (plus churn from blocks that were later
+removed) is written, then a fresh engine is started on it. Without --execute
+the backend commands are fed to a stand-in process, as in enforcement_benchmark.py.
+
+    python benchmarks/restore_benchmark.py --entries 100000 --output restore.json
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import ResourceMeter, environment, write_results
+from enforcement_benchmark import dry_run_command, make_ips
+from src.network.block_journal import BlockJournal
+from src.network.enforcement import BACKENDS, run_command
+from src.network.firewall_engine import AIFirewallEngine
+
+def write_journal(path, ips, churn, seed):
+    """Journal with every address blocked and a share of extra block/unblock pairs"""
+    rng = np.random.default_rng(seed)
+    deadlines = time.time() + rng.uniform(60, 86400, len(ips))
+    journal = BlockJournal(path, compact_min_records=len(ips) * 10)
+    journal.open()
+    with ResourceMeter() as meter:
+        for ip, deadline in zip(ips, deadlines.tolist()):
+            journal.record_block(ip, deadline, 'DDoS')
+        for ip in ips[:int(len(ips) * churn)]:
+            journal.record_unblock(ip)
+            journal.record_block(ip, time.time() + 3600, 'Port Scan')
+        journal.flush()
+    records = journal.records
+    journal.close()
+    return {**meter.as_dict(), 'records': records, 'bytes': os.path.getsize(path)}
+
+def restart(path, backend_name, runner):
+    """Time from engine construction to every saved block being reinstalled"""
+    backend = BACKENDS[backend_name](runner=runner)
+    with ResourceMeter() as meter:
+        engine = AIFirewallEngine(None, None, backend=backend, journal_path=path)
+    restored = len(engine.blocked_ips)
+    with ResourceMeter() as compact:
+        engine.journal.compact()
+    engine.shutdown()
+    return {
+        'restart_to_enforcing': meter.as_dict(),
+        'restored': restored,
+        'backend_commands': backend.commands_run,
+        'compact': compact.as_dict(),
+        'bytes_after_compact': os.path.getsize(path)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--churn', type=float, default=0.5, help="Share of entries re-blocked once")
+    parser.add_argument('--backends', nargs='+', default=['ipset', 'nftables'],
+                        choices=[name for name in BACKENDS if name != 'fake'])
+    parser.add_argument('--execute', action='store_true', help="Run the real firewall commands (needs root)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('src.'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    ips = make_ips(args.entries, args.seed)
+    runner = run_command if args.execute else dry_run_command
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for backend_name in args.backends:
+            path = os.path.join(tmp_dir, f'{backend_name}.journal')
+            written = write_journal(path, ips, args.churn, args.seed)
+            results[backend_name] = {'write': written, **restart(path, backend_name, runner)}
+            result = results[backend_name]
+            print(f"{backend_name:10s} {result['restored']} blocks from {written['records']} records: "
+                  f"enforcing after {result['restart_to_enforcing']['wall_s']:.2f}s "
+                  f"({result['backend_commands']} commands), compaction {result['compact']['wall_s']:.2f}s")
+
+    if args.output:
+        write_results({'benchmark': 'restore', 'config': vars(args),
+                       'environment': environment(), 'results': results}, args.output)
+
+if __name__ == '__main__':
+    main()
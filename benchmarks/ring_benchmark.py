@@ -0,0 +1,181 @@
+"""Packet handoff benchmark: shared-memory PacketRing vs multiprocessing.Queue
+
+A producer hands generated frames to N consumer processes. With --transport
+queue, batches of packet dicts are pickled through a multiprocessing.Queue,
+as the pipeline did before the ring. With --transport ring, frames are
+copied into a PacketRing and consumers read them by offset. --work picks what
+consumers do with each frame: 'touch' reads the IP protocol byte (vectorised
+over the ring, per frame for the queue), 'features' runs
+PacketAnalyzer.extract_features.
+
+    python benchmarks/ring_benchmark.py --frames 500000 --consumers 2 --output ring.json
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+
+from common import compare_results, environment, print_comparison, write_results
+from src.network.packet_analyzer import PacketAnalyzer
+from src.network.shm_ring import PacketRing
+from src.network.traffic_generator import TrafficGenerator
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def queue_consumer(inbox, results, work):
+    analyzer = PacketAnalyzer() if work == 'features' else None
+    count = checksum = 0
+    started = None
+    while True:
+        packets = inbox.get()
+        if packets is None:
+            break
+        started = started or time.process_time()
+        count += len(packets)
+        if analyzer is not None:
+            for packet in packets:
+                checksum += int(analyzer.extract_features(packet)[1])
+        else:
+            checksum += sum(packet['raw_data'][23] for packet in packets)
+    results.put((count, checksum, time.process_time() - (started or time.process_time())))
+
+def ring_consumer(name, consumer, results, work, max_records):
+    ring = PacketRing.attach(name)
+    analyzer = PacketAnalyzer() if work == 'features' else None
+    data = np.frombuffer(ring.data, dtype=np.uint8)
+    count = checksum = 0
+    started = None
+    while True:
+        if analyzer is not None:
+            frames = ring.read_frames(consumer, max_records)
+            for frame, timestamp in frames:
+                checksum += int(analyzer.extract_features({'raw_data': frame, 'timestamp': timestamp})[1])
+            read = len(frames)
+        else:
+            offsets, lengths, _ = ring.read(consumer, max_records)
+            checksum += int(data[offsets + 23].sum())
+            ring.release(consumer)
+            read = len(offsets)
+        if read:
+            started = started or time.process_time()
+        count += read
+        if not read:
+            if ring.finished(consumer):
+                break
+            ring.wait(consumer, timeout=0.1)
+    del data
+    ring.close()
+    results.put((count, checksum, time.process_time() - (started or time.process_time())))
+
+def run(transport, frames, timestamps, consumers, batch, work):
+    """Hand every frame to the consumers; returns timings and the consumers' counts"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    ring = None
+    if transport == 'ring':
+        ring = PacketRing(capacity=32768, data_size=64 << 20, consumers=consumers, chunk=batch)
+        workers = [context.Process(target=ring_consumer, args=(ring.name, index, results, work, batch))
+                   for index in range(consumers)]
+    else:
+        inbox = context.Queue(64)
+        workers = [context.Process(target=queue_consumer, args=(inbox, results, work))
+                   for _ in range(consumers)]
+    for worker in workers:
+        worker.start()
+    # Let the workers finish importing before the clock starts
+    time.sleep(2.0)
+
+    producer_before = cpu_seconds()
+    start = time.perf_counter()
+    for first in range(0, len(frames), batch):
+        if ring is not None:
+            ring.write_batch(frames[first:first + batch], timestamps[first:first + batch])
+        else:
+            inbox.put([{'timestamp': timestamp, 'raw_data': frame, 'length': len(frame), 'interface': 'bench'}
+                       for frame, timestamp in zip(frames[first:first + batch],
+                                                   timestamps[first:first + batch])])
+    if ring is not None:
+        ring.close_writer()
+    else:
+        for _ in workers:
+            inbox.put(None)
+    produced = time.perf_counter()
+    producer_cpu = cpu_seconds() - producer_before
+
+    counts = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    consumer_cpu = sum(cpu for _, _, cpu in counts)
+    if ring is not None:
+        ring.close()
+
+    delivered = sum(count for count, _, _ in counts)
+    return {
+        'frames': delivered,
+        'checksum': sum(checksum for _, checksum, _ in counts),
+        'frames_per_s': round(delivered / elapsed, 1),
+        'producer_s': round(produced - start, 4),
+        'wall_s': round(elapsed, 4),
+        # Consumers time themselves from their first frame, so imports and idle polling
+        # before the run don't count
+        'producer_cpu_us_per_frame': round(producer_cpu / delivered * 1e6, 3),
+        'consumer_cpu_us_per_frame': round(consumer_cpu / delivered * 1e6, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--consumers', type=int, default=2)
+    parser.add_argument('--batch', type=int, default=256, help="Frames per queue item / ring chunk")
+    parser.add_argument('--work', choices=('touch', 'features'), default='touch')
+    parser.add_argument('--transport', choices=('ring', 'queue', 'both'), default='both')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (fraction)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    packets = TrafficGenerator(seed=args.seed).generate_mix(args.frames).to_packets()
+    frames = [packet['raw_data'] for packet in packets]
+    timestamps = [packet['timestamp'] for packet in packets]
+    transports = ('queue', 'ring') if args.transport == 'both' else (args.transport,)
+
+    results = {
+        'benchmark': 'ring',
+        'config': vars(args),
+        'environment': environment(),
+        'results': {}
+    }
+    for transport in transports:
+        summary = run(transport, frames, timestamps, args.consumers, args.batch, args.work)
+        results['results'][transport] = summary
+        print(f"{transport:>5}: {summary['frames_per_s']:.0f} frames/s, "
+              f"producer {summary['producer_cpu_us_per_frame']:.2f} us/frame, "
+              f"consumers {summary['consumer_cpu_us_per_frame']:.2f} us/frame")
+    if len(transports) == 2:
+        checksums = {summary['checksum'] for summary in results['results'].values()}
+        if len(checksums) != 1:
+            print("Transports delivered different frames")
+            sys.exit(1)
+
+    if args.output:
+        write_results(results, args.output)
+
+    if args.baseline:
+        rows, regressions = compare_results(
+            results, args.baseline, higher_is_better=('per_s',), threshold=args.threshold,
+            ignore=('frames', 'checksum')
+        )
+        print_comparison(rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
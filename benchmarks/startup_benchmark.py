@@ -0,0 +1,152 @@
+"""Startup-time benchmark: per-module import cost, time to capturing and to first processed packet
+
+Each measurement runs in a fresh interpreter so module caches don't hide
+import cost. Startup runs main.AIFirewall.start() on a synthetic replay with
+the fake backend, with state, models and logs in a temporary directory.
+
+    python benchmarks/startup_benchmark.py --repeat 5 --output startup.json --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import yaml
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODULES = [
+    'numpy',
+    'yaml',
+    'flask',
+    'pandas',
+    'sklearn.ensemble',
+    'src.utils.logger',
+    'src.network.packet_capture',
+    'src.network.packet_analyzer',
+    'src.network.firewall_engine',
+    'src.network.pipeline',
+    'src.monitoring.dashboard',
+    'src.ml_models.anomaly_detector',
+    'src.ml_models.classifier',
+    'src.ml_models.model_trainer',
+    'main',
+]
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# Runs the real startup path, AIFirewall.start(), on a synthetic replay and
+# notes when capture is running and when the pipeline has processed a packet
+STARTUP_SNIPPET = """
+import sys
+import threading
+import time
+sys.path.insert(0, {root!r})
+import main
+
+firewall = main.AIFirewall({config!r}, replay='synthetic:{packets}', backend='fake')
+threading.Thread(target=firewall.start, daemon=True).start()
+capturing = processed = None
+deadline = time.time() + 300
+while processed is None and time.time() < deadline:
+    if capturing is None and firewall.packet_capture is not None and firewall.packet_capture.is_capturing:
+        capturing = time.time()
+    if firewall.is_running and firewall.pipeline.status()['packets_processed'] > 0:
+        processed = time.time()
+    time.sleep(0.001)
+firewall.stop()
+assert processed is not None, "No packet processed within 300s"
+# Not printed: the firewall's own threads log to stdout
+with open('startup.txt', 'w') as f:
+    f.write(f"{{capturing}} {{processed}}")
+"""
+
+def _run_snippet(snippet):
+    """Run a snippet in a fresh interpreter and return its last stdout line"""
+    result = subprocess.run(
+        [sys.executable, '-c', snippet], cwd=REPO_ROOT,
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+def measure_import(module, repeat):
+    """Median import time of a module in milliseconds"""
+    samples = [float(_run_snippet(IMPORT_SNIPPET.format(module=module))) * 1000
+               for _ in range(repeat)]
+    return statistics.median(samples)
+
+def write_config(directory):
+    """The repo config with every path and port moved out of the way, for a throwaway run"""
+    with open(os.path.join(REPO_ROOT, 'config', 'config.yaml')) as f:
+        config = yaml.safe_load(f)
+    config['firewall']['state_path'] = os.path.join(directory, 'blocks.journal')
+    config['events']['path'] = os.path.join(directory, 'events.db')
+    config['ml_model']['models_dir'] = os.path.join(directory, 'models')
+    config['logging']['file_path'] = os.path.join(directory, 'firewall.log')
+    config['dashboard']['port'] = 0
+    path = os.path.join(directory, 'config.yaml')
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+    return path
+
+def measure_startup(repeat, packets):
+    """Median wall time (ms) from interpreter launch to capturing and to the first processed packet"""
+    directory = tempfile.mkdtemp()
+    try:
+        snippet = STARTUP_SNIPPET.format(root=REPO_ROOT, config=write_config(directory), packets=packets)
+        # The first run trains and saves the bootstrap models, which a deployed firewall already has
+        subprocess.run([sys.executable, '-c', snippet], cwd=directory, capture_output=True, check=True)
+        capturing, processed = [], []
+        for _ in range(repeat):
+            launched = time.time()
+            subprocess.run([sys.executable, '-c', snippet], cwd=directory, capture_output=True, check=True)
+            with open(os.path.join(directory, 'startup.txt')) as f:
+                capture_at, processed_at = map(float, f.read().split())
+            capturing.append((capture_at - launched) * 1000)
+            processed.append((processed_at - launched) * 1000)
+    finally:
+        shutil.rmtree(directory)
+    return statistics.median(capturing), statistics.median(processed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--packets', type=int, default=5000, help="Synthetic packets replayed per run")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--budget-ms', type=float,
+                        help="Fail if time to first packet exceeds this budget")
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'repeat': args.repeat, 'imports_ms': {}}
+    for module in MODULES:
+        try:
+            results['imports_ms'][module] = round(measure_import(module, args.repeat), 2)
+        except subprocess.CalledProcessError:
+            results['imports_ms'][module] = None
+        print(f"{module:40s} {results['imports_ms'][module]} ms")
+
+    capturing_ms, first_packet_ms = measure_startup(args.repeat, args.packets)
+    results['capturing_ms'] = round(capturing_ms, 2)
+    results['first_packet_ms'] = round(first_packet_ms, 2)
+    print(f"{'time to capturing':40s} {results['capturing_ms']} ms")
+    print(f"{'time to first processed packet':40s} {results['first_packet_ms']} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.budget_ms is not None and results['first_packet_ms'] > args.budget_ms:
+        print(f"Startup budget exceeded: {results['first_packet_ms']} ms > {args.budget_ms} ms")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,21 @@
 import os
-import pandas as pd
+import time
 import json
 from datetime import datetime
+from src.ml_models.model_registry import ModelRegistry
+from src.utils.feature_cache import FeatureCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class DataManager:
-    def __init__(self, base_path="data/"):
+    def __init__(self, base_path="data/", stats_cache_ttl=60, feature_cache_bytes=2 << 30):
         self.base_path = base_path
+        self.stats_cache_ttl = stats_cache_ttl
+        self._size_cache = {}
         self.ensure_directories()
+        self.registry = ModelRegistry(os.path.join(base_path, 'models'))
+        self.feature_cache = FeatureCache(os.path.join(base_path, 'temp', 'features'), feature_cache_bytes)
         
     def ensure_directories(self):
         """Ensure all data directories exist"""
@@ -20,6 +26,8 @@ class DataManager:
             
     def save_training_data(self, data, filename, metadata=None):
         """Save processed training data with metadata"""
+        import pandas as pd
+        
         filepath = os.path.join(self.base_path, 'processed', filename)
         
         try:
@@ -44,6 +52,8 @@ class DataManager:
             
     def load_training_data(self, filename):
         """Load processed training data"""
+        import pandas as pd
+        
         filepath = os.path.join(self.base_path, 'processed', filename)
         
         try:
@@ -54,64 +64,95 @@ class DataManager:
             logger.error(f"Error loading training data: {e}")
             return None
             
-    def save_model(self, model, model_name, metrics=None):
-        """Save trained model with metrics"""
-        import joblib
+    def load_capture_features(self, pcap_path, window=100, analyzer=None):
+        """Window features of a pcap file, read from the feature cache when it has been processed before"""
+        if analyzer is None:
+            from src.network.packet_analyzer import PacketAnalyzer
+            analyzer = PacketAnalyzer()
+        
+        def build():
+            import numpy as np
+            from src.network.traffic_generator import read_pcap
+            packets = read_pcap(pcap_path).to_packets()
+            rows = [analyzer.create_traffic_features(packets[start:start + window])
+                    for start in range(0, len(packets), window)]
+            rows = [row for row in rows if row is not None]
+            X = np.array(rows) if rows else np.zeros((0, len(analyzer.feature_names) * 5))
+            return {'X': X}
         
-        model_path = os.path.join(self.base_path, 'models', f"{model_name}.pkl")
-        metrics_path = os.path.join(self.base_path, 'models', f"{model_name}_metrics.json")
+        return self.feature_cache.get_or_build(pcap_path, analyzer.feature_spec(window), build)['X']
         
+    def save_model(self, model, model_name, metrics=None, feature_spec=None):
+        """Save trained model with metrics as a new registry version"""
         try:
-            # Save model
-            joblib.dump(model, model_path)
-            
-            # Save metrics
             if metrics:
                 metrics['save_timestamp'] = datetime.now().isoformat()
-                with open(metrics_path, 'w') as f:
-                    json.dump(metrics, f, indent=4)
-                    
-            logger.info(f"Model saved: {model_path}")
+                
+            entry = self.registry.save(model_name, model, feature_spec=feature_spec, metrics=metrics)
+            logger.info(f"Model saved: {entry['path']}")
             return True
             
         except Exception as e:
             logger.error(f"Error saving model: {e}")
             return False
             
+    def load_model(self, model_name, version=None, mmap_mode='r'):
+        """Load the active (or given) version of a saved model"""
+        try:
+            model, _ = self.registry.load(model_name, version, mmap_mode=mmap_mode)
+            return model
+        except Exception as e:
+            logger.error(f"Error loading model: {e}")
+            return None
+            
+    def set_active_model(self, model_name, version):
+        """Select which version of a model is loaded by default"""
+        self.registry.set_active(model_name, version)
+            
     def list_models(self):
         """List all available trained models"""
-        models_path = os.path.join(self.base_path, 'models')
         models = []
         
-        for file in os.listdir(models_path):
-            if file.endswith('.pkl'):
-                model_info = {
-                    'name': file.replace('.pkl', ''),
-                    'path': os.path.join(models_path, file),
-                    'modified': datetime.fromtimestamp(
-                        os.path.getmtime(os.path.join(models_path, file))
-                    )
-                }
-                models.append(model_info)
+        for entry in self.registry.list_models():
+            model_info = {
+                'name': entry['name'],
+                'version': entry['version'],
+                'active': entry['active'],
+                'path': entry['path'],
+                'size': entry['size'],
+                'modified': datetime.fromisoformat(entry['saved'])
+            }
+            models.append(model_info)
                 
         return models
         
     def get_data_statistics(self):
         """Get statistics about stored data"""
+        models_size = self.registry.total_size() / (1024 * 1024)
         stats = {
             'raw_files': len(os.listdir(os.path.join(self.base_path, 'raw'))),
             'processed_files': len(os.listdir(os.path.join(self.base_path, 'processed'))),
-            'trained_models': len(self.list_models()),
-            'total_size': self._get_directory_size(self.base_path)
+            'trained_models': len({entry['name'] for entry in self.registry.list_models()}),
+            'feature_cache': self.feature_cache.get_stats(),
+            'total_size': models_size + sum(
+                self._get_directory_size(os.path.join(self.base_path, dir_name))
+                for dir_name in ('raw', 'processed', 'logs', 'temp')
+            )
         }
         
         return stats
         
     def _get_directory_size(self, path):
-        """Calculate total directory size in MB"""
+        """Calculate total directory size in MB, cached for stats_cache_ttl seconds"""
+        cached = self._size_cache.get(path)
+        if cached and time.time() - cached[0] < self.stats_cache_ttl:
+            return cached[1]
+            
         total_size = 0
         for dirpath, dirnames, filenames in os.walk(path):
             for filename in filenames:
                 filepath = os.path.join(dirpath, filename)
                 total_size += os.path.getsize(filepath)
-        return total_size / (1024 * 1024)  # Convert to MB
+        size_mb = total_size / (1024 * 1024)  # Convert to MB
+        self._size_cache[path] = (time.time(), size_mb)
+        return size_mb
@@ -1,18 +1,55 @@
+import argparse
+import os
 import time
 import yaml
 import threading
-import random
-from src.utils.logger import get_logger
+from src.monitoring.metrics import get_metrics
+from src.utils.logger import configure_logging, get_logger
+
+PROCESS_START = time.time()
 
 logger = get_logger(__name__)
 
+# Synthetic packets replayed in a loop when live capture is unavailable
+SIMULATION_PACKETS = 100000
+
+# Heavy modules only needed once traffic has to be scored
+HEAVY_MODULES = [
+    'sklearn.ensemble',
+    'sklearn.preprocessing',
+    'src.ml_models.anomaly_detector',
+    'src.ml_models.classifier',
+]
+
 class AIFirewall:
-    def __init__(self, config_path='config/config.yaml'):
+    def __init__(self, config_path='config/config.yaml', replay=None, rate=None, loop=False, backend=None,
+                 require_capture=False):
         self.config = self.load_config(config_path)
+        self.replay = replay
+        self.rate = rate
+        self.loop = loop
+        self.backend = backend
+        self.require_capture = require_capture
+        self.simulated = False
         self.is_running = False
         self.packet_count = 0
         self.threat_count = 0
-        self.blocked_ips = set()
+        self.packet_capture = None
+        self.engine = None
+        self.pipeline = None
+        self.event_store = None
+        self.alert_system = None
+        self.trainer = None
+        self.drift_monitor = None
+        
+        get_metrics().set_enabled(self.config.get('metrics', {}).get('enabled', True))
+        logging_config = self.config.get('logging', {})
+        configure_logging(
+            level=logging_config.get('level'),
+            file_path=logging_config.get('file_path'),
+            json_lines=logging_config.get('json', False),
+            rate_limit=logging_config.get('rate_limit')
+        )
         
     def load_config(self, config_path):
         """Load configuration file"""
@@ -23,7 +60,7 @@ class AIFirewall:
             logger.error(f"Error loading config: {e}")
             return {
                 'firewall': {'interface': 'eth0', 'max_packets_per_second': 10000},
-                'dashboard': {'port': 8080},
+                'dashboard': {'port': 8080, 'refresh_interval': 2},
                 'ml_model': {'confidence_threshold': 0.85}
             }
     
@@ -31,7 +68,13 @@ class AIFirewall:
         """Initialize the web dashboard"""
         try:
             from src.monitoring.dashboard import FirewallDashboard
-            self.dashboard = FirewallDashboard(port=self.config['dashboard']['port'])
+            self.dashboard = FirewallDashboard(
+                port=self.config['dashboard']['port'],
+                api_token=self.config['dashboard'].get('api_token'),
+                stream_interval=self.config['dashboard'].get('stream_interval', 1.0),
+                stream_heartbeat=self.config['dashboard'].get('stream_heartbeat', 15.0),
+                history_interval=self.config['dashboard'].get('history_interval', 1.0)
+            )
             
             # Start dashboard in a separate thread
             dashboard_thread = threading.Thread(target=self.dashboard.run)
@@ -46,90 +89,252 @@ class AIFirewall:
             return False
     
     def initialize_packet_capture(self):
-        """Initialize packet capture (simplified)"""
+        """Start capturing from the interface, or from a replay source"""
         try:
-            from src.network.packet_capture import PacketCapture
-            self.packet_capture = PacketCapture(
-                interface=self.config['firewall']['interface'],
-                max_pps=self.config['firewall']['max_packets_per_second']
-            )
+            from src.network.packet_capture import PacketCapture, ReplayCapture
+            firewall_config = self.config['firewall']
+            if self.replay:
+                source = self.replay
+                if source.startswith('synthetic:'):
+                    from src.network.traffic_generator import TrafficGenerator
+                    source = TrafficGenerator().generate_mix(int(source.split(':', 1)[1]))
+                self.packet_capture = ReplayCapture(
+                    source,
+                    max_pps=firewall_config['max_packets_per_second'],
+                    rate=self.rate or firewall_config['max_packets_per_second'],
+                    loop=self.loop
+                )
+            else:
+                self.packet_capture = PacketCapture(
+                    interface=firewall_config['interface'],
+                    max_pps=firewall_config['max_packets_per_second']
+                )
             self.packet_capture.start_capture()
+            if not self.packet_capture.is_capturing:
+                return False
             logger.info("Packet capture initialized")
             return True
         except Exception as e:
-            logger.warning(f"Packet capture failed: {e}. Using simulation mode.")
+            logger.error(f"Packet capture failed: {e}")
             return False
     
+    def initialize_models(self):
+        """Load the active models, bootstrapping them from synthetic traffic if none are trained"""
+        from src.ml_models.model_trainer import ModelTrainer
+        ml_config = self.config.get('ml_model', {})
+        trainer = self.trainer = ModelTrainer(ml_config.get('models_dir', 'data/models/'))
+        anomaly_detector, threat_classifier = trainer.load_models()
+        if anomaly_detector is not None and anomaly_detector.is_trained and threat_classifier.is_trained:
+            return anomaly_detector, threat_classifier
+        
+        logger.warning("No trained models found; training bootstrap models on synthetic traffic")
+        from src.network.packet_analyzer import PacketAnalyzer
+        from src.network.traffic_generator import TrafficGenerator
+        X, y = TrafficGenerator().training_set(
+            PacketAnalyzer(), window=self.config.get('pipeline', {}).get('window', 100)
+        )
+        anomaly_detector = trainer.train_anomaly_detector(X)
+        threat_classifier, _ = trainer.train_threat_classifier(X, y)
+        return anomaly_detector, threat_classifier
+    
+    def train_from_capture(self, pcap_path):
+        """Train a new anomaly detector version on a capture of normal traffic
+
+        Window features come through the DataManager feature cache, so
+        retraining on the same capture skips parsing it. A capture carries no
+        threat labels, so the threat classifier is left as it is.
+        """
+        from data_manager import DataManager
+        from src.ml_models.model_trainer import ModelTrainer
+        ml_config = self.config.get('ml_model', {})
+        models_dir = ml_config.get('models_dir', 'data/models/')
+        manager = DataManager(base_path=os.path.dirname(os.path.normpath(models_dir)) or '.')
+        X = manager.load_capture_features(pcap_path, window=self.config.get('pipeline', {}).get('window', 100))
+        if len(X) == 0:
+            logger.error(f"No complete traffic windows in {pcap_path}; nothing to train on")
+            return None
+        detector = ModelTrainer(models_dir).train_anomaly_detector(X)
+        stats = manager.feature_cache.get_stats()
+        logger.info(f"Trained on {len(X)} windows from {pcap_path} (feature cache: {stats['hits']} hits, "
+                    f"{stats['saved_s']:.2f}s saved)")
+        return detector
+    
+    def initialize_engine(self):
+        """Create the decision engine from the firewall settings"""
+        from src.network.firewall_engine import AIFirewallEngine
+        anomaly_detector, threat_classifier = self.initialize_models()
+        firewall_config = self.config['firewall']
+        self.engine = AIFirewallEngine(
+            anomaly_detector, threat_classifier,
+            backend=self.backend or firewall_config.get('enforcement_backend', 'ipset'),
+            block_duration=firewall_config.get('block_duration', 3600),
+            block_durations=firewall_config.get('block_durations'),
+            allowlist=firewall_config.get('allowlist'),
+            denylist=firewall_config.get('denylist'),
+            aggregation=firewall_config.get('aggregation'),
+            journal_path=None if self.simulated else firewall_config.get('state_path'),
+            confidence_threshold=self.config.get('ml_model', {}).get('confidence_threshold', 0.85)
+        )
+        self.packet_capture.set_filter(self.engine.fast_path.capture_filter)
+    
+    def initialize_drift(self):
+        """Compare live traffic with the training baseline, retraining the anomaly detector on lasting drift"""
+        drift_config = self.config.get('ml_model', {}).get('drift', {})
+        if not drift_config.get('enabled', True):
+            return None
+        try:
+            baseline = self.trainer.load_baseline()
+            if baseline is None:
+                logger.info("Active anomaly detector has no drift baseline; drift monitoring starts after a retrain")
+                return None
+            from src.ml_models.drift import DriftMonitor
+            settings = {key: drift_config[key] for key in (
+                'check_interval', 'min_samples', 'psi_threshold', 'ks_threshold', 'patience',
+                'min_retrain_interval', 'recent_samples') if key in drift_config}
+            self.drift_monitor = DriftMonitor(
+                baseline, score=lambda X: self.engine.anomaly_detector.decision_function(X),
+                retrain=self._retrain_on_drift, **settings
+            )
+            self.engine.drift_monitor = self.drift_monitor
+            self.dashboard.drift_monitor = self.drift_monitor
+            self.drift_monitor.start()
+            return self.drift_monitor
+        except Exception as e:
+            logger.error(f"Failed to start drift monitor: {e}")
+            return None
+    
+    def _retrain_on_drift(self, X):
+        """Train an anomaly detector on recent benign windows and swap it in; returns its baseline"""
+        detector = self.trainer.train_anomaly_detector(X)
+        if not detector.is_trained:
+            raise ValueError("Anomaly detector training failed")
+        self.engine.anomaly_detector = detector
+        return self.trainer.load_baseline()
+    
+    def initialize_alerts(self):
+        """Create the alert system, or None if it can't be loaded"""
+        try:
+            from src.monitoring.alert_system import AlertSystem
+            self.alert_system = AlertSystem(self.config.get('alerts', {}))
+            return self.alert_system
+        except Exception as e:
+            logger.error(f"Failed to initialize alerts: {e}")
+            return None
+    
+    def initialize_events(self):
+        """Open the threat event store, or None if it is disabled or can't be opened"""
+        events_config = self.config.get('events', {})
+        if not events_config.get('enabled', True):
+            return None
+        try:
+            from src.monitoring.event_store import EventStore
+            self.event_store = EventStore(
+                events_config.get('path', 'data/state/events.db'),
+                retention_days=events_config.get('retention_days', 30)
+            ).open()
+            self.dashboard.event_store = self.event_store
+            return self.event_store
+        except Exception as e:
+            logger.error(f"Failed to open event store: {e}")
+            return None
+    
+    def initialize_pipeline(self):
+        """Connect capture, feature extraction, inference and alerting"""
+        from src.network.pipeline import Pipeline
+        pipeline_config = self.config.get('pipeline', {})
+        self.pipeline = Pipeline(
+            self.packet_capture, self.engine,
+            alert_system=self.initialize_alerts(),
+            on_threat=self._on_threat,
+            window=pipeline_config.get('window', 100),
+            batch_size=pipeline_config.get('batch_size', 500),
+            queue_size=pipeline_config.get('queue_size', 64),
+            stages=pipeline_config.get('stages'),
+            transport=pipeline_config.get('transport', 'ring'),
+            ring_capacity=pipeline_config.get('ring_capacity', 32768),
+            ring_bytes=pipeline_config.get('ring_mb', 64) << 20,
+            event_store=self.initialize_events()
+        )
+        self.dashboard.pipeline = self.pipeline
+        self.pipeline.start()
+    
     def start(self):
         """Start the AI firewall"""
         logger.info("Starting AI Firewall...")
         
+        # Initialize packet capture first so traffic is buffered while the models load
+        if not self.initialize_packet_capture():
+            if self.replay or self.require_capture:
+                logger.error("Packet capture unavailable; run as root or pass --replay")
+                return
+            logger.warning("Packet capture unavailable; using simulation mode")
+            # Simulated attackers are only blocked in memory and never journaled
+            self.simulated = True
+            self.replay = f"synthetic:{SIMULATION_PACKETS}"
+            self.loop = True
+            self.backend = 'fake'
+            if not self.initialize_packet_capture():
+                return
+        logger.info(f"Capturing {time.time() - PROCESS_START:.2f}s after process start")
+        
+        # Load ML libraries while the dashboard comes up
+        from src.utils.helpers import preload_modules
+        preload_modules(HEAVY_MODULES)
+        
         # Initialize dashboard
         if not self.initialize_dashboard():
             logger.error("Dashboard failed to start")
             return
         
-        # Initialize packet capture (optional)
-        self.packet_capture_enabled = self.initialize_packet_capture()
+        self.initialize_engine()
+        self.initialize_drift()
+        self.initialize_pipeline()
         
-        logger.info(f"Monitoring interface: {self.config['firewall']['interface']}")
+        logger.info(f"Monitoring {self.replay or self.config['firewall']['interface']}")
         logger.info("AI Firewall is now running... Press Ctrl+C to stop")
         
         self.is_running = True
         self.start_time = time.time()
         self._main_loop()
     
+    def _on_threat(self, threat_type, confidence, source_ip):
+        """Report a newly alerted threat on the dashboard; the totals come from pipeline status"""
+        self.dashboard.update_stats(
+            packets_processed=self.packet_count,
+            threats_detected=self.threat_count,
+            ips_blocked=len(self.engine.blocked_ips),
+            activity=f"Threat Detected: {threat_type} from {source_ip} (confidence {confidence:.2f})"
+        )
+    
     def _main_loop(self):
-        """Main processing loop"""
-        last_update = time.time()
+        """Publish pipeline progress until stopped or the replay source is exhausted"""
+        refresh_interval = self.config['dashboard'].get('refresh_interval', 2)
+        last_log = time.time()
         
         while self.is_running:
             try:
-                current_time = time.time()
-                
-                # Simulate packet processing
-                if self.packet_capture_enabled:
-                    # Try to get real packets
-                    packets = self.packet_capture.get_packets(10)
-                    self.packet_count += len(packets)
-                else:
-                    # Simulate packet processing
-                    self.packet_count += random.randint(5, 20)
-                
-                # Simulate occasional threat detection
-                if random.random() < 0.02:  # 2% chance per iteration
-                    self.threat_count += 1
-                    threat_ip = f"192.168.1.{random.randint(1, 254)}"
-                    threat_type = random.choice(['Port Scan', 'DDoS', 'Brute Force', 'Suspicious Activity'])
-                    
-                    if threat_ip not in self.blocked_ips:
-                        self.blocked_ips.add(threat_ip)
-                    
-                    activity_msg = f"Threat Detected: {threat_type} from {threat_ip}"
-                    logger.warning(activity_msg)
-                    
-                    # Update dashboard
-                    self.dashboard.update_stats(
-                        packets_processed=self.packet_count,
-                        threats_detected=self.threat_count,
-                        ips_blocked=len(self.blocked_ips),
-                        activity=activity_msg
-                    )
+                if self.pipeline.join(refresh_interval):
+                    logger.info("Replay finished")
+                    self.stop()
+                    break
                 
-                # Update dashboard periodically
-                if current_time - last_update >= 2:  # Every 2 seconds
-                    self.dashboard.update_stats(
-                        packets_processed=self.packet_count,
-                        threats_detected=self.threat_count,
-                        ips_blocked=len(self.blocked_ips)
-                    )
-                    last_update = current_time
+                self.pipeline.supervise()
+                status = self.pipeline.status()
+                self.packet_count = status['packets_processed']
+                self.threat_count = status['threats']
+                self.dashboard.update_stats(
+                    packets_processed=self.packet_count,
+                    threats_detected=self.threat_count,
+                    ips_blocked=len(self.engine.blocked_ips)
+                )
                 
                 # Log progress every 30 seconds
-                if int(current_time) % 30 == 0:
-                    logger.info(f"Status: {self.packet_count} packets, {self.threat_count} threats, {len(self.blocked_ips)} IPs blocked")
-                
-                time.sleep(0.1)  # Small delay
+                if time.time() - last_log >= 30:
+                    last_log = time.time()
+                    depths = {name: stage['queue_depth'] for name, stage in status['stages'].items()}
+                    logger.info(f"Status: {self.packet_count} packets ({status['pps']:.0f} pps), "
+                               f"{self.threat_count} threats, {len(self.engine.blocked_ips)} IPs blocked, "
+                               f"queue depths {depths}")
                 
             except KeyboardInterrupt:
                 logger.info("Shutdown signal received")
@@ -141,15 +346,48 @@ class AIFirewall:
     def stop(self):
         """Stop the AI firewall"""
         logger.info("Stopping AI Firewall...")
-        if self.packet_capture_enabled:
-            self.packet_capture.stop_capture()
-        logger.info(f"Final stats: {self.packet_count} packets, {self.threat_count} threats, {len(self.blocked_ips)} IPs blocked")
         self.is_running = False
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            status = self.pipeline.status()
+            self.packet_count = status['packets_processed']
+            self.threat_count = status['threats']
+        elif self.packet_capture is not None:
+            self.packet_capture.stop_capture()
+        if self.drift_monitor is not None:
+            self.drift_monitor.stop()
+        blocked = 0
+        if self.engine is not None:
+            self.engine.shutdown()
+            blocked = len(self.engine.blocked_ips)
+        if self.event_store is not None:
+            self.event_store.close()
+        if self.alert_system is not None:
+            self.alert_system.close()
+        logger.info(f"Final stats: {self.packet_count} packets, {self.threat_count} threats, {blocked} IPs blocked")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI-driven firewall")
+    parser.add_argument('--config', default='config/config.yaml', help="Configuration file")
+    parser.add_argument('--replay', help="Replay a pcap file, or synthetic:N generated packets, instead of capturing")
+    parser.add_argument('--rate', type=float, help="Replay rate in pps (default: firewall.max_packets_per_second)")
+    parser.add_argument('--loop', action='store_true', help="Replay the source repeatedly")
+    parser.add_argument('--backend', help="Override firewall.enforcement_backend (e.g. fake for dry runs)")
+    parser.add_argument('--train-from', metavar='PCAP',
+                        help="Train a new anomaly detector on a capture of normal traffic, then exit")
+    parser.add_argument('--require-capture', action='store_true',
+                        help="Exit if live capture is unavailable instead of falling back to simulated traffic")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    firewall = AIFirewall()
+    args = parse_args()
+    firewall = AIFirewall(args.config, replay=args.replay, rate=args.rate, loop=args.loop,
+                          backend=args.backend, require_capture=args.require_capture)
     
     try:
-        firewall.start()
+        if args.train_from:
+            firewall.train_from_capture(args.train_from)
+        else:
+            firewall.start()
     except Exception as e:
         logger.error(f"Fatal error: {e}")
@@ -1,12 +1,12 @@
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class FeatureEngineer:
     def __init__(self):
+        from sklearn.preprocessing import StandardScaler
+        
         self.scaler = StandardScaler()
         self.is_fitted = False
         
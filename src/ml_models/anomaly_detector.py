@@ -1,7 +1,4 @@
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from sklearn.svm import OneClassSVM
-from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 from src.utils.logger import get_logger
@@ -10,6 +7,8 @@ logger = get_logger(__name__)
 
 class AnomalyDetector:
     def __init__(self, model_type='isolation_forest'):
+        from sklearn.preprocessing import StandardScaler
+        
         self.model_type = model_type
         self.model = None
         self.scaler = StandardScaler()
@@ -18,6 +17,7 @@ class AnomalyDetector:
     def build_model(self):
         """Build the anomaly detection model"""
         if self.model_type == 'isolation_forest':
+            from sklearn.ensemble import IsolationForest
             self.model = IsolationForest(
                 n_estimators=100,
                 contamination=0.1,
@@ -25,6 +25,7 @@ class AnomalyDetector:
                 n_jobs=6  # Use 6 cores
             )
         elif self.model_type == 'svm':
+            from sklearn.svm import OneClassSVM
             self.model = OneClassSVM(
                 kernel='rbf',
                 gamma='scale',
@@ -61,6 +62,13 @@ class AnomalyDetector:
         # Convert to binary (1: normal, -1: anomaly)
         return (predictions == -1).astype(int)
     
+    def decision_function(self, X):
+        """Anomaly scores; negative for the rows predict() flags"""
+        if not self.is_trained:
+            raise ValueError("Model not trained yet")
+        
+        return self.model.decision_function(self.scaler.transform(X))
+    
     def save_model(self, filepath):
         """Save trained model"""
         if self.is_trained:
@@ -70,10 +78,10 @@ class AnomalyDetector:
             }, filepath)
             logger.info(f"Model saved to {filepath}")
             
-    def load_model(self, filepath):
+    def load_model(self, filepath, mmap_mode=None):
         """Load trained model"""
         if os.path.exists(filepath):
-            data = joblib.load(filepath)
+            data = joblib.load(filepath, mmap_mode=mmap_mode)
             self.model = data['model']
             self.scaler = data['scaler']
             self.is_trained = True
@@ -1,8 +1,4 @@
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report
 import joblib
 from src.utils.logger import get_logger
 
@@ -10,6 +6,8 @@ logger = get_logger(__name__)
 
 class ThreatClassifier:
     def __init__(self, model_type='random_forest'):
+        from sklearn.preprocessing import StandardScaler
+        
         self.model_type = model_type
         self.model = None
         self.scaler = StandardScaler()
@@ -25,6 +23,7 @@ class ThreatClassifier:
     def build_model(self):
         """Build the threat classification model"""
         if self.model_type == 'random_forest':
+            from sklearn.ensemble import RandomForestClassifier
             self.model = RandomForestClassifier(
                 n_estimators=100,  # Reduced for faster training
                 max_depth=15,
@@ -32,6 +31,7 @@ class ThreatClassifier:
                 n_jobs=2
             )
         elif self.model_type == 'neural_network':
+            from sklearn.neural_network import MLPClassifier
             self.model = MLPClassifier(
                 hidden_layer_sizes=(50, 25),  # Reduced size
                 activation='relu',
@@ -83,10 +83,10 @@ class ThreatClassifier:
                 'threat_classes': self.threat_classes
             }, filepath)
             
-    def load_model(self, filepath):
+    def load_model(self, filepath, mmap_mode=None):
         """Load trained model"""
         try:
-            data = joblib.load(filepath)
+            data = joblib.load(filepath, mmap_mode=mmap_mode)
             self.model = data['model']
             self.scaler = data['scaler']
             self.threat_classes = data.get('threat_classes', self.threat_classes)
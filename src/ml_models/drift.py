@@ -0,0 +1,270 @@
+import threading
+import time
+import numpy as np
+from src.monitoring.metrics import get_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+# Floor for empty bins, so PSI stays finite
+EPSILON = 1e-4
+
+def psi(expected, actual):
+    """Population stability index between two sets of bin proportions (last axis)"""
+    expected = np.maximum(expected, EPSILON)
+    actual = np.maximum(actual, EPSILON)
+    return np.sum((actual - expected) * np.log(actual / expected), axis=-1)
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance between two binned distributions"""
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+def _proportions(counts):
+    totals = counts.sum(axis=-1, keepdims=True)
+    return counts / np.maximum(totals, 1)
+
+class DriftBaseline:
+    """Training-time distributions of each feature and of the anomaly score
+
+    Bins are cut at the training quantiles, so each holds about the same
+    share of the training data; features with repeated values get fewer,
+    wider bins. Small enough to keep in the model registry entry.
+    """
+
+    def __init__(self, cuts, expected, score_cuts, score_expected, n_samples):
+        self.cuts = [np.asarray(feature_cuts, dtype=np.float64) for feature_cuts in cuts]
+        self.expected = np.asarray(expected, dtype=np.float64)  # (features, bins), padded with zeros
+        self.score_cuts = np.asarray(score_cuts, dtype=np.float64)
+        self.score_expected = np.asarray(score_expected, dtype=np.float64)
+        self.n_samples = n_samples
+
+    @property
+    def n_features(self):
+        return len(self.cuts)
+
+    @property
+    def n_bins(self):
+        return self.expected.shape[1]
+
+    @classmethod
+    def fit(cls, X, scores, bins=10):
+        X = np.asarray(X, dtype=np.float64)
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        cuts = [np.unique(np.quantile(X[:, feature], quantiles)) for feature in range(X.shape[1])]
+        score_cuts = np.unique(np.quantile(scores, quantiles))
+        baseline = cls(cuts, np.zeros((X.shape[1], bins)), score_cuts, np.zeros(bins), len(X))
+        baseline.expected = _proportions(baseline.feature_counts(X))
+        baseline.score_expected = _proportions(baseline.score_counts(scores))
+        return baseline
+
+    def feature_counts(self, X):
+        """Per-feature bin counts of a batch, as a (features, bins) array"""
+        X = np.asarray(X, dtype=np.float64)
+        n_bins = self.n_bins
+        flat = np.empty(X.shape, dtype=np.int64)
+        for feature, feature_cuts in enumerate(self.cuts):
+            flat[:, feature] = np.searchsorted(feature_cuts, X[:, feature], side='left') + feature * n_bins
+        return np.bincount(flat.ravel(), minlength=self.n_features * n_bins).reshape(self.n_features, n_bins)
+
+    def score_counts(self, scores):
+        bins = np.searchsorted(self.score_cuts, np.asarray(scores, dtype=np.float64), side='left')
+        return np.bincount(bins, minlength=len(self.score_expected))
+
+    def to_dict(self):
+        return {
+            'cuts': [feature_cuts.tolist() for feature_cuts in self.cuts],
+            'expected': self.expected.round(6).tolist(),
+            'score_cuts': self.score_cuts.tolist(),
+            'score_expected': self.score_expected.round(6).tolist(),
+            'n_samples': self.n_samples
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['cuts'], data['expected'], data['score_cuts'], data['score_expected'], data['n_samples'])
+
+class DriftMonitor:
+    """Streaming comparison of live traffic with the models' training baseline
+
+    observe() folds each scored batch into per-feature histograms on the
+    baseline's bins (a searchsorted and a bincount, no per-row Python) and
+    keeps the most recent windows judged benign. Every check_interval the
+    histograms are compared with the baseline: PSI per feature, and PSI
+    and KS for the anomaly scores of the recent windows under the current
+    model. Counts then decay by half, so each check mostly reflects traffic
+    since the one before.
+
+    Drift has to last patience consecutive checks before retrain(recent
+    benign windows) is called, on its own thread and at most once per
+    min_retrain_interval; a short attack wave doesn't retrain the model
+    into accepting it. retrain returns the new model's baseline.
+    """
+
+    def __init__(self, baseline, score=None, retrain=None, check_interval=300, min_samples=5000,
+                 psi_threshold=0.25, ks_threshold=0.2, patience=2, min_retrain_interval=3600,
+                 recent_samples=20000, decay=0.5, clock=time.time):
+        self.score = score
+        self.retrain = retrain
+        self.check_interval = check_interval
+        self.min_samples = min_samples
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.patience = patience
+        self.min_retrain_interval = min_retrain_interval
+        self.recent_samples = recent_samples
+        self.decay = decay
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.last_report = None
+        self.drifting_checks = 0
+        self.last_retrain = float('-inf')
+        self.retrains = 0
+        self._retrain_thread = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.set_baseline(baseline)
+
+    def set_baseline(self, baseline):
+        """Compare against a new baseline from now on, forgetting what was observed"""
+        with self.lock:
+            self.baseline = baseline
+            self.counts = np.zeros((baseline.n_features, baseline.n_bins))
+            self.recent = np.empty((self.recent_samples, baseline.n_features))
+            self.recent_count = 0
+            self.recent_next = 0
+            self.drifting_checks = 0
+
+    def observe(self, X, is_anomaly=None):
+        """Fold a scored batch of feature rows into the live histograms"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.baseline.n_features or not len(X):
+            return
+        counts = self.baseline.feature_counts(X)
+        benign = X if is_anomaly is None else X[np.asarray(is_anomaly) == 0]
+        with self.lock:
+            self.counts += counts
+            # Ring of the latest benign windows, the training set for a retrain
+            for start in range(0, len(benign), self.recent_samples):
+                chunk = benign[start:start + self.recent_samples]
+                end = self.recent_next + len(chunk)
+                if end <= self.recent_samples:
+                    self.recent[self.recent_next:end] = chunk
+                else:
+                    split = self.recent_samples - self.recent_next
+                    self.recent[self.recent_next:] = chunk[:split]
+                    self.recent[:end - self.recent_samples] = chunk[split:]
+                self.recent_next = end % self.recent_samples
+                self.recent_count = min(self.recent_count + len(chunk), self.recent_samples)
+
+    def recent_windows(self):
+        """The retained benign windows, oldest first"""
+        with self.lock:
+            if self.recent_count < self.recent_samples:
+                return self.recent[:self.recent_count].copy()
+            return np.concatenate([self.recent[self.recent_next:], self.recent[:self.recent_next]])
+
+    def check(self):
+        """Compare the live distributions with the baseline; returns the report, or None if too few samples"""
+        with self.lock:
+            baseline = self.baseline
+            samples = float(self.counts[0].sum()) if baseline.n_features else 0.0
+            if samples < self.min_samples:
+                return None
+            feature_psi = psi(baseline.expected, _proportions(self.counts))
+            self.counts *= self.decay
+        recent = self.recent_windows()
+
+        report = {
+            'time': self.clock(),
+            'samples': int(samples),
+            'feature_psi': [round(float(value), 4) for value in feature_psi],
+            'max_feature_psi': round(float(feature_psi.max()), 4),
+            'drifted_features': [int(feature) for feature in np.flatnonzero(feature_psi > self.psi_threshold)],
+            'score_psi': None,
+            'score_ks': None
+        }
+        if self.score is not None and len(recent):
+            actual = _proportions(baseline.score_counts(self.score(recent)))
+            report['score_psi'] = round(float(psi(baseline.score_expected, actual)), 4)
+            report['score_ks'] = round(ks(baseline.score_expected, actual), 4)
+        report['drift'] = bool(report['drifted_features']) or (
+            report['score_ks'] is not None and report['score_ks'] > self.ks_threshold)
+
+        metrics.inc('drift_checks')
+        metrics.set_gauge('drift_feature_psi_max', report['max_feature_psi'])
+        if report['score_ks'] is not None:
+            metrics.set_gauge('drift_score_psi', report['score_psi'])
+            metrics.set_gauge('drift_score_ks', report['score_ks'])
+
+        with self.lock:
+            self.drifting_checks = self.drifting_checks + 1 if report['drift'] else 0
+            report['drifting_checks'] = self.drifting_checks
+            self.last_report = report
+        if report['drift']:
+            logger.warning(f"Drift detected ({self.drifting_checks}/{self.patience} checks): max feature PSI "
+                           f"{report['max_feature_psi']} on features {report['drifted_features']}, "
+                           f"score KS {report['score_ks']}")
+            if self.drifting_checks >= self.patience:
+                self._start_retrain(recent)
+        return report
+
+    def _start_retrain(self, recent):
+        now = self.clock()
+        if self.retrain is None or now - self.last_retrain < self.min_retrain_interval:
+            return False
+        if self._retrain_thread is not None and self._retrain_thread.is_alive():
+            return False
+        if len(recent) < self.min_samples:
+            logger.info(f"Drift persists but only {len(recent)} benign windows are kept; not retraining yet")
+            return False
+        self.last_retrain = now
+        self._retrain_thread = threading.Thread(target=self._retrain, args=(recent,), name='drift-retrain',
+                                                daemon=True)
+        self._retrain_thread.start()
+        return True
+
+    def _retrain(self, recent):
+        logger.info(f"Retraining on {len(recent)} recent windows after sustained drift")
+        try:
+            with metrics.timer('drift_retrain'):
+                baseline = self.retrain(recent)
+        except Exception as e:
+            logger.error(f"Error retraining after drift: {e}")
+            return
+        self.retrains += 1
+        metrics.inc('drift_retrains')
+        if baseline is not None:
+            self.set_baseline(baseline)
+
+    def wait_for_retrain(self, timeout=None):
+        thread = self._retrain_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='drift-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking drift: {e}")
+
+    def status(self):
+        """The latest drift report, plus how many retrains drift has triggered; served by /api/drift"""
+        with self.lock:
+            report = dict(self.last_report) if self.last_report else {}
+        return {**report, 'retrains': self.retrains,
+                'retraining': self._retrain_thread is not None and self._retrain_thread.is_alive()}
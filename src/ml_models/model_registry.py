@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from threading import Lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class ModelRegistry:
+    """On-disk manifest of versioned model artifacts"""
+
+    MANIFEST_NAME = "registry.json"
+
+    def __init__(self, models_dir="data/models/"):
+        self.models_dir = models_dir
+        self.manifest_path = os.path.join(models_dir, self.MANIFEST_NAME)
+        self.lock = Lock()
+        self._manifest_mtime = None
+        self._reserved = {}  # name -> versions handed out but not yet registered
+        os.makedirs(models_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        """Read the manifest from disk, or start an empty one"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+            return manifest
+        except FileNotFoundError:
+            return {'models': {}}
+        except Exception as e:
+            logger.error(f"Error reading model manifest: {e}")
+            return {'models': {}}
+
+    def _refresh(self):
+        """Re-read the manifest if another process has rewritten it"""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            self.manifest = self._read_manifest()
+
+    def _write_manifest(self):
+        """Atomically replace the manifest on disk"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def artifact_path(self, name, version):
+        """Path of the artifact for a model version"""
+        return os.path.join(self.models_dir, name, f"v{version}.joblib")
+
+    def next_version(self, name):
+        """Next free version number for a model"""
+        with self.lock:
+            self._refresh()
+            versions = self.manifest['models'].get(name, {}).get('versions', {})
+            return max((int(v) for v in versions), default=0) + 1
+
+    def new_artifact_path(self, name):
+        """Reserve the next version of a model and return its path"""
+        with self.lock:
+            self._refresh()
+            reserved = self._reserved.setdefault(name, set())
+            versions = self.manifest['models'].get(name, {}).get('versions', {})
+            version = max([int(v) for v in versions] + list(reserved), default=0) + 1
+            # Skip artifacts another process is still writing
+            while os.path.exists(self.artifact_path(name, version)):
+                version += 1
+            reserved.add(version)
+        filepath = self.artifact_path(name, version)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        return version, filepath
+
+    def release(self, name, version):
+        """Give back a reserved version whose artifact was never written"""
+        with self.lock:
+            self._reserved.get(name, set()).discard(version)
+
+    def save(self, name, payload, feature_spec=None, metrics=None, activate=True):
+        """Dump a payload as a new version and register it"""
+        import joblib
+
+        version, filepath = self.new_artifact_path(name)
+
+        # Uncompressed dumps keep numpy arrays memory-mappable on load
+        joblib.dump(payload, filepath)
+        return self.register(name, filepath, feature_spec, metrics, version, activate)
+
+    def register(self, name, filepath, feature_spec=None, metrics=None,
+                 version=None, activate=True):
+        """Record an artifact already written to disk"""
+        checksum, size = _file_checksum(filepath)
+
+        with self.lock:
+            self._refresh()
+            model = self.manifest['models'].setdefault(name, {'active': None, 'versions': {}})
+            if version is None:
+                version = max((int(v) for v in model['versions']), default=0) + 1
+
+            entry = {
+                'name': name,
+                'version': version,
+                'path': filepath,
+                'feature_spec': feature_spec or {},
+                'metrics': metrics or {},
+                'checksum': checksum,
+                'size': size,
+                'saved': datetime.now().isoformat()
+            }
+            model['versions'][str(version)] = entry
+            self._reserved.get(name, set()).discard(version)
+            if activate or model['active'] is None:
+                model['active'] = version
+            self._write_manifest()
+
+        logger.info(f"Registered model {name} v{version} ({size} bytes)")
+        return entry
+
+    def set_active(self, name, version):
+        """Select the version returned by default for a model"""
+        with self.lock:
+            self._refresh()
+            model = self.manifest['models'].get(name)
+            if model is None or str(version) not in model['versions']:
+                raise ValueError(f"Unknown model version: {name} v{version}")
+            model['active'] = int(version)
+            self._write_manifest()
+        logger.info(f"Active version of {name} set to v{version}")
+
+    def get_entry(self, name, version=None):
+        """Manifest entry for a version, or the active one"""
+        with self.lock:
+            self._refresh()
+            model = self.manifest['models'].get(name)
+            if model is None:
+                return None
+            if version is None:
+                version = model['active']
+            entry = model['versions'].get(str(version))
+            return dict(entry) if entry else None
+
+    def load(self, name, version=None, mmap_mode='r', verify=False):
+        """Load an artifact, memory-mapping its large arrays"""
+        import joblib
+
+        entry = self.get_entry(name, version)
+        if entry is None:
+            raise KeyError(f"Model not registered: {name}")
+
+        if verify:
+            checksum, _ = _file_checksum(entry['path'])
+            if checksum != entry['checksum']:
+                raise ValueError(f"Checksum mismatch for {name} v{entry['version']}")
+
+        start = time.perf_counter()
+        payload = joblib.load(entry['path'], mmap_mode=mmap_mode)
+        logger.info(f"Loaded {name} v{entry['version']} in "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return payload, entry
+
+    def list_models(self):
+        """List every registered version"""
+        with self.lock:
+            self._refresh()
+            models = []
+            for name, model in self.manifest['models'].items():
+                for entry in model['versions'].values():
+                    models.append({**entry, 'active': entry['version'] == model['active']})
+            return models
+
+    def total_size(self):
+        """Total size of registered artifacts in bytes"""
+        return sum(entry['size'] for entry in self.list_models())
+
+def _file_checksum(filepath, chunk_size=1 << 20):
+    """SHA-256 and size of a file"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
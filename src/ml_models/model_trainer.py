@@ -1,9 +1,7 @@
 import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import joblib
 import os
+from src.ml_models.drift import DriftBaseline
+from src.ml_models.model_registry import ModelRegistry
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -12,6 +10,7 @@ class ModelTrainer:
     def __init__(self, models_dir="data/models/"):
         self.models_dir = models_dir
         os.makedirs(models_dir, exist_ok=True)
+        self.registry = ModelRegistry(models_dir)
         
     def train_anomaly_detector(self, X, model_type='isolation_forest'):
         """Train anomaly detection model"""
@@ -21,15 +20,32 @@ class ModelTrainer:
         detector.build_model()
         detector.train(X)
         
+        # Feature and score distributions the drift monitor compares live traffic with
+        feature_spec = {'n_features': int(np.shape(X)[1])}
+        if detector.is_trained:
+            feature_spec['drift_baseline'] = DriftBaseline.fit(X, detector.decision_function(X)).to_dict()
+        
         # Save model
-        model_path = f"{self.models_dir}/anomaly_detector_{model_type}.pkl"
+        name = f"anomaly_detector_{model_type}"
+        version, model_path = self.registry.new_artifact_path(name)
         detector.save_model(model_path)
+        if not (detector.is_trained and os.path.exists(model_path)):
+            self.registry.release(name, version)
+            logger.error("Anomaly detector training failed; nothing registered")
+            return detector
+        self.registry.register(
+            name, model_path, version=version,
+            feature_spec=feature_spec,
+            metrics={'n_samples': len(X)}
+        )
         
         logger.info(f"Anomaly detector trained and saved to {model_path}")
         return detector
         
     def train_threat_classifier(self, X, y, model_type='random_forest'):
         """Train threat classification model"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
         from src.ml_models.classifier import ThreatClassifier
         
         # Split data
@@ -49,23 +65,38 @@ class ModelTrainer:
         logger.info(f"Classification Report:\n{classification_report(y_test, y_pred)}")
         
         # Save model
-        model_path = f"{self.models_dir}/threat_classifier_{model_type}.pkl"
+        name = f"threat_classifier_{model_type}"
+        version, model_path = self.registry.new_artifact_path(name)
         classifier.save_model(model_path)
+        if not (classifier.is_trained and os.path.exists(model_path)):
+            self.registry.release(name, version)
+            logger.error("Threat classifier training failed; nothing registered")
+            return classifier, accuracy
+        self.registry.register(
+            name, model_path, version=version,
+            feature_spec={'n_features': int(np.shape(X)[1])},
+            metrics={'accuracy': float(accuracy), 'n_samples': len(X)}
+        )
         
         logger.info(f"Threat classifier trained and saved to {model_path}")
         return classifier, accuracy
         
-    def load_models(self):
-        """Load pre-trained models"""
+    def load_models(self, anomaly_type='isolation_forest', classifier_type='random_forest',
+                    mmap_mode='r'):
+        """Load the active versions of the pre-trained models"""
         try:
             from src.ml_models.anomaly_detector import AnomalyDetector
             from src.ml_models.classifier import ThreatClassifier
             
-            anomaly_detector = AnomalyDetector()
-            anomaly_detector.load_model(f"{self.models_dir}/anomaly_detector_isolation_forest.pkl")
+            anomaly_detector = AnomalyDetector(model_type=anomaly_type)
+            anomaly_detector.load_model(
+                self._model_path(f"anomaly_detector_{anomaly_type}"), mmap_mode=mmap_mode
+            )
             
-            threat_classifier = ThreatClassifier()
-            threat_classifier.load_model(f"{self.models_dir}/threat_classifier_random_forest.pkl")
+            threat_classifier = ThreatClassifier(model_type=classifier_type)
+            threat_classifier.load_model(
+                self._model_path(f"threat_classifier_{classifier_type}"), mmap_mode=mmap_mode
+            )
             
             logger.info("Models loaded successfully")
             return anomaly_detector, threat_classifier
@@ -74,8 +105,23 @@ class ModelTrainer:
             logger.error(f"Error loading models: {e}")
             return None, None
             
+    def load_baseline(self, anomaly_type='isolation_forest'):
+        """Drift baseline saved with the active anomaly detector, or None for models trained without one"""
+        entry = self.registry.get_entry(f"anomaly_detector_{anomaly_type}")
+        baseline = entry and entry['feature_spec'].get('drift_baseline')
+        return DriftBaseline.from_dict(baseline) if baseline else None
+            
+    def _model_path(self, name):
+        """Artifact path of the active version, or the legacy pickle"""
+        entry = self.registry.get_entry(name)
+        if entry is not None:
+            return entry['path']
+        return f"{self.models_dir}/{name}.pkl"
+            
     def evaluate_model_performance(self, model, X_test, y_test):
         """Evaluate model performance comprehensively"""
+        from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+        
         predictions, probabilities = model.predict(X_test)
         
         metrics = {
@@ -0,0 +1,311 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from src.monitoring.metrics import Histogram, bucket_index, get_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+class AlertSink:
+    """Somewhere alerts are delivered; deliver() raises on failure so the caller can retry"""
+
+    name = 'sink'
+
+    def deliver(self, alert):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class WebhookSink(AlertSink):
+    """POSTs each alert as JSON to a URL"""
+
+    def __init__(self, url, timeout=5.0, headers=None, name='webhook'):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.name = name
+
+    def deliver(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert, default=str).encode(),
+                                         headers=self.headers, method='POST')
+        # Raises HTTPError for 4xx and 5xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class SyslogSink(AlertSink):
+    """Sends each alert as an RFC 5424 syslog message over UDP or TCP
+
+    TCP messages are newline-framed (RFC 6587) on one connection, which is
+    reopened after an error.
+    """
+
+    FACILITIES = {'auth': 4, 'authpriv': 10, 'daemon': 3, 'user': 1,
+                  **{f'local{index}': 16 + index for index in range(8)}}
+    WARNING = 4
+
+    def __init__(self, host='127.0.0.1', port=514, protocol='udp', facility='local0', timeout=5.0,
+                 app_name='ai-firewall', name='syslog'):
+        if protocol not in ('udp', 'tcp'):
+            raise ValueError(f"Unknown syslog protocol {protocol}; expected udp or tcp")
+        self.address = (host, port)
+        self.protocol = protocol
+        self.priority = self.FACILITIES[facility] * 8 + self.WARNING
+        self.timeout = timeout
+        self.app_name = app_name
+        self.name = name
+        self.hostname = socket.gethostname()
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def format(self, alert):
+        timestamp = datetime.fromtimestamp(alert['timestamp'], timezone.utc).isoformat(timespec='milliseconds')
+        message = (f"SECURITY ALERT {alert['threat_type']} from {alert['source_ip']} "
+                   f"confidence={alert['confidence']:.2f}")
+        return f"<{self.priority}>1 {timestamp} {self.hostname} {self.app_name} {os.getpid()} - - {message}"
+
+    def deliver(self, alert):
+        data = self.format(alert).encode()
+        with self.lock:
+            if self.sock is None:
+                if self.protocol == 'udp':
+                    self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                else:
+                    self.sock = socket.create_connection(self.address, timeout=self.timeout)
+                self.sock.settimeout(self.timeout)
+            try:
+                if self.protocol == 'udp':
+                    self.sock.sendto(data, self.address)
+                else:
+                    self.sock.sendall(data + b'\n')
+            except OSError:
+                self.sock.close()
+                self.sock = None
+                raise
+
+    def close(self):
+        with self.lock:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+class JSONLSink(AlertSink):
+    """Appends each alert as one JSON line to a local file"""
+
+    def __init__(self, path, name='jsonl'):
+        self.path = path
+        self.name = name
+        self.file = None
+        self.lock = threading.Lock()
+
+    def deliver(self, alert):
+        line = json.dumps(alert, default=str) + '\n'
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, 'a')
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+SINK_TYPES = {'webhook': WebhookSink, 'syslog': SyslogSink, 'jsonl': JSONLSink}
+
+def create_sink(config):
+    """Sink from a config entry: its type plus that sink's own arguments"""
+    config = dict(config)
+    sink_type = config.pop('type')
+    if sink_type not in SINK_TYPES:
+        raise ValueError(f"Unknown alert sink {sink_type}; expected one of {', '.join(SINK_TYPES)}")
+    config.setdefault('name', sink_type)
+    return SINK_TYPES[sink_type](**config)
+
+class CircuitBreaker:
+    """Fails fast after failure_threshold consecutive failures
+
+    Once open, calls are refused for reset_timeout seconds; then one trial
+    call goes through (half open), closing the breaker if it succeeds and
+    reopening it if it fails.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return self.state == 'closed'
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+_STOP = object()
+
+class SinkRunner:
+    """One sink's bounded queue and worker threads, with retries and a circuit breaker"""
+
+    def __init__(self, sink, workers=1, queue_size=1000, retries=3, backoff=0.5, max_backoff=10.0,
+                 breaker=None):
+        self.sink = sink
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.queue = queue.Queue(queue_size)
+        self.latency = Histogram()
+        self.counts = {'delivered': 0, 'failed': 0, 'retried': 0, 'dropped': 0, 'short_circuited': 0}
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f'alert-sink-{sink.name}-{index}', daemon=True)
+                         for index in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+        metrics.inc(f'alert_sink_{name}')
+
+    def submit(self, alert):
+        """Queue an alert for delivery; returns False if the queue was full"""
+        try:
+            self.queue.put_nowait((time.perf_counter_ns(), alert))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._deliver(*job)
+            except Exception as e:
+                logger.error(f"Error in alert sink {self.sink.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, queued_ns, alert):
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                self._count('short_circuited')
+                return
+            try:
+                self.sink.deliver(alert)
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt == self.retries or self._stop_event.is_set():
+                    self._count('failed')
+                    logger.error(f"Alert sink {self.sink.name} failed after {attempt + 1} attempts: {e}")
+                    return
+                self._count('retried')
+                self._stop_event.wait(min(self.backoff * (1 << attempt), self.max_backoff))
+                continue
+            self.breaker.record_success()
+            # From submit() to delivered, so queueing and retries count too
+            elapsed = time.perf_counter_ns() - queued_ns
+            with self.lock:
+                self.latency.counts[bucket_index(elapsed)] += 1
+                self.latency.total_ns += elapsed
+            metrics.observe_ns(f'alert_sink_{self.sink.name}', elapsed)
+            self._count('delivered')
+            return
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+            latency = {f'p{q}_ms': round(self.latency.percentile(q) * 1000, 3) for q in (50, 99)}
+        return {**counts, 'queued': self.queue.qsize(), 'breaker': self.breaker.state, 'latency': latency}
+
+    def close(self, timeout=5.0):
+        """Stop once the queue drains; pending retries give up instead of waiting out their backoff"""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self.queue.put(_STOP, timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0.01))
+        self.sink.close()
+
+class AlertDispatcher:
+    """Fans alerts out to every sink without waiting on any of them
+
+    Each sink has its own queue and workers, so a slow or failing sink only
+    delays its own deliveries; when its queue is full further alerts for it
+    are dropped and counted.
+    """
+
+    def __init__(self, sinks, workers=1, queue_size=1000, retries=3, backoff=0.5, max_backoff=10.0,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.runners = [
+            SinkRunner(sink, workers, queue_size, retries, backoff, max_backoff,
+                       CircuitBreaker(failure_threshold, reset_timeout))
+            for sink in sinks
+        ]
+
+    @classmethod
+    def from_config(cls, config):
+        """Dispatcher for the alerts.sinks config section, or None when no sinks are listed"""
+        sinks = [create_sink(entry) for entry in config.get('sinks') or []]
+        if not sinks:
+            return None
+        settings = {key: config[key] for key in ('workers', 'queue_size', 'retries', 'backoff', 'max_backoff',
+                                                 'failure_threshold', 'reset_timeout') if key in config}
+        logger.info(f"Alert sinks: {', '.join(sink.name for sink in sinks)}")
+        return cls(sinks, **settings)
+
+    def dispatch(self, alert):
+        for runner in self.runners:
+            runner.submit(alert)
+
+    def flush(self, timeout=10.0):
+        """Wait until every queued alert has been delivered or given up on"""
+        deadline = time.monotonic() + timeout
+        for runner in self.runners:
+            with runner.queue.all_tasks_done:
+                if not runner.queue.all_tasks_done.wait_for(lambda: not runner.queue.unfinished_tasks,
+                                                            max(deadline - time.monotonic(), 0)):
+                    return False
+        return True
+
+    def stats(self):
+        """Delivery counts, breaker state and delivery latency by sink"""
+        return {runner.sink.name: runner.stats() for runner in self.runners}
+
+    def close(self, timeout=5.0):
+        for runner in self.runners:
+            runner.close(timeout)
@@ -1,33 +1,166 @@
 import smtplib
-from email.mime.text import MimeText
+import threading
+import time
+from collections import deque
+from email.mime.text import MIMEText
 from datetime import datetime
+from src.monitoring.alert_sinks import AlertDispatcher
+from src.monitoring.metrics import get_metrics
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
+metrics = get_metrics()
+
+class SMTPSender:
+    """One SMTP session reused for every message, reopened when the server has dropped it"""
+
+    def __init__(self, host, port=587, user=None, password=None, starttls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.server = None
+        self.connections = 0
+
+    def _open(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connections += 1
+        metrics.inc('smtp_connections')
+
+    def send(self, message):
+        """Send over the open session, reconnecting once if it fails"""
+        for attempt in range(2):
+            if self.server is None:
+                self._open()
+            try:
+                self.server.send_message(message)
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                # Servers close idle sessions; the first failure is usually just that
+                self.close()
+                if attempt:
+                    raise
+                logger.info(f"SMTP session to {self.host} lost ({e}); reconnecting")
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
 
 class AlertSystem:
-    def __init__(self, config):
+    """Logs security alerts, emails them in periodic digests and fans them out to sinks
+
+    Repeats of the same (source, threat type) within dedupe_window are
+    counted against the first alert instead of raising new ones, and those
+    arriving after its digest went out are counted in the next one. Email
+    alerts collect into a digest that a background thread sends every
+    digest_interval seconds over one reused SMTP session; the webhook,
+    syslog and file sinks each deliver from their own queue. Either way
+    send_alert never waits on a remote server.
+    """
+
+    def __init__(self, config, sender=None, dispatcher=None):
         self.config = config
-        self.alert_history = []
-        
-    def send_alert(self, threat_type, confidence, source_ip, details):
-        """Send security alert"""
-        alert_message = self._create_alert_message(threat_type, confidence, source_ip, details)
-        
-        # Log alert
-        self._log_alert(alert_message)
-        
-        # Send email alert if configured
-        if self.config.get('email_alerts', {}).get('enabled', False):
-            self._send_email_alert(alert_message)
-            
-        # Could integrate with other alert systems (Slack, SMS, etc.)
+        # Last 1000 alerts; the event store keeps the full history
+        self.alert_history = deque(maxlen=1000)
+        self.dedupe_window = config.get('dedupe_window', 300)
+        self.digest_interval = config.get('digest_interval', 60)
+        self.max_digest_lines = config.get('max_digest_lines', 100)
+        self.last_raised = {}  # (source, threat type) -> when it last raised an alert
+        self.pending = {}      # (source, threat type) -> digest entry
+        self.counts = {'raised': 0, 'deduplicated': 0, 'emails_sent': 0, 'emails_failed': 0}
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        email_config = config.get('email_alerts', {})
+        self.email_enabled = email_config.get('enabled', False)
+        self.sender = sender
+        if self.email_enabled:
+            if self.sender is None:
+                self.sender = SMTPSender(
+                    email_config['smtp_server'], email_config.get('smtp_port', 587),
+                    email_config.get('smtp_user'), email_config.get('smtp_password'),
+                    starttls=email_config.get('starttls', True)
+                )
+            self.start()
+        self.dispatcher = dispatcher or AlertDispatcher.from_config(config)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-digest', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Send what is still pending and end the SMTP session"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.email_enabled:
+            self.flush()
+        if self.sender is not None:
+            self.sender.close()
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+
+    def send_alert(self, threat_type, confidence, source_ip, details, now=None):
+        """Raise a security alert; returns False if it repeated a recent one"""
+        now = time.time() if now is None else now
+        key = (source_ip, threat_type)
+        with metrics.timer('alerting'), self.lock:
+            self.counts['raised'] += 1
+            metrics.inc('alerts_raised')
+            repeat = now - self.last_raised.get(key, float('-inf')) < self.dedupe_window
+            entry = self.pending.get(key)
+            if entry is not None:
+                entry['count'] += 1
+                entry['last_seen'] = now
+                entry['confidence'] = max(entry['confidence'], confidence)
+            elif self.email_enabled:
+                # A repeat of an alert an earlier digest already reported still counts in the next one
+                self.pending[key] = {'threat_type': threat_type, 'source_ip': source_ip,
+                                     'confidence': confidence, 'details': details,
+                                     'first_seen': now, 'last_seen': now, 'count': 1, 'continued': repeat}
+            if repeat:
+                self.counts['deduplicated'] += 1
+                metrics.inc('alerts_deduplicated')
+                return False
+            self.last_raised[key] = now
+            if len(self.last_raised) > 100000:
+                self.last_raised = {seen_key: seen for seen_key, seen in self.last_raised.items()
+                                    if now - seen < self.dedupe_window}
+
+            alert_message = self._create_alert_message(threat_type, confidence, source_ip, details)
+            self._log_alert(alert_message)
+
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch({'timestamp': now, 'threat_type': threat_type, 'confidence': confidence,
+                                      'source_ip': source_ip, 'details': details})
         logger.warning(f"SECURITY ALERT: {alert_message}")
-        
+        return True
+
     def _create_alert_message(self, threat_type, confidence, source_ip, details):
         """Create formatted alert message"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
+
         message = f"""
         SECURITY ALERT - AI Firewall
         Timestamp: {timestamp}
@@ -37,9 +170,9 @@ class AlertSystem:
         Details: {details}
         Action Taken: Source IP blocked automatically
         """
-        
+
         return message
-        
+
     def _log_alert(self, alert_message):
         """Log alert to history"""
         alert_record = {
@@ -48,35 +181,91 @@ class AlertSystem:
             'acknowledged': False
         }
         self.alert_history.append(alert_record)
-        
-        # Keep only last 1000 alerts
-        if len(self.alert_history) > 1000:
-            self.alert_history = self.alert_history[-1000:]
-            
-    def _send_email_alert(self, message):
-        """Send email alert"""
+
+    def _create_digest(self, entries):
+        """One email covering every pending alert, most repeated first"""
+        email_config = self.config['email_alerts']
+        entries = sorted(entries, key=lambda entry: entry['count'], reverse=True)
+        if len(entries) == 1:
+            entry = entries[0]
+            subject = f"AI Firewall Security Alert: {entry['threat_type']} from {entry['source_ip']}"
+            body = self._create_alert_message(entry['threat_type'], entry['confidence'],
+                                              entry['source_ip'], entry['details'])
+            if entry['continued']:
+                body += f"Repeated {entry['count']} more times since the last digest\n"
+            elif entry['count'] > 1:
+                body += f"Repeated {entry['count']} times\n"
+        else:
+            sources = len({entry['source_ip'] for entry in entries})
+            subject = f"AI Firewall Security Alert: {len(entries)} threats from {sources} sources"
+            lines = ["SECURITY ALERT DIGEST - AI Firewall", ""]
+            for entry in entries[:self.max_digest_lines]:
+                first = datetime.fromtimestamp(entry['first_seen']).strftime('%H:%M:%S')
+                last = datetime.fromtimestamp(entry['last_seen']).strftime('%H:%M:%S')
+                lines.append(f"{entry['threat_type']:12s} {entry['source_ip']:40s} x{entry['count']:<6d} "
+                             f"confidence {entry['confidence']:.2%}  {first}-{last}"
+                             + ("  (continued)" if entry['continued'] else ""))
+            if len(entries) > self.max_digest_lines:
+                lines.append(f"... and {len(entries) - self.max_digest_lines} more")
+            lines += ["", "Action Taken: Source IPs blocked automatically"]
+            body = "\n".join(lines) + "\n"
+
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = email_config.get('sender') or email_config['smtp_user']
+        recipients = email_config['recipient']
+        msg['To'] = recipients if isinstance(recipients, str) else ', '.join(recipients)
+        return msg
+
+    def flush(self):
+        """Email the pending alerts as one digest; returns how many it sent
+
+        If sending fails the alerts stay pending, merged with any raised
+        meanwhile, for the next digest to retry, and 0 is returned.
+        """
+        with self.lock:
+            entries = self.pending
+            self.pending = {}
+        if not entries:
+            return 0
         try:
-            email_config = self.config['email_alerts']
-            
-            msg = MimeText(message)
-            msg['Subject'] = 'AI Firewall Security Alert'
-            msg['From'] = email_config['smtp_user']
-            msg['To'] = email_config['recipient']
-            
-            with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-                server.starttls()
-                server.login(email_config['smtp_user'], email_config['smtp_password'])
-                server.send_message(msg)
-                
-            logger.info("Email alert sent successfully")
-            
+            self.sender.send(self._create_digest(list(entries.values())))
         except Exception as e:
-            logger.error(f"Failed to send email alert: {e}")
-            
+            with self.lock:
+                self.counts['emails_failed'] += 1
+                for key, entry in entries.items():
+                    newer = self.pending.get(key)
+                    if newer is not None:
+                        entry['count'] += newer['count']
+                        entry['last_seen'] = max(entry['last_seen'], newer['last_seen'])
+                        entry['confidence'] = max(entry['confidence'], newer['confidence'])
+                    self.pending[key] = entry
+            metrics.inc('alert_emails_failed')
+            logger.error(f"Failed to send email alert digest ({len(entries)} alerts kept for retry): {e}")
+            return 0
+        with self.lock:
+            self.counts['emails_sent'] += 1
+        metrics.inc('alert_emails_sent')
+        logger.info(f"Email alert digest sent ({len(entries)} alerts)")
+        return len(entries)
+
+    def _run(self):
+        while not self._stop_event.wait(self.digest_interval):
+            self.flush()
+
+    def stats(self):
+        """Alerts raised and deduplicated against emails sent, and deliveries by sink"""
+        with self.lock:
+            stats = {**self.counts, 'pending': len(self.pending),
+                     'smtp_connections': getattr(self.sender, 'connections', 0)}
+        if self.dispatcher is not None:
+            stats['sinks'] = self.dispatcher.stats()
+        return stats
+
     def get_recent_alerts(self, count=10):
         """Get recent alerts"""
-        return self.alert_history[-count:]
-        
+        return list(self.alert_history)[-count:]
+
     def acknowledge_alert(self, alert_index):
         """Mark alert as acknowledged"""
         if 0 <= alert_index < len(self.alert_history):
@@ -1,6 +1,16 @@
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string, request
+from collections import deque
+from functools import wraps
+import hmac
+import json
+import os
 import threading
 import time
+from src.monitoring.event_stream import EventBroadcaster
+from src.monitoring.http_cache import CachedBody
+from src.monitoring.metrics import Histogram, get_metrics
+from src.monitoring.profiler import SamplingProfiler
+from src.monitoring.timeseries import FIELDS, PeriodicSampler, TimeSeriesStore, parse_duration
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -95,6 +105,11 @@ HTML_TEMPLATE = """
             <p>ML Models: <span class="status" id="modelStatus">LOADED</span></p>
         </div>
 
+        <div class="card">
+            <h2>Packet Rate <small id="rateLabel">(last 10 minutes)</small></h2>
+            <canvas id="rateChart" width="1100" height="120"></canvas>
+        </div>
+
         <div class="card">
             <h2>Recent Activity</h2>
             <div id="activityLog">
@@ -118,6 +133,32 @@ HTML_TEMPLATE = """
             document.getElementById('uptime').textContent = uptime + 's';
         }
         
+        let activities = [];
+        let pollTimer = null;
+        
+        function renderStatus(data) {
+            // Stream events carry only the fields that changed
+            if ('packets_processed' in data) {
+                document.getElementById('packetCount').textContent = data.packets_processed.toLocaleString();
+            }
+            if ('threats_detected' in data) {
+                document.getElementById('threatCount').textContent = data.threats_detected;
+            }
+            if ('ips_blocked' in data) {
+                document.getElementById('blockedCount').textContent = data.ips_blocked;
+            }
+        }
+        
+        function renderActivity() {
+            let activityLog = '';
+            activities.forEach(activity => {
+                const className = activity.includes('Threat') ? 'alert' : 
+                                 activity.includes('Warning') ? 'warning' : '';
+                activityLog += `<p class="${className}">${activity}</p>`;
+            });
+            document.getElementById('activityLog').innerHTML = activityLog || '<p>No recent activity</p>';
+        }
+        
         function updateDashboard() {
             fetch('/api/status')
                 .then(response => {
@@ -125,17 +166,9 @@ HTML_TEMPLATE = """
                     return response.json();
                 })
                 .then(data => {
-                    document.getElementById('packetCount').textContent = data.packets_processed.toLocaleString();
-                    document.getElementById('threatCount').textContent = data.threats_detected;
-                    document.getElementById('blockedCount').textContent = data.ips_blocked;
-                    
-                    let activityLog = '';
-                    data.recent_activity.forEach(activity => {
-                        const className = activity.includes('Threat') ? 'alert' : 
-                                         activity.includes('Warning') ? 'warning' : '';
-                        activityLog += `<p class="${className}">${activity}</p>`;
-                    });
-                    document.getElementById('activityLog').innerHTML = activityLog || '<p>No recent activity</p>';
+                    renderStatus(data);
+                    activities = data.recent_activity;
+                    renderActivity();
                 })
                 .catch(error => {
                     console.error('Error fetching data:', error);
@@ -157,42 +190,195 @@ HTML_TEMPLATE = """
                 .then(() => updateDashboard());
         }
         
-        // Update every 2 seconds
-        setInterval(updateDashboard, 2000);
+        // Poll every 2 seconds while the event stream is unavailable
+        function startPolling() {
+            if (pollTimer === null) {
+                pollTimer = setInterval(updateDashboard, 2000);
+                updateDashboard();
+            }
+        }
+        
+        function stopPolling() {
+            if (pollTimer !== null) {
+                clearInterval(pollTimer);
+                pollTimer = null;
+            }
+        }
+        
+        function startStream() {
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+            // The browser reconnects on its own, sending Last-Event-ID to resume
+            const source = new EventSource('/api/stream');
+            source.onopen = stopPolling;
+            source.onerror = startPolling;
+            source.addEventListener('snapshot', event => {
+                const data = JSON.parse(event.data);
+                renderStatus(data);
+                activities = data.recent_activity;
+                renderActivity();
+            });
+            source.addEventListener('status', event => renderStatus(JSON.parse(event.data)));
+            source.addEventListener('activity', event => {
+                const data = JSON.parse(event.data);
+                activities = (data.reset ? data.entries : data.entries.concat(activities)).slice(0, 20);
+                renderActivity();
+            });
+        }
+        
+        function drawHistory() {
+            fetch('/api/history?metric=packet_rate&res=1s&range=10m&fields=last')
+                .then(response => response.ok ? response.json() : null)
+                .then(data => {
+                    const canvas = document.getElementById('rateChart');
+                    const context = canvas.getContext('2d');
+                    context.clearRect(0, 0, canvas.width, canvas.height);
+                    if (!data || !data.last.length) return;
+                    const end = Date.now() / 1000;
+                    const peak = Math.max(...data.last, 1);
+                    context.beginPath();
+                    data.t.forEach((t, i) => {
+                        const x = (t - end + 600) / 600 * canvas.width;
+                        const y = canvas.height - data.last[i] / peak * (canvas.height - 10);
+                        if (i) context.lineTo(x, y); else context.moveTo(x, y);
+                    });
+                    context.strokeStyle = '#2980b9';
+                    context.stroke();
+                    document.getElementById('rateLabel').textContent =
+                        `(last 10 minutes, peak ${Math.round(peak).toLocaleString()} pps)`;
+                })
+                .catch(error => console.error('Error fetching history:', error));
+        }
+        
         setInterval(updateUptime, 1000);
-        updateDashboard();
+        setInterval(drawHistory, 5000);
+        startStream();
+        drawHistory();
         updateUptime();
     </script>
 </body>
 </html>
 """
 
+def require_token(view):
+    """Reject requests without the dashboard API token"""
+    @wraps(view)
+    def wrapper(self, *args, **kwargs):
+        if not self.api_token:
+            return jsonify({'error': 'API token not configured'}), 403
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {self.api_token}".encode()):
+            return jsonify({'error': 'unauthorized'}), 401
+        return view(self, *args, **kwargs)
+    return wrapper
+
 class FirewallDashboard:
-    def __init__(self, port=8080):
+    def __init__(self, port=8080, api_token=None, pipeline=None, stream_interval=1.0, stream_heartbeat=15.0,
+                 history_interval=1.0, status_max_age=1.0, event_store=None, drift_monitor=None):
         self.port = port
+        self.api_token = api_token or os.environ.get('FIREWALL_API_TOKEN')
         self.app = Flask(__name__)
         self.stats = {
             'packets_processed': 0,
             'threats_detected': 0,
             'ips_blocked': 0,
-            'recent_activity': ['AI Firewall started successfully']
+            # Newest first; the event store keeps the full history
+            'recent_activity': deque(['AI Firewall started successfully'], maxlen=20)
         }
+        self.stats_lock = threading.Lock()
+        self.stats_version = 0  # Bumped on every change to self.stats, under stats_lock
+        # Pipeline whose counters, summed over every worker, /api/status reports
+        self.pipeline = pipeline
+        self.event_store = event_store
+        self.drift_monitor = drift_monitor
+        self.broadcaster = EventBroadcaster(self._stream_fields, stream_interval, stream_heartbeat)
+        self.history = TimeSeriesStore()
+        self.history_sampler = PeriodicSampler(self.history, self._collect_history, history_interval)
+        self._history_previous = None
+        # /api/status is served from a snapshot rebuilt when stats change, and otherwise at
+        # most every status_max_age seconds for the live pipeline and latency fields
+        self.status_max_age = status_max_age
+        self._status_snapshot = None
+        self._status_content = None
+        self._status_checked = (-1, 0.0)  # (stats version, monotonic time) of the last rebuild check
+        self._status_count = 0
+        self._status_lock = threading.Lock()
         self.start_time = time.time()
+        self.metrics = get_metrics()
+        self.profiler = SamplingProfiler()
         
         self._setup_routes()
+        with self.app.app_context():
+            # Nothing in the page changes at runtime, so it is rendered and compressed once
+            self.index_page = CachedBody(render_template_string(HTML_TEMPLATE).encode(), 'text/html',
+                                         compress_level=9)
         
     def _setup_routes(self):
         @self.app.route('/')
         def index():
-            return render_template_string(HTML_TEMPLATE)
+            return self.index_page.respond(request)
             
         @self.app.route('/api/status')
         def get_status():
-            return jsonify({
-                **self.stats,
-                'uptime': int(time.time() - self.start_time),
-                'timestamp': time.time()
-            })
+            return self.status_snapshot().respond(request)
+            
+        @self.app.route('/api/stream')
+        def stream():
+            # Each open stream holds one server thread; the events themselves are shared
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            try:
+                last_event_id = int(last_event_id) if last_event_id else None
+            except ValueError:
+                last_event_id = None
+            return Response(self.broadcaster.subscribe(last_event_id, self._stream_state),
+                            mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+            
+        @self.app.route('/api/history')
+        def get_history():
+            metric = request.args.get('metric')
+            if not metric:
+                return jsonify({'metrics': self.history.metrics, 'resolutions': list(self.history.resolutions)})
+            try:
+                duration = parse_duration(request.args['range']) if request.args.get('range') else None
+                fields = request.args['fields'].split(',') if request.args.get('fields') else FIELDS
+                return jsonify(self.history.query(metric, request.args.get('res', '1s'), duration, fields=fields))
+            except KeyError:
+                return jsonify({'error': f"Unknown metric: {metric}", 'metrics': self.history.metrics}), 404
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+        @self.app.route('/api/events')
+        def get_events():
+            if self.event_store is None:
+                return jsonify({'error': 'Event store not configured'}), 503
+            args = request.args
+            try:
+                return jsonify(self.event_store.query(
+                    limit=args.get('limit', 100, type=int),
+                    before=args.get('before', type=int),
+                    source_ip=args.get('source_ip'),
+                    threat_type=args.get('threat_type'),
+                    since=args.get('since', type=float),
+                    until=args.get('until', type=float)
+                ))
+            except Exception as e:
+                logger.error(f"Error querying events: {e}")
+                return jsonify({'error': 'Event query failed'}), 500
+            
+        @self.app.route('/api/drift')
+        def get_drift():
+            """Latest comparison of live traffic with the anomaly detector's training baseline"""
+            if self.drift_monitor is None:
+                return jsonify({'error': 'Drift monitoring not running'}), 503
+            return jsonify(self.drift_monitor.status())
+            
+        @self.app.route('/metrics')
+        def prometheus_metrics():
+            return Response(self.metrics.render_prometheus(),
+                            mimetype='text/plain; version=0.0.4')
             
         @self.app.route('/api/health')
         def health_check():
@@ -200,33 +386,158 @@ class FirewallDashboard:
             
         @self.app.route('/api/clear-logs', methods=['POST'])
         def clear_logs():
-            self.stats['recent_activity'] = ['Logs cleared at ' + time.strftime('%H:%M:%S')]
+            with self.stats_lock:
+                self.stats['recent_activity'].clear()
+                self.stats['recent_activity'].append('Logs cleared at ' + time.strftime('%H:%M:%S'))
+                self.stats_version += 1
+                self.broadcaster.publish('activity', {'entries': list(self.stats['recent_activity']), 'reset': True})
             return jsonify({'status': 'cleared'})
             
         @self.app.route('/api/test-alert', methods=['POST'])
         def test_alert():
-            self.stats['threats_detected'] += 1
-            self.stats['recent_activity'].insert(0, 
-                f"{time.strftime('%H:%M:%S')} - TEST ALERT: Simulated threat from 192.168.1.100")
+            with self.stats_lock:
+                self.stats['threats_detected'] += 1
+                self.stats_version += 1
+                self._add_activity("TEST ALERT: Simulated threat from 192.168.1.100")
             return jsonify({'status': 'test_alert_triggered'})
+            
+        self.app.add_url_rule('/api/metrics', 'metrics_enabled', self._set_metrics_enabled, methods=['POST'])
+        self.app.add_url_rule('/api/profiler/start', 'profiler_start',
+                              self._profiler_start, methods=['POST'])
+        self.app.add_url_rule('/api/profiler/stop', 'profiler_stop',
+                              self._profiler_stop, methods=['POST'])
+        self.app.add_url_rule('/api/profiler/status', 'profiler_status', self._profiler_status)
+        self.app.add_url_rule('/api/profiler/profile', 'profiler_profile', self._profiler_profile)
+        
+    @require_token
+    def _set_metrics_enabled(self):
+        """Turn instrumentation on or off; toggles when no 'enabled' is given"""
+        data = request.get_json(silent=True) or {}
+        enabled = data.get('enabled', not self.metrics.enabled)
+        if isinstance(enabled, str) and enabled.lower() in ('true', 'false'):
+            enabled = enabled.lower() == 'true'
+        if not isinstance(enabled, bool):
+            return jsonify({'error': "'enabled' must be true or false"}), 400
+        self.metrics.set_enabled(enabled)
+        return jsonify({'enabled': self.metrics.enabled})
+        
+    @require_token
+    def _profiler_start(self):
+        data = request.get_json(silent=True) or {}
+        started = self.profiler.start(duration=data.get('duration'), interval=data.get('interval'))
+        return jsonify({**self.profiler.status(), 'started': started}), 200 if started else 409
+        
+    @require_token
+    def _profiler_stop(self):
+        self.profiler.stop()
+        return jsonify(self.profiler.status())
+        
+    @require_token
+    def _profiler_status(self):
+        return jsonify(self.profiler.status())
+        
+    @require_token
+    def _profiler_profile(self):
+        """Collapsed stacks, ready for flamegraph.pl or speedscope"""
+        return Response(self.profiler.collapsed(), mimetype='text/plain')
+        
+    def status_snapshot(self):
+        """The /api/status body, serialized only when its content has changed
+        
+        uptime and timestamp are as of the snapshot. The ETag combines the
+        start time and a snapshot counter, so it never repeats across restarts.
+        """
+        version, checked_at = self._status_checked
+        if (self._status_snapshot is not None and version == self.stats_version
+                and time.monotonic() - checked_at < self.status_max_age):
+            return self._status_snapshot
+        with self._status_lock:
+            with self.stats_lock:
+                version = self.stats_version
+                content = {**self.stats, 'recent_activity': list(self.stats['recent_activity'])}
+            if self.pipeline is not None:
+                pipeline = self.pipeline.stats()
+                content['packets_processed'] = pipeline['counters']['packets_processed']
+                content['pipeline'] = pipeline
+            content['latency'] = self.metrics.latency_summary() if self.metrics.enabled else {}
+            if content != self._status_content:
+                body = json.dumps({
+                    **content,
+                    'uptime': int(time.time() - self.start_time),
+                    'timestamp': time.time()
+                }).encode()
+                self._status_count += 1
+                self._status_snapshot = CachedBody(body, 'application/json', compress_level=1,
+                                                   etag=f"{int(self.start_time)}-{self._status_count}")
+                self._status_content = content
+            self._status_checked = (version, time.monotonic())
+            return self._status_snapshot
+        
+    def _stream_fields(self):
+        """The status fields pushed to stream subscribers when they change"""
+        with self.stats_lock:
+            fields = {key: self.stats[key] for key in ('packets_processed', 'threats_detected', 'ips_blocked')}
+        if self.pipeline is not None:
+            counters = self.pipeline.stats()['counters']
+            fields['packets_processed'] = counters['packets_processed']
+            fields['pipeline'] = counters
+        return fields
+        
+    def _stream_state(self):
+        """(last event id, full state) for stream clients that can't resume"""
+        fields = self._stream_fields()
+        with self.stats_lock:
+            # Activity events are published under stats_lock, so this id matches the list
+            return self.broadcaster.last_id, {**fields, 'recent_activity': list(self.stats['recent_activity'])}
+        
+    def _collect_history(self, now):
+        """One sample of every charted metric; rates and latency cover the time since the last sample"""
+        fields = self._stream_fields()
+        snapshot = self.metrics.snapshot()
+        values = {'ips_blocked': fields['ips_blocked']}
+        for name, depth in snapshot['gauges'].items():
+            if name.startswith('pipeline_queue_depth_'):
+                values['queue_depth_' + name[len('pipeline_queue_depth_'):]] = depth
+        latency = snapshot['histograms'].get('pipeline_latency')
+        counts = latency.counts if latency is not None else None
+        
+        previous = self._history_previous
+        self._history_previous = (now, fields['packets_processed'], fields['threats_detected'], counts)
+        if previous is None:
+            return values
+        elapsed = now - previous[0]
+        if elapsed > 0:
+            values['packet_rate'] = max(fields['packets_processed'] - previous[1], 0) / elapsed
+            values['threat_rate'] = max(fields['threats_detected'] - previous[2], 0) / elapsed
+        if counts is not None:
+            before = previous[3] or [0] * len(counts)
+            window = Histogram([max(now_count - count, 0) for now_count, count in zip(counts, before)])
+            if window.count:
+                values['latency_p50_ms'] = window.percentile(50) * 1000
+                values['latency_p99_ms'] = window.percentile(99) * 1000
+        return values
+        
+    def _add_activity(self, activity):
+        """Prepend an activity entry and push it to stream subscribers; call with stats_lock held"""
+        entry = f"{time.strftime('%H:%M:%S')} - {activity}"
+        self.stats['recent_activity'].appendleft(entry)
+        self.broadcaster.publish('activity', {'entries': [entry]})
     
     def update_stats(self, packets_processed=0, threats_detected=0, ips_blocked=0, activity=None):
         """Update dashboard statistics"""
-        self.stats['packets_processed'] = packets_processed
-        self.stats['threats_detected'] = threats_detected
-        self.stats['ips_blocked'] = ips_blocked
-        
-        if activity:
-            timestamp = time.strftime('%H:%M:%S')
-            self.stats['recent_activity'].insert(0, f"{timestamp} - {activity}")
-        
-        # Keep only last 20 activities
-        if len(self.stats['recent_activity']) > 20:
-            self.stats['recent_activity'] = self.stats['recent_activity'][:20]
+        with self.stats_lock:
+            self.stats['packets_processed'] = packets_processed
+            self.stats['threats_detected'] = threats_detected
+            self.stats['ips_blocked'] = ips_blocked
+            self.stats_version += 1
+            
+            if activity:
+                self._add_activity(activity)
     
     def run(self):
         """Start the dashboard"""
         logger.info(f"Starting dashboard on http://localhost:{self.port}")
+        self.history_sampler.start()
         try:
             # Use these settings for better compatibility
             self.app.run(
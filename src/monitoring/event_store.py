@@ -0,0 +1,238 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.monitoring.metrics import get_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source_ip TEXT,
+    threat_type TEXT,
+    confidence REAL,
+    dst_ip TEXT,
+    dst_port INTEGER,
+    protocol INTEGER,
+    packets INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_source ON events (source_ip, id);
+CREATE INDEX IF NOT EXISTS events_threat ON events (threat_type, id);
+"""
+
+COLUMNS = ('id', 'ts', 'source_ip', 'threat_type', 'confidence', 'dst_ip', 'dst_port', 'protocol', 'packets')
+INSERT = f"INSERT INTO events ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})"
+
+MAX_PAGE = 1000
+
+class EventStore:
+    """Threat events in SQLite, written in batches by one background thread
+
+    record() only appends to a bounded queue, so the detection path never
+    waits on the disk; when the queue is full the event is dropped and
+    counted. The writer inserts whatever has queued up in one transaction
+    and prunes events older than retention_days in bounded chunks. The
+    database is in WAL mode, so queries run alongside the writer.
+
+    Event ids follow insertion order and timestamps are taken on record(),
+    so id order is time order: queries page by id (keyset pagination) and
+    turn time bounds into id bounds, which keeps every page an index range
+    scan however large the table grows. Queries borrow a connection from a
+    pool of idle ones, since the dashboard serves each request on a new
+    thread.
+    """
+
+    def __init__(self, path, retention_days=30, batch_size=1000, flush_interval=0.5,
+                 queue_size=100000, prune_interval=60, prune_chunk=10000):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self.prune_chunk = prune_chunk
+        self.queue = queue.Queue(queue_size)
+        self._readers = queue.LifoQueue()  # idle query connections
+        self._stop_event = threading.Event()
+        self._writer = None
+
+    def open(self):
+        """Create the schema if needed and start the writer thread"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._stop_event.clear()
+        self._writer = threading.Thread(target=self._write_loop, name='event-store', daemon=True)
+        self._writer.start()
+        logger.info(f"Event store {self.path} opened")
+        return self
+
+    def _connect(self):
+        """A new connection, usable from any thread as long as only one uses it at a time"""
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _reader(self):
+        """An idle pooled connection for the duration of a query, opening one if none is free"""
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def record(self, source_ip, threat_type, confidence, packet_info=None, packets=0, timestamp=None):
+        """Queue an event for writing; returns False if it was dropped"""
+        packet_info = packet_info or {}
+        row = (time.time() if timestamp is None else timestamp, source_ip, threat_type, float(confidence),
+               packet_info.get('dst_ip'), packet_info.get('dst_port'), packet_info.get('protocol'), packets)
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            metrics.inc('event_store_dropped')
+            return False
+
+    def _write_loop(self):
+        connection = self._connect()
+        last_prune = 0.0
+        while True:
+            stopping = self._stop_event.is_set()
+            rows = []
+            try:
+                rows.append(self.queue.get(timeout=self.flush_interval))
+                while len(rows) < self.batch_size:
+                    rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if rows:
+                try:
+                    self._insert(connection, rows)
+                except sqlite3.Error as e:
+                    metrics.inc('event_store_dropped', len(rows))
+                    logger.error(f"Error writing {len(rows)} events: {e}")
+                for _ in rows:
+                    self.queue.task_done()
+            if time.time() - last_prune >= self.prune_interval:
+                last_prune = time.time()
+                try:
+                    self.prune(connection=connection)
+                except sqlite3.Error as e:
+                    logger.error(f"Error pruning events: {e}")
+            if stopping and self.queue.empty():
+                break
+        connection.close()
+
+    def _insert(self, connection, rows):
+        with metrics.timer('event_store_write'):
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(INSERT, rows)
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                # Left open, the transaction would make every later BEGIN fail
+                connection.execute("ROLLBACK")
+                raise
+        metrics.inc('events_stored', len(rows))
+
+    def prune(self, now=None, connection=None):
+        """Delete events older than the retention period; returns how many"""
+        if connection is None:
+            with self._reader() as connection:
+                return self.prune(now, connection)
+        cutoff = (time.time() if now is None else now) - self.retention
+        row = connection.execute("SELECT id FROM events WHERE ts < ? ORDER BY ts DESC LIMIT 1",
+                                 (cutoff,)).fetchone()
+        if row is None:
+            return 0
+        deleted = 0
+        while True:
+            # Short transactions, so queries and inserts aren't held up behind one long delete
+            cursor = connection.execute(
+                "DELETE FROM events WHERE id IN (SELECT id FROM events WHERE id <= ? ORDER BY id LIMIT ?)",
+                (row[0], self.prune_chunk))
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.prune_chunk:
+                break
+        if deleted:
+            metrics.inc('events_pruned', deleted)
+            logger.info(f"Pruned {deleted} events older than {self.retention / 86400:g} days")
+        return deleted
+
+    def _time_bound(self, connection, ts, first):
+        """Id of the first event at or after ts (first) or the last one at or before it"""
+        if first:
+            row = connection.execute("SELECT id FROM events WHERE ts >= ? ORDER BY ts LIMIT 1", (ts,)).fetchone()
+        else:
+            row = connection.execute("SELECT id FROM events WHERE ts <= ? ORDER BY ts DESC LIMIT 1", (ts,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, limit=100, before=None, source_ip=None, threat_type=None, since=None, until=None):
+        """Newest events first, with the cursor for the next page
+
+        Pass the returned 'next' as before to get the following page; it is
+        None on the last page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        with self._reader() as connection:
+            return self._query(connection, limit, before, source_ip, threat_type, since, until)
+
+    def _query(self, connection, limit, before, source_ip, threat_type, since, until):
+        conditions, parameters = [], []
+        if before is not None:
+            conditions.append("id < ?")
+            parameters.append(int(before))
+        for ts, first, operator in ((since, True, '>='), (until, False, '<=')):
+            if ts is None:
+                continue
+            bound = self._time_bound(connection, float(ts), first)
+            if bound is None:
+                return {'events': [], 'next': None}
+            conditions.append(f"id {operator} ?")
+            parameters.append(bound)
+        if source_ip is not None:
+            conditions.append("source_ip = ?")
+            parameters.append(source_ip)
+        if threat_type is not None:
+            conditions.append("threat_type = ?")
+            parameters.append(threat_type)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM events {where} ORDER BY id DESC LIMIT ?",
+            parameters + [limit + 1]
+        ).fetchall()
+        events = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        return {'events': events, 'next': events[-1]['id'] if len(rows) > limit else None}
+
+    def flush(self, timeout=10.0):
+        """Wait until everything recorded so far has been written"""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def close(self):
+        """Write out queued events and stop the writer"""
+        self._stop_event.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,154 @@
+import json
+import threading
+from collections import deque
+from src.monitoring.metrics import get_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+def format_event(event_id, event, data):
+    """One Server-Sent Event, encoded once and shared by every subscriber"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class EventBroadcaster:
+    """Fans dashboard changes out to every Server-Sent Events subscriber
+
+    A single thread samples snapshot() every interval seconds while anyone
+    is subscribed and publishes only the top-level fields that changed; it
+    exits once the last subscriber has left, and the next subscription
+    starts a new one. publish() adds other events such as new activity
+    entries. Events are encoded once and kept in a bounded history, so a
+    client reconnecting with Last-Event-ID gets just what it missed.
+    Clients that are too far behind, or new, start from a full snapshot.
+    Idle streams get a comment line every heartbeat seconds so proxies
+    don't close them.
+    """
+
+    def __init__(self, snapshot, interval=1.0, heartbeat=15.0, history=1000):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.history = deque(maxlen=history)  # (id, encoded event)
+        self.last_id = 0
+        self.state = {}
+        self.subscribers = 0
+        self.condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, subscribe=False):
+        """Start sampling unless already running, counting a new subscriber if subscribe is set"""
+        state = self.snapshot()
+        with self.condition:
+            if subscribe:
+                self.subscribers += 1
+                metrics.set_gauge('dashboard_stream_subscribers', self.subscribers)
+            if self._thread is not None:
+                return
+            if self.state:
+                # Restarting after an idle spell: publish what changed meanwhile for resuming clients
+                self._diff(state)
+            else:
+                self.state = state
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='dashboard-stream', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        thread = self._thread  # The sampler clears _thread itself when it goes idle
+        if thread is not None:
+            thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            with self.condition:
+                if not self.subscribers:
+                    # Nobody is listening; the next subscription starts a new sampler
+                    self._thread = None
+                    return
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling dashboard state: {e}")
+
+    def sample(self):
+        """Publish the fields that changed since the last sample, if any"""
+        current = self.snapshot()
+        with self.condition:
+            self._diff(current)
+
+    def _diff(self, current):
+        changed = {key: value for key, value in current.items() if self.state.get(key) != value}
+        self.state = current
+        if changed:
+            self._append('status', changed)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber"""
+        with self.condition:
+            self._append(event, data)
+
+    def _append(self, event, data):
+        self.last_id += 1
+        self.history.append((self.last_id, format_event(self.last_id, event, data)))
+        metrics.inc('dashboard_stream_events')
+        self.condition.notify_all()
+
+    def _backlog(self, last_seen):
+        """Events after last_seen, or None if the history no longer reaches back that far"""
+        if last_seen is None or last_seen > self.last_id:
+            return None
+        if last_seen == self.last_id:
+            return []
+        if not self.history or self.history[0][0] > last_seen + 1:
+            return None
+        return [encoded for event_id, encoded in self.history if event_id > last_seen]
+
+    def _current(self):
+        with self.condition:
+            return self.last_id, dict(self.state)
+
+    def _catch_up(self, last_seen, full_state):
+        """(encoded events, new last id) bringing a client at last_seen up to date"""
+        with self.condition:
+            backlog = self._backlog(last_seen)
+            if backlog is not None:
+                return backlog, self.last_id
+        # Called without the condition held: full_state may take its owner's locks
+        event_id, state = full_state()
+        return [format_event(event_id, 'snapshot', state)], event_id
+
+    def subscribe(self, last_event_id=None, full_state=None):
+        """Generator of encoded events for one client
+
+        full_state() returns (last event id it reflects, state) for the
+        snapshot sent to clients that can't resume; it defaults to the last
+        sampled fields.
+        """
+        full_state = full_state or self._current
+        self.start(subscribe=True)
+        try:
+            yield b"retry: 2000\n\n"
+            events, last_seen = self._catch_up(last_event_id, full_state)
+            if events:
+                yield b"".join(events)
+
+            while not self._stop_event.is_set():
+                with self.condition:
+                    if self.last_id == last_seen:
+                        self.condition.wait(self.heartbeat)
+                # Falls back to a snapshot if this client lagged out of the history
+                events, last_seen = self._catch_up(last_seen, full_state)
+                if events:
+                    yield b"".join(events)
+                elif not self._stop_event.is_set():
+                    yield b": keepalive\n\n"
+        finally:
+            with self.condition:
+                self.subscribers -= 1
+                metrics.set_gauge('dashboard_stream_subscribers', self.subscribers)
@@ -0,0 +1,40 @@
+import gzip
+import hashlib
+import threading
+from flask import Response
+
+class CachedBody:
+    """A response body encoded once, with a strong ETag and a lazily gzipped copy"""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'compress_level', '_gzipped', '_lock')
+
+    def __init__(self, body, mimetype, etag=None, compress_level=6):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag or hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.compress_level = compress_level
+        self._gzipped = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            with self._lock:
+                if self._gzipped is None:
+                    self._gzipped = gzip.compress(self.body, self.compress_level, mtime=0)
+        return self._gzipped
+
+    def respond(self, request, min_gzip_size=512):
+        """304 if the client's copy is current, else the body, gzipped when the client accepts it
+
+        Each encoding gets its own ETag, since the bytes differ.
+        """
+        compress = len(self.body) >= min_gzip_size and 'gzip' in request.accept_encodings
+        etag = f"{self.etag}-gz" if compress else self.etag
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        if compress:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzipped, mimetype=self.mimetype, headers=headers)
+        return Response(self.body, mimetype=self.mimetype, headers=headers)
@@ -0,0 +1,282 @@
+import threading
+import time
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Log-linear buckets over nanoseconds: 2**SUB_BITS sub-buckets per power of two,
+# which keeps every bucket within ~25% of its value
+SUB_BITS = 2
+SUB_COUNT = 1 << SUB_BITS
+LINEAR_LIMIT = SUB_COUNT << 1
+BUCKET_COUNT = 256
+
+# Prometheus 'le' boundaries: powers of two from ~1us to ~17s, all exact bucket edges
+EXPORT_BOUNDS_NS = [1 << shift for shift in range(10, 35)]
+
+STAGES = ('capture', 'parse', 'features', 'inference', 'enforcement', 'alerting')
+
+def bucket_index(value_ns):
+    """Histogram bucket for a non-negative integer value"""
+    if value_ns < LINEAR_LIMIT:
+        return max(value_ns, 0)
+    shift = value_ns.bit_length() - 1 - SUB_BITS
+    return min((shift << SUB_BITS) + (value_ns >> shift), BUCKET_COUNT - 1)
+
+def bucket_upper_bound(index):
+    """Exclusive upper bound in nanoseconds of a bucket"""
+    if index < LINEAR_LIMIT:
+        return index + 1
+    shift = (index >> SUB_BITS) - 1
+    mantissa = (index & (SUB_COUNT - 1)) | SUB_COUNT
+    return (mantissa + 1) << shift
+
+class Histogram:
+    """Merged view of a latency histogram"""
+
+    def __init__(self, counts=None, total_ns=0):
+        self.counts = counts or [0] * BUCKET_COUNT
+        self.total_ns = total_ns
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def merge(self, counts, total_ns):
+        for index, value in enumerate(counts):
+            if value:
+                self.counts[index] += value
+        self.total_ns += total_ns
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, in seconds"""
+        count = self.count
+        if count == 0:
+            return 0.0
+        rank = q / 100.0 * count
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank and value:
+                return bucket_upper_bound(index) / 1e9
+        return bucket_upper_bound(BUCKET_COUNT - 1) / 1e9
+
+    def cumulative(self, bounds_ns):
+        """Cumulative counts at each exported boundary"""
+        result = []
+        index, running = 0, 0
+        for bound in bounds_ns:
+            while index < BUCKET_COUNT and bucket_upper_bound(index) <= bound:
+                running += self.counts[index]
+                index += 1
+            result.append(running)
+        return result
+
+class _Shard:
+    """Counters and histograms written by exactly one thread"""
+
+    __slots__ = ('thread', 'counters', 'histograms')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+class _Timer:
+    """Context manager recording elapsed time into a stage histogram"""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe_ns(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+class MetricsRegistry:
+    """Hot-path counters, gauges and latency histograms
+
+    Each thread writes to its own shard without locking; readers merge the
+    shards when a snapshot is taken. Shards of finished threads are folded
+    into a retired shard so short-lived worker threads don't accumulate.
+    """
+
+    def __init__(self, enabled=True, prefix='firewall'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.gauges = {}
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._shards_lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        """Turn recording on or off at runtime"""
+        self.enabled = bool(enabled)
+        logger.info(f"Metrics {'enabled' if self.enabled else 'disabled'}")
+
+    def _shard(self):
+        """Create and register the calling thread's shard"""
+        shard = _Shard(threading.current_thread())
+        self._local.shard = shard
+        with self._shards_lock:
+            self._shards.append(shard)
+        return shard
+
+    def inc(self, name, value=1):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe_ns(self, name, value_ns):
+        """Record a duration in nanoseconds"""
+        if not self.enabled:
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        counts = shard.histograms.get(name)
+        if counts is None:
+            # The extra slot at the end holds the running total
+            counts = shard.histograms[name] = [0] * (BUCKET_COUNT + 1)
+        # Inlined bucket_index()
+        if value_ns < LINEAR_LIMIT:
+            index = value_ns if value_ns > 0 else 0
+        else:
+            shift = value_ns.bit_length() - 1 - SUB_BITS
+            index = (shift << SUB_BITS) + (value_ns >> shift)
+            if index >= BUCKET_COUNT:
+                index = BUCKET_COUNT - 1
+        counts[index] += 1
+        counts[BUCKET_COUNT] += value_ns
+
+    def observe(self, name, seconds):
+        """Record a duration in seconds"""
+        self.observe_ns(name, int(seconds * 1e9))
+
+    def timer(self, name):
+        """Context manager timing a block into a histogram"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name)
+
+    def set_gauge(self, name, value):
+        """Set a process-wide gauge"""
+        if self.enabled:
+            self.gauges[name] = value
+
+    def _collect_retired(self):
+        """Fold shards of dead threads into the retired shard"""
+        with self._shards_lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                    continue
+                _merge_shard(self._retired, shard)
+            self._shards = alive
+            return list(alive)
+
+    def snapshot(self):
+        """Merged counters, gauges and histograms across all threads"""
+        shards = self._collect_retired() + [self._retired]
+        counters = {}
+        histograms = {}
+        for shard in shards:
+            for name, value in list(shard.counters.items()):
+                counters[name] = counters.get(name, 0) + value
+            for name, counts in list(shard.histograms.items()):
+                counts = list(counts)
+                histogram = histograms.setdefault(name, Histogram())
+                histogram.merge(counts[:BUCKET_COUNT], counts[BUCKET_COUNT])
+        return {'counters': counters, 'gauges': dict(self.gauges), 'histograms': histograms}
+
+    def latency_summary(self):
+        """p50/p99 per histogram in milliseconds, for status APIs"""
+        return {
+            name: {
+                'count': histogram.count,
+                'p50_ms': round(histogram.percentile(50) * 1000, 3),
+                'p99_ms': round(histogram.percentile(99) * 1000, 3)
+            }
+            for name, histogram in self.snapshot()['histograms'].items()
+        }
+
+    def render_prometheus(self):
+        """Render a snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        prefix = self.prefix
+        lines = [
+            f"# HELP {prefix}_metrics_enabled Whether hot-path metrics are being recorded",
+            f"# TYPE {prefix}_metrics_enabled gauge",
+            f"{prefix}_metrics_enabled {int(self.enabled)}"
+        ]
+
+        for name in sorted(snapshot['counters']):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {snapshot['counters'][name]}")
+
+        for name in sorted(snapshot['gauges']):
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {snapshot['gauges'][name]}")
+
+        if snapshot['histograms']:
+            metric = f"{prefix}_stage_latency_seconds"
+            lines.append(f"# HELP {metric} Per-stage processing latency")
+            lines.append(f"# TYPE {metric} histogram")
+            for name in sorted(snapshot['histograms']):
+                histogram = snapshot['histograms'][name]
+                for bound, count in zip(EXPORT_BOUNDS_NS, histogram.cumulative(EXPORT_BOUNDS_NS)):
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound / 1e9:.9g}"}} {count}')
+                lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total_ns / 1e9:.9f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop all recorded values"""
+        with self._shards_lock:
+            for shard in self._shards + [self._retired]:
+                shard.counters.clear()
+                shard.histograms.clear()
+        self.gauges.clear()
+
+def _merge_shard(target, shard):
+    for name, value in shard.counters.items():
+        target.counters[name] = target.counters.get(name, 0) + value
+    for name, counts in shard.histograms.items():
+        merged = target.histograms.setdefault(name, [0] * (BUCKET_COUNT + 1))
+        for index, value in enumerate(counts):
+            merged[index] += value
+
+_registry = MetricsRegistry()
+
+def get_metrics():
+    """Get the process-wide metrics registry"""
+    return _registry
@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TRUNCATED_STACK = ('[truncated]',)
+
+def thread_tag(name):
+    """Group thread names into the pipeline roles shown in profiles"""
+    if name == 'MainThread':
+        return 'main'
+    if 'process_request_thread' in name or name.startswith('werkzeug'):
+        return 'flask'
+    return name.replace(';', '_').replace(' ', '_')
+
+class SamplingProfiler:
+    """Statistical profiler sampling every thread's stack via sys._current_frames()
+
+    Nothing runs while idle. A run stops on its own after max_duration seconds,
+    and at most max_stacks distinct stacks are kept; further new stacks are
+    counted under [truncated].
+    """
+
+    def __init__(self, interval=0.005, max_duration=60, max_stacks=10000, max_depth=64):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None, interval=None):
+        """Start a sampling run; returns False if one is already running"""
+        with self._lock:
+            if self.is_running:
+                return False
+            if interval:
+                self.interval = max(float(interval), 0.001)
+            duration = min(float(duration or self.max_duration), self.max_duration)
+
+            self.stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), name='profiler')
+            self._thread.daemon = True
+            self._thread.start()
+
+        logger.info(f"Profiler started for up to {duration:.0f}s at {self.interval * 1000:.1f} ms")
+        return True
+
+    def stop(self):
+        """Stop the current run and wait for the sampler to exit"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration):
+        deadline = time.monotonic() + duration
+        own_ident = threading.get_ident()
+        while not self._stop_event.is_set() and time.monotonic() < deadline:
+            self._sample(own_ident)
+            self._stop_event.wait(self.interval)
+        self.stopped_at = time.time()
+        logger.info(f"Profiler stopped after {self.samples} samples")
+
+    def _sample(self, own_ident):
+        """Record one stack per thread"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(thread_tag(names.get(ident, f'thread-{ident}')))
+            key = tuple(reversed(stack))
+
+            if key not in self.stacks and len(self.stacks) >= self.max_stacks:
+                key = (key[0],) + TRUNCATED_STACK
+            self.stacks[key] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        """Profile in collapsed-stack format ('thread;outer;inner count' per line)"""
+        return ''.join(f"{';'.join(stack)} {count}\n"
+                       for stack, count in sorted(self.stacks.items()))
+
+    def status(self):
+        """Current state of the profiler"""
+        return {
+            'running': self.is_running,
+            'samples': self.samples,
+            'distinct_stacks': len(self.stacks),
+            'interval': self.interval,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at
+        }
@@ -0,0 +1,167 @@
+import os
+import resource
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Fixed layout: every slot has the same columns, known to every process up front
+COUNTERS = ('packets_captured', 'packets_parsed', 'windows_built', 'windows_scored',
+            'packets_processed', 'threats', 'alerts', 'stage_errors')
+GAUGES = ('pending_packets', 'peak_rss_kb')
+
+# Per-slot header columns
+PID, HEARTBEAT_NS = 0, 1
+SLOT_HEADER = 2
+
+RETIRED = 0  # Slot holding the counters of reclaimed workers
+
+def _open(name, create, size=0):
+    if create:
+        return shared_memory.SharedMemory(create=True, size=size)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class SharedStats:
+    """Per-worker counters and gauges in one shared-memory table
+
+    Each worker, thread or process, owns one row and is its only writer, so
+    updates are plain int64 stores with no locks or IPC. Readers sum the rows:
+    counters over every row, gauges over live ones. The creating process
+    hands out rows and reclaims those of workers that died, folding their
+    counters into the retired row so totals never go backwards.
+    """
+
+    def __init__(self, slots=64, counters=COUNTERS, gauges=GAUGES, name=None, create=True):
+        self.counters = tuple(counters)
+        self.gauges = tuple(gauges)
+        self.columns = {column: SLOT_HEADER + index
+                        for index, column in enumerate(self.counters + self.gauges)}
+        self.width = SLOT_HEADER + len(self.columns)
+        self.slots = slots
+        self.shm = _open(name, create, slots * self.width * 8)
+        self.owner = create
+        self.table = np.ndarray((slots, self.width), dtype=np.int64, buffer=self.shm.buf)
+        self.labels = {}
+        self.reclaimed = 0
+        if create:
+            self.table[:] = 0
+            self.table[RETIRED, PID] = os.getpid()
+            self.labels[RETIRED] = 'retired'
+
+    @classmethod
+    def attach(cls, name, slots, counters=COUNTERS, gauges=GAUGES):
+        """Open a table created by another process"""
+        return cls(slots, counters, gauges, name=name, create=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def claim(self, label, index=None):
+        """Give a free row (or a specific one) to a worker; owner only"""
+        if index is None:
+            free = np.flatnonzero(self.table[:, PID] == 0)
+            if not len(free):
+                raise RuntimeError(f"No free stats slots for {label}")
+            index = int(free[0])
+        self.table[index] = 0
+        self.table[index, PID] = os.getpid()  # The worker overwrites this with its own pid
+        self.table[index, HEARTBEAT_NS] = time.time_ns()
+        self.labels[index] = label
+        return StatsSlot(self, index)
+
+    def release(self, index):
+        """Fold a row's counters into the retired row and free it; owner only"""
+        counters = slice(SLOT_HEADER, SLOT_HEADER + len(self.counters))
+        self.table[RETIRED, counters] += self.table[index, counters]
+        self.table[index] = 0
+        self.labels.pop(index, None)
+
+    def reap(self):
+        """Reclaim rows of worker processes that have died; returns their indices"""
+        own_pid = os.getpid()
+        dead = [index for index in range(1, self.slots)
+                if self.table[index, PID] not in (0, own_pid) and not _pid_alive(int(self.table[index, PID]))]
+        for index in dead:
+            self.release(index)
+        self.reclaimed += len(dead)
+        return dead
+
+    def totals(self):
+        """Counters summed over every row and gauges over live rows"""
+        table = self.table.copy()
+        live = table[:, PID] != 0
+        live[RETIRED] = False
+        sums = table[:, SLOT_HEADER:].sum(axis=0)
+        gauge_sums = table[live, SLOT_HEADER + len(self.counters):].sum(axis=0)
+        return {
+            'counters': {name: int(sums[index]) for index, name in enumerate(self.counters)},
+            'gauges': {name: int(gauge_sums[index]) for index, name in enumerate(self.gauges)}
+        }
+
+    def workers(self):
+        """One entry per claimed row, for status pages"""
+        now = time.time_ns()
+        table = self.table.copy()
+        return [
+            {
+                'slot': index,
+                'label': self.labels.get(index, ''),
+                'pid': int(table[index, PID]),
+                'heartbeat_age_s': round((now - int(table[index, HEARTBEAT_NS])) / 1e9, 3),
+                **{name: int(table[index, self.columns[name]]) for name in self.counters + self.gauges}
+            }
+            for index in range(1, self.slots) if table[index, PID]
+        ]
+
+    def close(self):
+        self.table = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class StatsSlot:
+    """A worker's row: lock-free writes, picklable so process workers can take it along"""
+
+    __slots__ = ('stats', 'index', 'row', 'columns')
+
+    def __init__(self, stats, index):
+        self.stats = stats
+        self.index = index
+        self.row = stats.table[index]
+        self.columns = stats.columns
+
+    def add(self, name, value=1):
+        self.row[self.columns[name]] += value
+
+    def set(self, name, value):
+        self.row[self.columns[name]] = value
+
+    def heartbeat(self):
+        self.row[HEARTBEAT_NS] = time.time_ns()
+
+    def sample_rss(self):
+        """Record this process's peak RSS (process workers only; threads would double count)"""
+        self.row[self.columns['peak_rss_kb']] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def __reduce__(self):
+        stats = self.stats
+        return _attach_slot, (stats.name, stats.slots, stats.counters, stats.gauges, self.index)
+
+def _attach_slot(name, slots, counters, gauges, index):
+    """Re-open a slot in a worker process and mark the row as this process's"""
+    slot = StatsSlot(SharedStats.attach(name, slots, counters, gauges), index)
+    slot.row[PID] = os.getpid()
+    slot.heartbeat()
+    return slot
@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Resolution -> (seconds per bucket, buckets kept): an hour of seconds, a day of minutes, 30 days of hours
+RESOLUTIONS = {'1s': (1, 3600), '1m': (60, 1440), '1h': (3600, 720)}
+
+FIELDS = ('sum', 'min', 'max', 'last', 'count')
+SUM, MIN, MAX, LAST, COUNT = range(len(FIELDS))
+EMPTY_BUCKET = np.array([0.0, np.inf, -np.inf, 0.0, 0.0])
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_duration(text):
+    """Seconds in '90', '90s', '15m', '6h' or '7d'"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', str(text))
+    if not match:
+        raise ValueError(f"Invalid duration: {text}")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+class Series:
+    """One metric at one resolution: a ring of buckets, each aggregating the samples in its interval"""
+
+    __slots__ = ('step', 'capacity', 'buckets', 'values')
+
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.buckets = np.full(capacity, -1, dtype=np.int64)  # Bucket number held by each slot
+        self.values = np.empty((capacity, len(FIELDS)))
+
+    def add(self, value, timestamp):
+        bucket = int(timestamp // self.step)
+        slot = bucket % self.capacity
+        row = self.values[slot]
+        if self.buckets[slot] != bucket:
+            # The slot still holds a bucket from a lap ago
+            self.buckets[slot] = bucket
+            row[:] = EMPTY_BUCKET
+        row[SUM] += value
+        row[MIN] = min(row[MIN], value)
+        row[MAX] = max(row[MAX], value)
+        row[LAST] = value
+        row[COUNT] += 1
+
+    def window(self, start, end):
+        """(bucket numbers, rows) of the non-empty buckets from start to end, oldest first"""
+        start = max(start, end - self.capacity + 1)
+        wanted = np.arange(start, end + 1, dtype=np.int64)
+        slots = wanted % self.capacity
+        present = self.buckets[slots] == wanted
+        return wanted[present], self.values[slots[present]]
+
+class TimeSeriesStore:
+    """Fixed-memory history of sampled metrics at several resolutions
+
+    Every sample is folded into the current bucket of each resolution (sum,
+    min, max, last and count), so the coarser series are downsampled as they
+    go and nothing needs compacting later. Memory per metric is fixed when
+    it is first recorded: about 270 KB with the default resolutions.
+    """
+
+    def __init__(self, resolutions=None):
+        self.resolutions = dict(resolutions or RESOLUTIONS)
+        self.series = {}  # metric -> {resolution: Series}
+        self.lock = threading.Lock()
+
+    @property
+    def metrics(self):
+        return sorted(self.series)
+
+    def record(self, values, timestamp):
+        """Add one sample per metric, all taken at timestamp"""
+        with self.lock:
+            for metric, value in values.items():
+                if value is None:
+                    continue
+                resolutions = self.series.get(metric)
+                if resolutions is None:
+                    resolutions = self.series[metric] = {
+                        name: Series(step, capacity) for name, (step, capacity) in self.resolutions.items()
+                    }
+                for series in resolutions.values():
+                    series.add(float(value), timestamp)
+
+    def query(self, metric, resolution='1s', duration=None, now=None, fields=FIELDS):
+        """Columnar history: bucket start times plus one list per field, oldest first
+
+        Raises KeyError for unknown metrics and ValueError for unknown
+        resolutions. Buckets with no samples are left out.
+        """
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution {resolution}; expected one of {', '.join(self.resolutions)}")
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        step, capacity = self.resolutions[resolution]
+        end = int((time.time() if now is None else now) // step)
+        count = capacity if duration is None else max(1, int(-(-duration // step)))
+        start = end - count + 1
+        with self.lock:
+            series = self.series[metric][resolution]
+            buckets, rows = series.window(start, end)
+        result = {'metric': metric, 'resolution': resolution, 'step': step,
+                  't': (buckets * step).tolist()}
+        for field in fields:
+            result[field] = rows[:, FIELDS.index(field)].tolist()
+        return result
+
+class PeriodicSampler:
+    """Thread recording collect() into a TimeSeriesStore every interval seconds"""
+
+    def __init__(self, store, collect, interval=1.0, clock=time.time):
+        self.store = store
+        self.collect = collect
+        self.interval = interval
+        self.clock = clock
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='history-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self):
+        now = self.clock()
+        self.store.record(self.collect(now), now)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling history: {e}")
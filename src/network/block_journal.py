@@ -0,0 +1,183 @@
+import os
+import struct
+import time
+from threading import Lock
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b'AIFWJ001'
+OP_BLOCK = 1
+OP_UNBLOCK = 2
+# op, deadline (unix time), key length, threat type length
+RECORD = struct.Struct('<BdBB')
+
+class BlockJournal:
+    """Append-only on-disk log of active blocks and their deadlines
+
+    Every block and unblock appends one small binary record. The log is
+    rewritten with only the live entries once it holds more than
+    compact_ratio records per live entry, so replaying it on startup stays
+    proportional to the number of active blocks. A torn record at the end,
+    left by a crash mid-write, is cut off on open.
+    """
+
+    def __init__(self, path, compact_ratio=4, compact_min_records=10000, sync=False):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.sync = sync
+        self.live = {}  # key -> (deadline, threat type)
+        self.records = 0
+        self.lock = Lock()
+        self.file = None
+        self._compacting = None  # records appended while a compaction writes its snapshot
+
+    def open(self):
+        """Load existing entries and open the log for appending; returns the live entries"""
+        with self.lock:
+            self.live, self.records, valid_end = self._read()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self.records == 0:
+                self._write_snapshot({})
+            elif valid_end < os.path.getsize(self.path):
+                # New records must follow the last good one, not the torn bytes
+                with open(self.path, 'r+b') as f:
+                    f.truncate(valid_end)
+            self.file = open(self.path, 'ab')
+        logger.info(f"Block journal {self.path}: {len(self.live)} entries from {self.records} records")
+        return dict(self.live)
+
+    def _read(self):
+        """(live entries, record count, offset just past the last good record)"""
+        live = {}
+        records = 0
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return live, records, 0
+        if not data.startswith(MAGIC):
+            logger.error(f"Ignoring block journal {self.path} with unknown format")
+            return live, records, 0
+
+        position = len(MAGIC)
+        while position + RECORD.size <= len(data):
+            try:
+                op, deadline, key_length, threat_length = RECORD.unpack_from(data, position)
+                end = position + RECORD.size + key_length + threat_length
+                if end > len(data) or op not in (OP_BLOCK, OP_UNBLOCK):
+                    break
+                key = data[position + RECORD.size:position + RECORD.size + key_length].decode()
+                threat = data[end - threat_length:end].decode()
+            except (struct.error, UnicodeDecodeError):
+                break
+            if op == OP_BLOCK:
+                live[key] = (deadline, threat)
+            else:
+                live.pop(key, None)
+            records += 1
+            position = end
+        if position < len(data):
+            logger.warning(f"Block journal {self.path} ends in {len(data) - position} bytes of partial "
+                           f"or corrupt record; cutting them off")
+        return live, records, position
+
+    @staticmethod
+    def _encode(op, key, deadline=0.0, threat=''):
+        key_bytes = key.encode()
+        # Cut on a character boundary, or the record wouldn't decode on the next open
+        threat_bytes = threat.encode()[:255].decode('utf-8', 'ignore').encode()
+        return RECORD.pack(op, deadline, len(key_bytes), len(threat_bytes)) + key_bytes + threat_bytes
+
+    def record_block(self, key, deadline, threat=''):
+        """Log a block (or a new deadline for an existing one)"""
+        with self.lock:
+            self.live[key] = (deadline, threat)
+            self._append(self._encode(OP_BLOCK, key, deadline, threat))
+
+    def record_unblock(self, key):
+        """Log the removal of a block"""
+        with self.lock:
+            if self.live.pop(key, None) is not None:
+                self._append(self._encode(OP_UNBLOCK, key))
+
+    def _append(self, record):
+        if self.file is not None:
+            self.file.write(record)
+            self.records += 1
+            if self._compacting is not None:
+                self._compacting.append(record)
+
+    def flush(self):
+        """Push buffered records to disk"""
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                if self.sync:
+                    os.fsync(self.file.fileno())
+
+    def maybe_compact(self):
+        """Compact when the log has grown well past the live entry count; returns whether it did"""
+        with self.lock:
+            if self.records < max(self.compact_min_records, self.compact_ratio * len(self.live)):
+                return False
+        return self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the live, unexpired entries; returns False if one is already running
+
+        The snapshot is written and synced without holding the lock, so
+        blocks recorded meanwhile don't wait on the disk; they still go to
+        the old log and are copied after the snapshot before it replaces it.
+        """
+        with self.lock:
+            if self._compacting is not None or self.file is None:
+                return False
+            now = time.time()
+            self.live = {key: entry for key, entry in self.live.items() if entry[0] > now}
+            entries = dict(self.live)
+            self._compacting = []
+        try:
+            tmp_path = self._write_tmp(entries)
+        except Exception:
+            with self.lock:
+                self._compacting = None
+            raise
+        with self.lock:
+            tail, self._compacting = self._compacting, None
+            with open(tmp_path, 'ab') as f:
+                f.write(b''.join(tail))
+                if self.sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.file.close()
+            os.replace(tmp_path, self.path)
+            self.records = len(entries) + len(tail)
+            self.file = open(self.path, 'ab')
+        logger.info(f"Compacted block journal to {len(entries)} entries")
+        return True
+
+    def _write_tmp(self, entries):
+        """Write and sync block records for entries to a temporary file; returns its path"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(b''.join(self._encode(OP_BLOCK, key, deadline, threat)
+                             for key, (deadline, threat) in entries.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def _write_snapshot(self, entries):
+        """Atomically replace the log with block records for entries; caller holds the lock"""
+        os.replace(self._write_tmp(entries), self.path)
+        self.records = len(entries)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
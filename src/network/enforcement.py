@@ -0,0 +1,505 @@
+import ipaddress
+import socket
+import subprocess
+import time
+from collections import defaultdict
+from threading import Condition, Lock, Thread
+from src.monitoring.metrics import get_metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+DEFAULT_SET_NAME = 'ai_firewall_block'
+DEFAULT_TIMEOUT = 3600
+
+def run_command(args, input=None):
+    """Run a firewall command, feeding input on stdin"""
+    return subprocess.run(args, input=input, text=True, check=True, capture_output=True)
+
+def normalize(ip):
+    """(version, canonical text) for an address or CIDR prefix, or None if invalid"""
+    if '/' not in ip:
+        # Plain addresses are by far the common case; skip the ipaddress objects
+        for version, family in ((4, socket.AF_INET), (6, socket.AF_INET6)):
+            try:
+                return version, socket.inet_ntop(family, socket.inet_pton(family, ip))
+            except OSError:
+                pass
+        logger.warning(f"Ignoring invalid address {ip!r}")
+        return None
+    try:
+        network = ipaddress.ip_network(ip, strict=False)
+    except ValueError:
+        logger.warning(f"Ignoring invalid address {ip!r}")
+        return None
+    return network.version, str(network.network_address) if network.num_addresses == 1 else str(network)
+
+def split_families(ips):
+    """Split addresses and CIDR prefixes into (IPv4, IPv6) lists, dropping invalid ones"""
+    v4, v6 = [], []
+    for ip in ips:
+        normalized = normalize(ip)
+        if normalized:
+            (v4 if normalized[0] == 4 else v6).append(normalized[1])
+    return v4, v6
+
+def split_entries(entries):
+    """Split (address, timeout) pairs into (IPv4, IPv6) lists, dropping invalid addresses"""
+    v4, v6 = [], []
+    for ip, timeout in entries:
+        normalized = normalize(ip)
+        if normalized:
+            (v4 if normalized[0] == 4 else v6).append((normalized[1], timeout))
+    return v4, v6
+
+class PartialBlockError(Exception):
+    """A command failed part way through a batch; applied and failed list the addresses either side"""
+
+    def __init__(self, applied, failed, cause):
+        super().__init__(f"{len(failed)} of {len(applied) + len(failed)} blocks not applied: {cause}")
+        self.applied = applied
+        self.failed = failed
+        self.cause = cause
+
+class EnforcementBackend:
+    """Installs and removes address blocks in the packet filter
+
+    Subclasses implement _setup, _block and _unblock; block() and unblock()
+    take whole lists so implementations can batch them into one call.
+    Backends that can give each entry its own timeout in one call also
+    override _block_entries. Backends that apply a batch through several
+    commands raise PartialBlockError when one fails after others succeeded.
+    """
+
+    name = 'base'
+    # Whether blocks expire by themselves (kernel set timeouts)
+    expires_natively = False
+
+    def __init__(self, runner=None):
+        self.runner = runner or run_command
+        self.commands_run = 0
+        self._ready = False
+        self._setup_lock = Lock()
+
+    def _run(self, args, input=None):
+        self.commands_run += 1
+        return self.runner(args, input=input)
+
+    def setup(self):
+        """Create the sets/rules this backend relies on (idempotent)"""
+        with self._setup_lock:
+            if not self._ready:
+                self._setup()
+                self._ready = True
+
+    def block(self, ips, timeout=DEFAULT_TIMEOUT):
+        """Block addresses for timeout seconds"""
+        ips = list(ips)
+        if not ips:
+            return
+        self.setup()
+        self._block(ips, int(timeout))
+
+    def block_entries(self, entries):
+        """Block addresses with individual timeouts, given as (address, seconds) pairs"""
+        entries = [(ip, max(int(timeout), 1)) for ip, timeout in entries]
+        if not entries:
+            return
+        self.setup()
+        self._block_entries(entries)
+
+    def unblock(self, ips):
+        """Remove blocks for addresses"""
+        ips = list(ips)
+        if not ips:
+            return
+        self.setup()
+        self._unblock(ips)
+
+    def replace(self, entries, covered):
+        """Install (prefix, seconds) entries in place of the addresses they cover
+
+        The prefixes go in before the addresses come out, so the sources stay
+        blocked throughout; a failure to remove the addresses is only logged.
+        """
+        entries = [(ip, max(int(timeout), 1)) for ip, timeout in entries]
+        if not entries:
+            return
+        self.setup()
+        self._replace(entries, list(covered))
+
+    def restore(self, entries, expired=()):
+        """Reinstall saved blocks after a restart
+
+        entries maps address or prefix -> remaining seconds; expired blocks are
+        removed unless the packet filter has already dropped them itself.
+        """
+        if expired and not self.expires_natively:
+            self.unblock(expired)
+        self.block_entries(entries.items())
+
+    def _setup(self):
+        pass
+
+    def _block(self, ips, timeout):
+        raise NotImplementedError
+
+    def _block_entries(self, entries):
+        by_timeout = defaultdict(list)
+        for ip, timeout in entries:
+            by_timeout[timeout].append(ip)
+        applied = []
+        groups = list(by_timeout.items())
+        for index, (timeout, ips) in enumerate(groups):
+            try:
+                self._block(ips, timeout)
+            except (PartialBlockError, subprocess.CalledProcessError, OSError) as e:
+                if isinstance(e, PartialBlockError):
+                    applied, failed, cause = applied + e.applied, e.failed, e.cause
+                else:
+                    failed, cause = list(ips), e
+                if not applied:
+                    raise
+                raise PartialBlockError(applied, failed + [ip for _, rest in groups[index + 1:] for ip in rest],
+                                        cause) from cause
+            applied.extend(ips)
+
+    def _unblock(self, ips):
+        raise NotImplementedError
+
+    def _replace(self, entries, covered):
+        self._block_entries(entries)
+        if not covered:
+            return
+        try:
+            self._unblock(covered)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error(f"Failed to remove {len(covered)} addresses covered by prefixes: {e}")
+
+class IptablesBackend(EnforcementBackend):
+    """One DROP rule per address; every change forks iptables once per address"""
+
+    name = 'iptables'
+
+    def _commands(self, ips, action):
+        """(address as given, command) for each valid address"""
+        for ip in ips:
+            normalized = normalize(ip)
+            if normalized:
+                binary = 'iptables' if normalized[0] == 4 else 'ip6tables'
+                yield ip, [binary, action, 'INPUT', '-s', normalized[1], '-j', 'DROP']
+
+    def _block(self, ips, timeout):
+        applied = []
+        for ip, args in self._commands(ips, '-A'):
+            try:
+                self._run(args)
+            except (subprocess.CalledProcessError, OSError) as e:
+                if not applied:
+                    raise
+                done = set(applied)
+                raise PartialBlockError(applied, [ip for ip in ips if ip not in done], e) from e
+            applied.append(ip)
+
+    def _unblock(self, ips):
+        for _, args in self._commands(ips, '-D'):
+            self._run(args)
+
+    def restore(self, entries, expired=()):
+        """Remove any rules left from before the restart, then re-add the live ones"""
+        self.setup()
+        for _, args in self._commands(list(entries) + list(expired), '-D'):
+            try:
+                self._run(args)
+            except subprocess.CalledProcessError:
+                pass
+        self.block_entries(entries.items())
+
+class IpsetBackend(EnforcementBackend):
+    """Blocked addresses and prefixes kept in ipset hash:net sets matched by a single iptables rule
+
+    Changes are applied in batches through one `ipset restore` call and
+    entries expire through the set timeout.
+    """
+
+    name = 'ipset'
+    expires_natively = True
+
+    def __init__(self, runner=None, set_name=DEFAULT_SET_NAME, max_elements=1048576, batch_size=10000):
+        super().__init__(runner)
+        self.sets = {4: set_name, 6: f"{set_name}6"}
+        self.max_elements = max_elements
+        self.batch_size = batch_size
+
+    def _setup(self):
+        self._run(['ipset', 'restore', '-exist'], input=(
+            f"create {self.sets[4]} hash:net family inet timeout {DEFAULT_TIMEOUT} maxelem {self.max_elements}\n"
+            f"create {self.sets[6]} hash:net family inet6 timeout {DEFAULT_TIMEOUT} maxelem {self.max_elements}\n"
+        ))
+        for binary, set_name in (('iptables', self.sets[4]), ('ip6tables', self.sets[6])):
+            rule = ['INPUT', '-m', 'set', '--match-set', set_name, 'src', '-j', 'DROP']
+            try:
+                self._run([binary, '-C'] + rule)
+            except subprocess.CalledProcessError:
+                self._run([binary, '-I'] + rule)
+
+    def _restore(self, lines, ips=None):
+        """Apply lines in batch_size chunks
+
+        ips, if given, is the address (as passed in) each line adds; a chunk
+        failing after earlier ones went in then raises PartialBlockError.
+        """
+        for start in range(0, len(lines), self.batch_size):
+            try:
+                self._run(['ipset', 'restore', '-exist'],
+                          input='\n'.join(lines[start:start + self.batch_size]) + '\n')
+            except (subprocess.CalledProcessError, OSError) as e:
+                if ips is None or not start:
+                    raise
+                raise PartialBlockError(ips[:start], ips[start:], e) from e
+
+    def _block(self, ips, timeout):
+        self._block_entries([(ip, timeout) for ip in ips])
+
+    def _block_entries(self, entries):
+        adds = {4: [], 6: []}
+        for ip, timeout in entries:
+            normalized = normalize(ip)
+            if normalized:
+                version, address = normalized
+                adds[version].append((ip, f"add {self.sets[version]} {address} timeout {timeout}"))
+        adds = adds[4] + adds[6]
+        self._restore([line for _, line in adds], [ip for ip, _ in adds])
+
+    def _unblock(self, ips):
+        v4, v6 = split_families(ips)
+        self._restore([f"del {self.sets[4]} {ip}" for ip in v4]
+                      + [f"del {self.sets[6]} {ip}" for ip in v6])
+
+class NftablesBackend(EnforcementBackend):
+    """Blocked addresses kept in nftables sets with timeouts, updated through one `nft -f -` transaction"""
+
+    name = 'nftables'
+    expires_natively = True
+
+    def __init__(self, runner=None, table='ai_firewall', batch_size=10000):
+        super().__init__(runner)
+        self.table = table
+        self.batch_size = batch_size
+
+    def _setup(self):
+        table = f"inet {self.table}"
+        self._run(['nft', '-f', '-'], input=(
+            f"add table {table}\n"
+            f"add set {table} blocked4 {{ type ipv4_addr; flags interval, timeout; }}\n"
+            f"add set {table} blocked6 {{ type ipv6_addr; flags interval, timeout; }}\n"
+            f"add chain {table} input {{ type filter hook input priority -10; policy accept; }}\n"
+            f"flush chain {table} input\n"
+            f"add rule {table} input ip saddr @blocked4 drop\n"
+            f"add rule {table} input ip6 saddr @blocked6 drop\n"
+        ))
+
+    def _elements(self, command, entries):
+        """Element statements for (address, element suffix) pairs"""
+        lines = []
+        for set_name, family in zip(('blocked4', 'blocked6'), split_entries(entries)):
+            for start in range(0, len(family), self.batch_size):
+                elements = ', '.join(f"{ip}{suffix}" for ip, suffix in family[start:start + self.batch_size])
+                lines.append(f"{command} element inet {self.table} {set_name} {{ {elements} }}")
+        return lines
+
+    def _apply(self, lines):
+        if lines:
+            self._run(['nft', '-f', '-'], input='\n'.join(lines) + '\n')
+
+    def _block(self, ips, timeout):
+        self._block_entries([(ip, timeout) for ip in ips])
+
+    def _block_entries(self, entries):
+        self._apply(self._elements('add', [(ip, f" timeout {timeout}s") for ip, timeout in entries]))
+
+    def _unblock(self, ips):
+        # Adding first makes the delete succeed for already-expired entries,
+        # which would otherwise abort the whole transaction
+        plain = [(ip, '') for ip in ips]
+        self._apply(self._elements('add', plain) + self._elements('delete', plain))
+
+    def _replace(self, entries, covered):
+        # An interval set refuses a prefix overlapping elements it already
+        # holds, so the covered addresses leave first; one transaction is
+        # atomic, leaving no moment where they are unblocked
+        plain = [(ip, '') for ip in covered]
+        self._apply(self._elements('add', plain) + self._elements('delete', plain)
+                    + self._elements('add', [(ip, f" timeout {timeout}s") for ip, timeout in entries]))
+
+class FakeBackend(EnforcementBackend):
+    """In-memory backend for tests and benchmarks"""
+
+    name = 'fake'
+    expires_natively = True
+
+    def __init__(self, clock=time.time):
+        super().__init__(runner=lambda args, input=None: None)
+        self.clock = clock
+        self.entries = {}
+        self.lock = Lock()
+
+    def _block(self, ips, timeout):
+        self._block_entries([(ip, timeout) for ip in ips])
+
+    def _block_entries(self, entries):
+        self.commands_run += 1
+        now = self.clock()
+        with self.lock:
+            for ip, timeout in entries:
+                self.entries[ip] = now + timeout
+
+    def _unblock(self, ips):
+        self.commands_run += 1
+        with self.lock:
+            for ip in ips:
+                self.entries.pop(ip, None)
+
+    def is_blocked(self, ip):
+        address = ipaddress.ip_address(ip)
+        now = self.clock()
+        with self.lock:
+            entries = list(self.entries.items())
+        return any(expiry > now and address in ipaddress.ip_network(entry, strict=False)
+                   for entry, expiry in entries)
+
+    @property
+    def blocked(self):
+        now = self.clock()
+        with self.lock:
+            return {ip for ip, expiry in self.entries.items() if expiry > now}
+
+class EnforcementQueue:
+    """Bounded queue of block requests drained by a dedicated worker thread
+
+    Requests for an address that is already pending are merged, and whatever
+    accumulates while the worker waits up to max_delay is installed with one
+    backend call. When the queue is full, submit() refuses the
+    request instead of blocking the caller.
+    """
+
+    def __init__(self, backend, maxsize=10000, batch_size=1000, max_delay=0.05, on_failed=None):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.on_failed = on_failed
+        self.pending = {}  # ip -> (timeout, verdict time in perf_counter_ns)
+        self.condition = Condition()
+        self.running = True
+        self._in_flight = 0
+
+        self.worker = Thread(target=self._worker_loop, name='enforcement')
+        self.worker.daemon = True
+        self.worker.start()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(self, ip, timeout, verdict_ns=None):
+        """Queue a block; returns False if the queue is full"""
+        verdict_ns = verdict_ns or time.perf_counter_ns()
+        with self.condition:
+            queued = self.pending.get(ip)
+            if queued is not None:
+                # Keep the earliest verdict and the longest block
+                self.pending[ip] = (max(queued[0], timeout), queued[1])
+                metrics.inc('enforcement_deduplicated')
+                return True
+            if len(self.pending) >= self.maxsize:
+                metrics.inc('enforcement_rejected')
+                return False
+            self.pending[ip] = (timeout, verdict_ns)
+            metrics.set_gauge('enforcement_queue_depth', len(self.pending))
+            if len(self.pending) == 1 or len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        return True
+
+    def _take_batch(self):
+        """Wait for requests, then let a burst build up for up to max_delay"""
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+            deadline = time.monotonic() + self.max_delay
+            while self.running and len(self.pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch, self.pending = self.pending, {}
+            self._in_flight = len(batch)
+            metrics.set_gauge('enforcement_queue_depth', len(self.pending))
+            metrics.set_gauge('enforcement_batch_size', len(batch))
+            return batch
+
+    def _worker_loop(self):
+        while self.running or self.pending:
+            batch = self._take_batch()
+            if batch:
+                self._install(batch)
+            with self.condition:
+                self._in_flight = 0
+                self.condition.notify_all()
+
+    def _install(self, batch):
+        try:
+            with metrics.timer('enforcement'):
+                self.backend.block_entries((ip, timeout) for ip, (timeout, _) in batch.items())
+        except PartialBlockError as e:
+            logger.error(f"Failed to block {len(e.failed)} of {len(batch)} IPs: {e.cause}")
+            self._failed(e.failed)
+            applied = set(e.applied)
+            batch = {ip: request for ip, request in batch.items() if ip in applied}
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error(f"Failed to block {len(batch)} IPs: {e}")
+            self._failed(list(batch))
+            return
+
+        installed_ns = time.perf_counter_ns()
+        for _, verdict_ns in batch.values():
+            metrics.observe_ns('enforcement_lag', installed_ns - verdict_ns)
+        metrics.inc('ips_blocked', len(batch))
+        metrics.inc('enforcement_batches')
+
+    def _failed(self, ips):
+        metrics.inc('enforcement_failures', len(ips))
+        if self.on_failed:
+            self.on_failed(ips)
+
+    def join(self, timeout=None):
+        """Wait until every submitted request has been handled; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self):
+        """Install what is pending, then stop the worker"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.worker.join()
+
+BACKENDS = {
+    'iptables': IptablesBackend,
+    'ipset': IpsetBackend,
+    'nftables': NftablesBackend,
+    'fake': FakeBackend,
+}
+
+def create_backend(name, **kwargs):
+    """Create an enforcement backend by name"""
+    try:
+        return BACKENDS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown enforcement backend: {name}")
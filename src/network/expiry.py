@@ -0,0 +1,105 @@
+import math
+import time
+
+class TimerWheel:
+    """Hierarchical timer wheel mapping keys to deadlines
+
+    Level 0 has one slot per tick; each higher level covers a whole turn of the
+    level below per slot, and its entries cascade down as time reaches them.
+    Scheduling and expiring are O(1) amortized. Rescheduling or cancelling a
+    key leaves the old entry in place to be skipped when its slot comes up.
+    Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, tick=1.0, slots=(64, 64, 64, 64), clock=time.time):
+        self.tick = tick
+        self.slots = slots
+        self.clock = clock
+        # Ticks covered by one slot of each level
+        self.resolutions = [math.prod(slots[:level]) for level in range(len(slots))]
+        self.wheels = [[[] for _ in range(count)] for count in slots]
+        self.overflow = []
+        self.current_tick = int(clock() // tick)
+        self.deadlines = {}
+        self._tokens = {}
+        self._next_token = 0
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def schedule(self, key, deadline):
+        """Expire key at deadline (a clock() timestamp), replacing any earlier schedule"""
+        self._next_token += 1
+        token = self._next_token
+        self._tokens[key] = token
+        self.deadlines[key] = deadline
+        # The current tick's slot has already been processed, so the earliest is the next one
+        self._insert(key, token, max(math.ceil(deadline / self.tick), self.current_tick + 1))
+
+    def cancel(self, key):
+        """Forget a key; returns whether it was scheduled"""
+        self._tokens.pop(key, None)
+        return self.deadlines.pop(key, None) is not None
+
+    def _insert(self, key, token, expire_tick):
+        delta = expire_tick - self.current_tick
+        for level, count in enumerate(self.slots):
+            resolution = self.resolutions[level]
+            if delta < resolution * count:
+                slot = (expire_tick // resolution) % count
+                self.wheels[level][slot].append((key, token, expire_tick))
+                return
+        self.overflow.append((key, token, expire_tick))
+
+    def advance(self, now=None):
+        """Move the wheel to now; returns the keys whose deadlines passed"""
+        now = self.clock() if now is None else now
+        target = int(now // self.tick)
+        expired = []
+        while self.current_tick < target:
+            if not self.deadlines:
+                self.current_tick = target
+                self.overflow.clear()
+                break
+            self.current_tick += 1
+            self._cascade()
+            expired.extend(self._expire_slot(self.wheels[0], self.current_tick % self.slots[0]))
+        return expired
+
+    def _cascade(self):
+        """Re-insert entries of higher-level slots that the current tick has reached"""
+        tick = self.current_tick
+        for level in range(len(self.slots) - 1, 0, -1):
+            resolution = self.resolutions[level]
+            if tick % resolution:
+                continue
+            wheel = self.wheels[level]
+            slot = (tick // resolution) % self.slots[level]
+            entries, wheel[slot] = wheel[slot], []
+            for key, token, expire_tick in entries:
+                if self._tokens.get(key) == token:
+                    self._insert(key, token, expire_tick)
+
+        if tick % (self.resolutions[-1] * self.slots[-1]) == 0 and self.overflow:
+            entries, self.overflow = self.overflow, []
+            for key, token, expire_tick in entries:
+                if self._tokens.get(key) == token:
+                    self._insert(key, token, expire_tick)
+
+    def _expire_slot(self, wheel, slot):
+        entries, wheel[slot] = wheel[slot], []
+        expired = []
+        for key, token, expire_tick in entries:
+            if self._tokens.get(key) != token:
+                continue
+            if expire_tick > self.current_tick:
+                # Landed in this slot from a lower tick count; keep waiting
+                self._insert(key, token, expire_tick)
+                continue
+            del self._tokens[key]
+            del self.deadlines[key]
+            expired.append(key)
+        return expired
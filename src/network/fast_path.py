@@ -0,0 +1,58 @@
+import socket
+from collections import defaultdict
+from threading import Lock
+from src.monitoring.metrics import get_metrics
+
+metrics = get_metrics()
+
+class FastPath:
+    """Cached verdicts for sources that are already blocked or allowlisted
+
+    Consulted by the analysis path and, through capture_filter, by capture
+    itself, so frames from known sources are dropped before they reach any
+    feature worker thread or process.
+    """
+
+    def __init__(self):
+        self.verdicts = {}  # source -> (is_threat, threat_type, confidence)
+        self.origins = {}   # source -> block key (address or prefix) the verdict came from
+        self.by_origin = defaultdict(set)
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def lookup(self, source):
+        """Cached verdict for a source, or None"""
+        verdict = self.verdicts.get(source)
+        if verdict is not None:
+            metrics.inc('fast_path_hits')
+        return verdict
+
+    def add(self, source, verdict, origin=None):
+        """Cache a verdict; origin ties it to the block (or prefix) that produced it"""
+        origin = origin or source
+        with self.lock:
+            previous = self.origins.get(source)
+            if previous is not None and previous != origin:
+                self.by_origin[previous].discard(source)
+            self.verdicts[source] = verdict
+            self.origins[source] = origin
+            self.by_origin[origin].add(source)
+
+    def remove(self, origin):
+        """Drop every verdict that came from a block key"""
+        with self.lock:
+            sources = self.by_origin.pop(origin, ())
+            for source in sources:
+                self.verdicts.pop(source, None)
+                self.origins.pop(source, None)
+
+    def capture_filter(self, raw_data):
+        """Packet filter for PacketCapture: True skips frames from sources with a verdict"""
+        if len(raw_data) < 34 or raw_data[12:14] != b'\x08\x00':
+            return False
+        if socket.inet_ntoa(raw_data[26:30]) in self.verdicts:
+            metrics.inc('fast_path_skipped')
+            return True
+        return False
@@ -1,105 +1,360 @@
 import subprocess
 import time
+import numpy as np
 from threading import Thread, Lock
 from collections import defaultdict
+from src.monitoring.metrics import get_metrics
+from src.network.block_journal import BlockJournal
+from src.network.enforcement import EnforcementQueue, PartialBlockError, create_backend
+from src.network.expiry import TimerWheel
+from src.network.fast_path import FastPath
+from src.network.prefix_table import PrefixTable, aggregate
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
+metrics = get_metrics()
+
+AGGREGATION_DEFAULTS = {
+    'enabled': True,
+    'interval': 30,          # Seconds between aggregation passes
+    'max_collateral': 0.25,  # Largest share of a prefix that may not have been blocked
+    'min_prefix_v4': 24,
+    'min_prefix_v6': 64,
+    'min_addresses': 8       # Blocked addresses needed before a prefix replaces them
+}
 
 class AIFirewallEngine:
-    def __init__(self, anomaly_detector, threat_classifier):
+    def __init__(self, anomaly_detector, threat_classifier, backend='ipset', block_duration=3600,
+                 block_durations=None, cleanup_interval=1.0, enforcement_queue_size=10000,
+                 allowlist=None, denylist=None, aggregation=None, journal_path=None,
+                 confidence_threshold=0.85):
         self.anomaly_detector = anomaly_detector
         self.threat_classifier = threat_classifier
+        self.drift_monitor = None  # Sees every scored batch when set
+        self.confidence_threshold = confidence_threshold  # Minimum confidence to block
+        self.backend = create_backend(backend) if isinstance(backend, str) else backend
         self.blocked_ips = set()
         self.suspicious_ips = defaultdict(int)
-        self.block_duration = 3600  # 1 hour
+        self.block_duration = block_duration  # 1 hour by default
+        self.block_durations = block_durations or {}  # Per threat type overrides
+        self.cleanup_interval = cleanup_interval
+        self.expiry = TimerWheel(tick=cleanup_interval)
         self.lock = Lock()
         
+        # Most specific entry wins; allow beats deny for the same prefix
+        self.allowlist = PrefixTable(allowlist)
+        self.access_list = PrefixTable([(prefix, 'deny') for prefix in denylist or []]
+                                       + [(prefix, 'allow') for prefix in allowlist or []])
+        self.blocked_prefixes = PrefixTable()
+        # Verdicts for known sources, checked before any feature work or inference
+        self.fast_path = FastPath()
+        self.aggregation = {**AGGREGATION_DEFAULTS, **(aggregation or {})}
+        
+        # Blocks are installed by the enforcement worker, off the analysis path
+        self.enforcement = EnforcementQueue(self.backend, maxsize=enforcement_queue_size,
+                                            on_failed=self._forget_blocks)
+        
+        # Active blocks survive restarts through an append-only journal
+        self.journal = None
+        if journal_path:
+            self.journal = BlockJournal(journal_path)
+            self.restore_blocks(self.journal.open())
+        
         # Start cleanup thread
-        self.cleanup_thread = Thread(target=self._cleanup_loop)
+        self.cleanup_thread = Thread(target=self._cleanup_loop, name='cleanup')
         self.cleanup_thread.daemon = True
         self.cleanup_thread.start()
         
     def analyze_traffic(self, features, packet_info):
         """Analyze traffic using AI models"""
+        return self.analyze_batch([features], [packet_info])[0]
+    
+    def analyze_batch(self, features, packet_infos):
+        """Verdicts for several traffic windows, scoring the unknown ones with one model call"""
+        verdicts = [None] * len(packet_infos)
         try:
-            # Anomaly detection
-            is_anomaly = self.anomaly_detector.predict([features])[0]
+            pending = []
+            for index, packet_info in enumerate(packet_infos):
+                verdicts[index] = self._known_verdict(packet_info)
+                if verdicts[index] is None:
+                    pending.append(index)
+            if not pending:
+                return verdicts
+            
+            start = time.perf_counter_ns()
             
-            if is_anomaly:
+            # Anomaly detection
+            X = np.asarray([features[index] for index in pending])
+            is_anomaly = self.anomaly_detector.predict(X)
+            if self.drift_monitor is not None:
+                self.drift_monitor.observe(X, is_anomaly)
+            anomalous = [position for position, flag in enumerate(is_anomaly) if flag]
+            threat_types, confidences = (), ()
+            if anomalous:
                 # Threat classification
-                threat_type, probabilities = self.threat_classifier.predict([features])
-                confidence = np.max(probabilities)
-                
-                threat_name = self.threat_classifier.threat_classes.get(
-                    threat_type[0], 'Unknown'
-                )
+                threat_types, probabilities = self.threat_classifier.predict(X[anomalous])
+                confidences = np.max(probabilities, axis=1)
+            metrics.observe_ns('inference', time.perf_counter_ns() - start)
+            
+            for index in pending:
+                verdicts[index] = (False, "Normal", 0.0)
+            for position, threat_type, confidence in zip(anomalous, threat_types, confidences):
+                packet_info = packet_infos[pending[position]]
+                metrics.inc('threats_detected')
+                threat_name = self.threat_classifier.threat_classes.get(threat_type, 'Unknown')
                 
-                logger.warning(
-                    f"Threat detected: {threat_name} "
-                    f"(Confidence: {confidence:.2f}) "
-                    f"from {packet_info.get('src_ip', 'Unknown')}"
-                )
+                # Lazy formatting: during an attack wave most of these are suppressed before formatting
+                logger.warning("Threat detected: %s (Confidence: %.2f) from %s",
+                               threat_name, confidence, packet_info.get('src_ip', 'Unknown'))
                 
                 # Take action based on threat type and confidence
-                if confidence > 0.85:  # High confidence threshold
+                if confidence > self.confidence_threshold:
                     self._block_threat(packet_info, threat_name, confidence)
                     
-                return True, threat_name, confidence
-                
-            return False, "Normal", 0.0
+                verdicts[pending[position]] = (True, threat_name, confidence)
+            return verdicts
             
         except Exception as e:
             logger.error(f"Error in traffic analysis: {e}")
-            return False, "Error", 0.0
+            return [verdict or (False, "Error", 0.0) for verdict in verdicts]
+    
+    def _known_verdict(self, packet_info):
+        """Verdict from the fast path or the allow/deny and blocked prefix tables, or None"""
+        src_ip = packet_info.get('src_ip')
+        verdict = self.fast_path.lookup(src_ip)
+        if verdict is not None:
+            return verdict
+        
+        action = self._lookup(self.access_list, src_ip)
+        if action == 'allow':
+            self.fast_path.add(src_ip, (False, "Allowlisted", 0.0), origin='allowlist')
+            return False, "Allowlisted", 0.0
+        if action == 'deny':
+            self._block_threat(packet_info, 'Denylisted', 1.0)
+            return True, "Denylisted", 1.0
+        
+        prefix = self._match(self.blocked_prefixes, src_ip)
+        if prefix:
+            self.fast_path.add(src_ip, (True, "Blocked", 1.0), origin=prefix)
+            return True, "Blocked", 1.0
+        return None
     
     def _block_threat(self, packet_info, threat_type, confidence):
         """Block identified threat"""
         src_ip = packet_info.get('src_ip')
         if not src_ip or src_ip in self.blocked_ips:
             return
+        if self._lookup(self.allowlist, src_ip):
+            logger.info(f"Not blocking allowlisted IP {src_ip} ({threat_type})")
+            return
+        prefix = self._match(self.blocked_prefixes, src_ip)
+        if prefix:
+            self.fast_path.add(src_ip, (True, threat_type, confidence), origin=prefix)
+            metrics.inc('blocks_covered_by_prefix')
+            return
             
+        duration = self.block_durations.get(threat_type, self.block_duration)
         with self.lock:
+            now = time.time()
             self.blocked_ips.add(src_ip)
-            self.suspicious_ips[src_ip] = time.time()
+            self.suspicious_ips[src_ip] = now
+            self.expiry.schedule(src_ip, now + duration)
+            if self.journal:
+                self.journal.record_block(src_ip, now + duration, threat_type)
+        self.fast_path.add(src_ip, (True, threat_type, confidence))
             
-        # Use iptables to block IP
-        try:
-            subprocess.run([
-                'iptables', '-A', 'INPUT', '-s', src_ip, '-j', 'DROP'
-            ], check=True)
+        if not self.enforcement.submit(src_ip, duration):
+            logger.error(f"Enforcement queue full, not blocking IP {src_ip}")
+            self._forget_blocks([src_ip])
+            return
             
-            logger.info(f"Blocked IP {src_ip} for {threat_type} "
-                       f"(confidence: {confidence:.2f})")
-                       
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to block IP {src_ip}: {e}")
+        logger.info(f"Blocking IP {src_ip} for {threat_type} "
+                   f"(confidence: {confidence:.2f})")
+    
+    @staticmethod
+    def _lookup(table, ip):
+        """Prefix table lookup that treats missing or malformed addresses as no match"""
+        if not ip or not table:
+            return None
+        try:
+            return table.lookup(ip)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _match(table, ip):
+        """Longest matching prefix, or None for no match and malformed addresses"""
+        if not ip or not table:
+            return None
+        try:
+            return table.match(ip)
+        except (OSError, ValueError):
+            return None
+    
+    def _forget_blocks(self, ips):
+        """Drop bookkeeping for blocks that were never installed"""
+        with self.lock:
+            for ip in ips:
+                self._discard_block(ip)
+    
+    def _discard_block(self, key):
+        """Remove an address or prefix from the bookkeeping; caller holds the lock"""
+        self.blocked_ips.discard(key)
+        self.suspicious_ips.pop(key, None)
+        self.expiry.cancel(key)
+        self.fast_path.remove(key)
+        if self.journal:
+            self.journal.record_unblock(key)
+        if '/' in key:
+            self.blocked_prefixes.remove(key)
+    
+    def aggregate_blocks(self):
+        """Replace dense groups of blocked addresses with covering prefixes"""
+        settings = self.aggregation
+        if not settings['enabled']:
+            return {}
+        with self.lock:
+            addresses = [ip for ip in self.blocked_ips if '/' not in ip]
+        if len(addresses) < settings['min_addresses']:
+            return {}
+        
+        groups = aggregate(addresses, settings['max_collateral'], settings['min_prefix_v4'],
+                           settings['min_prefix_v6'], exclude=self.allowlist)
+        groups = {prefix: members for prefix, members in groups.items()
+                  if '/' in prefix and len(members) >= settings['min_addresses']}
+        if not groups:
+            return {}
+        
+        # Let queued blocks land first so they can't reappear after the unblock below
+        self.enforcement.join(timeout=1.0)
+        now = time.time()
+        with self.lock:
+            deadlines = {
+                prefix: max(self.expiry.deadlines.get(ip, now) for ip in members)
+                for prefix, members in groups.items()
+            }
+        members = [ip for group in groups.values() for ip in group]
+        try:
+            with metrics.timer('enforcement'):
+                self.backend.replace([(prefix, deadline - now) for prefix, deadline in deadlines.items()], members)
+        except PartialBlockError as e:
+            logger.error(f"Failed to install {len(e.failed)} of {len(groups)} aggregated prefixes: {e.cause}")
+            applied = set(e.applied)
+            groups = {prefix: group for prefix, group in groups.items() if prefix in applied}
+            members = [ip for group in groups.values() for ip in group]
+            try:
+                self.backend.unblock(members)
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.error(f"Failed to remove {len(members)} addresses covered by prefixes: {e}")
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error(f"Failed to install {len(groups)} aggregated prefixes: {e}")
+            return {}
+        
+        with self.lock:
+            for prefix, group in groups.items():
+                for ip in group:
+                    self._discard_block(ip)
+                self.blocked_ips.add(prefix)
+                self.blocked_prefixes.add(prefix)
+                self.suspicious_ips[prefix] = now
+                self.expiry.schedule(prefix, deadlines[prefix])
+                if self.journal:
+                    self.journal.record_block(prefix, deadlines[prefix], 'Aggregated')
+        
+        metrics.inc('prefixes_aggregated', len(groups))
+        logger.info(f"Aggregated {len(members)} blocked IPs into {len(groups)} prefixes")
+        return groups
     
     def _cleanup_loop(self):
         """Clean up old blocked IPs"""
+        last_aggregation = time.time()
         while True:
-            time.sleep(300)  # Check every 5 minutes
+            time.sleep(self.cleanup_interval)
             
-            current_time = time.time()
-            with self.lock:
-                expired_ips = [
-                    ip for ip, block_time in self.suspicious_ips.items()
-                    if current_time - block_time > self.block_duration
-                ]
+            try:
+                self.expire_blocks()
+                if time.time() - last_aggregation >= self.aggregation['interval']:
+                    last_aggregation = time.time()
+                    self.aggregate_blocks()
+                if self.journal:
+                    self.journal.flush()
+                    self.journal.maybe_compact()
+            except Exception as e:
+                logger.error(f"Error in block cleanup: {e}")
+    
+    def restore_blocks(self, entries):
+        """Re-create saved blocks and reinstall them with one batched backend call
+        
+        entries maps address or prefix -> (deadline, threat type). Entries whose
+        deadline has passed are dropped, and removed from the packet filter when
+        the backend doesn't expire them itself.
+        """
+        start = time.perf_counter()
+        now = time.time()
+        live = {key: entry for key, entry in entries.items() if entry[0] > now}
+        expired = [key for key in entries if key not in live]
+        
+        with self.lock:
+            for key, (deadline, threat_type) in live.items():
+                self.blocked_ips.add(key)
+                self.suspicious_ips[key] = now
+                self.expiry.schedule(key, deadline)
+                if '/' in key:
+                    self.blocked_prefixes.add(key)
+                else:
+                    self.fast_path.add(key, (True, threat_type or 'Restored', 1.0))
+        if self.journal:
+            for key in expired:
+                self.journal.record_unblock(key)
+            self.journal.flush()
+        
+        try:
+            with metrics.timer('enforcement'):
+                self.backend.restore({key: deadline - now for key, (deadline, _) in live.items()}, expired)
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.error(f"Failed to reinstall {len(live)} saved blocks: {e}")
+            return 0
+        
+        metrics.inc('blocks_restored', len(live))
+        logger.info(f"Restored {len(live)} blocks ({len(expired)} expired) "
+                   f"in {time.perf_counter() - start:.2f}s")
+        return len(live)
+    
+    def shutdown(self):
+        """Install pending blocks and close the journal"""
+        self.enforcement.stop()
+        if self.journal:
+            self.journal.flush()
+            self.journal.close()
+    
+    def expire_blocks(self, current_time=None):
+        """Release blocks whose duration has passed, removing them in one batch if needed"""
+        current_time = current_time or time.time()
+        with self.lock:
+            expired_ips = self.expiry.advance(current_time)
+        if not expired_ips:
+            return []
+        
+        # Set-based backends drop the entries themselves via set timeouts; others
+        # are unblocked outside the lock so the hot path isn't stalled
+        if not self.backend.expires_natively:
+            try:
+                with metrics.timer('enforcement'):
+                    self.backend.unblock(expired_ips)
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.error(f"Failed to unblock {len(expired_ips)} IPs: {e}")
+                with self.lock:
+                    for ip in expired_ips:
+                        self.expiry.schedule(ip, current_time + 60)  # Retry in a minute
+                return []
+        
+        with self.lock:
+            for ip in expired_ips:
+                self._discard_block(ip)
                 
-                for ip in expired_ips:
-                    try:
-                        subprocess.run([
-                            'iptables', '-D', 'INPUT', '-s', ip, '-j', 'DROP'
-                        ], check=True)
-                        
-                        self.blocked_ips.remove(ip)
-                        del self.suspicious_ips[ip]
-                        
-                        logger.info(f"Unblocked IP {ip}")
-                        
-                    except subprocess.CalledProcessError as e:
-                        logger.error(f"Failed to unblock IP {ip}: {e}")
+        metrics.inc('ips_unblocked', len(expired_ips))
+        logger.info(f"Unblocked {len(expired_ips)} IPs")
+        return expired_ips
     
     def get_status(self):
         """Get firewall status"""
@@ -108,6 +363,9 @@ class AIFirewallEngine:
                 'blocked_ips_count': len(self.blocked_ips),
                 'suspicious_ips_count': len(self.suspicious_ips),
                 'blocked_ips': list(self.blocked_ips),
+                'blocked_prefixes_count': len(self.blocked_prefixes),
+                'enforcement_backend': self.backend.name,
+                'enforcement_queue_depth': len(self.enforcement),
                 'is_anomaly_detector_trained': self.anomaly_detector.is_trained,
                 'is_classifier_trained': self.threat_classifier.is_trained
             }
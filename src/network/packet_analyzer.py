@@ -1,12 +1,17 @@
 import socket
 import struct
+import time
 import numpy as np
-from scapy.all import IP, TCP, UDP, ICMP, Ether
+from src.monitoring.metrics import get_metrics
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
+metrics = get_metrics()
 
 class PacketAnalyzer:
+    # Bump whenever extracted features change, so cached feature matrices aren't reused
+    FEATURE_VERSION = 1
+    
     def __init__(self):
         self.feature_names = [
             'packet_size', 'protocol_type', 'ttl', 'tcp_flags', 
@@ -14,8 +19,14 @@ class PacketAnalyzer:
             'ip_fragment_offset', 'ip_tos'
         ]
         
+    def feature_spec(self, window=100):
+        """What determines the features of a capture: version, per-packet fields and window size"""
+        return {'version': self.FEATURE_VERSION, 'features': self.feature_names, 'window': window,
+                'statistics': ['mean', 'std', 'max', 'min', 'median']}
+        
     def extract_features(self, packet_data):
         """Extract features from raw packet data"""
+        start = time.perf_counter_ns()
         try:
             raw_data = packet_data['raw_data']
             
@@ -56,12 +67,35 @@ class PacketAnalyzer:
                     features[6] = tcph[6]  # Window size
                     features[7] = tcph[8]  # Urgent pointer
                     
+            metrics.observe_ns('parse', time.perf_counter_ns() - start)
             return features
             
         except Exception as e:
             logger.error(f"Error extracting features: {e}")
             return None
     
+    def extract_packet_info(self, packet_data):
+        """Extract addressing information from raw packet data"""
+        raw_data = packet_data['raw_data']
+        info = {'timestamp': packet_data.get('timestamp', 0)}
+        
+        # IPv4 only: ethertype 0x0800 and a full header
+        if len(raw_data) < 34 or raw_data[12:14] != b'\x08\x00':
+            return info
+            
+        protocol = raw_data[23]
+        info['protocol'] = protocol
+        info['src_ip'] = socket.inet_ntoa(raw_data[26:30])
+        info['dst_ip'] = socket.inet_ntoa(raw_data[30:34])
+        
+        ihl = (raw_data[14] & 0x0F) * 4
+        if protocol in (6, 17) and len(raw_data) >= 14 + ihl + 4:
+            info['src_port'], info['dst_port'] = struct.unpack(
+                '!HH', raw_data[14 + ihl:18 + ihl]
+            )
+            
+        return info
+    
     def create_traffic_features(self, packets, window_size=100):
         """Create aggregated traffic features for time window"""
         if len(packets) == 0:
@@ -76,6 +110,7 @@ class PacketAnalyzer:
         if len(features) == 0:
             return None
             
+        start = time.perf_counter_ns()
         features = np.array(features)
         
         # Statistical features
@@ -87,4 +122,6 @@ class PacketAnalyzer:
             np.median(features, axis=0),  # Median
         ]
         
-        return np.concatenate(traffic_features)
+        traffic_features = np.concatenate(traffic_features)
+        metrics.observe_ns('features', time.perf_counter_ns() - start)
+        return traffic_features
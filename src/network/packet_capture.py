@@ -4,9 +4,11 @@ import time
 from threading import Thread
 from collections import deque
 import numpy as np
+from src.monitoring.metrics import get_metrics
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
+metrics = get_metrics()
 
 class PacketCapture:
     def __init__(self, interface="eth0", max_pps=10000):
@@ -15,6 +17,11 @@ class PacketCapture:
         self.packets_queue = deque(maxlen=max_pps)
         self.is_capturing = False
         self.socket = None
+        self.packet_filter = None
+        
+    def set_filter(self, packet_filter):
+        """Skip frames for which packet_filter(raw_data) returns True"""
+        self.packet_filter = packet_filter
         
     def start_capture(self):
         """Start packet capture in promiscuous mode"""
@@ -24,7 +31,7 @@ class PacketCapture:
             self.is_capturing = True
             logger.info(f"Started packet capture on {self.interface}")
             
-            capture_thread = Thread(target=self._capture_loop)
+            capture_thread = Thread(target=self._capture_loop, name='capture')
             capture_thread.daemon = True
             capture_thread.start()
             
@@ -36,8 +43,12 @@ class PacketCapture:
         while self.is_capturing:
             try:
                 packet, addr = self.socket.recvfrom(65535)
+                start = time.perf_counter_ns()
                 timestamp = time.time()
                 
+                if self.packet_filter is not None and self.packet_filter(packet):
+                    continue
+                
                 packet_data = {
                     'timestamp': timestamp,
                     'raw_data': packet,
@@ -47,6 +58,10 @@ class PacketCapture:
                 
                 if len(self.packets_queue) < self.max_pps:
                     self.packets_queue.append(packet_data)
+                    metrics.inc('packets_captured')
+                else:
+                    metrics.inc('packets_dropped')
+                metrics.observe_ns('capture', time.perf_counter_ns() - start)
                     
             except Exception as e:
                 logger.error(f"Error in capture loop: {e}")
@@ -65,3 +80,71 @@ class PacketCapture:
         if self.socket:
             self.socket.close()
         logger.info("Packet capture stopped")
+
+class ReplayCapture(PacketCapture):
+    """Packet capture fed from a FrameBatch or pcap file instead of a socket"""
+    
+    def __init__(self, source, max_pps=10000, rate=None, loop=False, interface="replay"):
+        super().__init__(interface=interface, max_pps=max_pps)
+        self.source = source
+        self.rate = rate  # Packets per second, None replays as fast as possible
+        self.loop = loop
+        self.packets_replayed = 0
+        self.finished = False
+        
+    def start_capture(self):
+        """Start replaying frames into the packet queue"""
+        if isinstance(self.source, str):
+            from src.network.traffic_generator import read_pcap
+            self.source = read_pcap(self.source)
+            
+        self.is_capturing = True
+        self.finished = False
+        logger.info(f"Started replay of {len(self.source)} frames")
+        
+        capture_thread = Thread(target=self._capture_loop, name='capture')
+        capture_thread.daemon = True
+        capture_thread.start()
+        
+    def _capture_loop(self):
+        """Replay loop; waits for queue space instead of dropping"""
+        raw = self.source.buffer.tobytes()
+        offsets = self.source.offsets.tolist()
+        lengths = self.source.lengths.tolist()
+        start_time = time.time()
+        
+        while self.is_capturing:
+            for offset, length in zip(offsets, lengths):
+                if not self.is_capturing:
+                    break
+                    
+                if self.rate:
+                    delay = start_time + self.packets_replayed / self.rate - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                        
+                while len(self.packets_queue) >= self.max_pps and self.is_capturing:
+                    time.sleep(0.0001)
+                    
+                frame = raw[offset:offset + length]
+                self.packets_replayed += 1
+                if self.packet_filter is not None and self.packet_filter(frame):
+                    continue
+                    
+                self.packets_queue.append({
+                    'timestamp': time.time(),
+                    'raw_data': frame,
+                    'length': length,
+                    'interface': self.interface
+                })
+                metrics.inc('packets_captured')
+                
+            if not self.loop:
+                break
+                
+        self.finished = True
+        
+    def stop_capture(self):
+        """Stop replay"""
+        self.is_capturing = False
+        logger.info("Packet replay stopped")
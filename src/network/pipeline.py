@@ -0,0 +1,518 @@
+import multiprocessing
+import platform
+import queue
+import threading
+import time
+from collections import Counter
+from functools import partial
+from src.monitoring.metrics import get_metrics
+from src.monitoring.shared_stats import SharedStats
+from src.network.shm_ring import PacketRing, ring_supported
+from src.utils.logger import configure_worker_logging, get_logger, worker_logging
+
+logger = get_logger(__name__)
+metrics = get_metrics()
+
+STOP = None  # Queue sentinel; real items are always lists
+
+STAGE_DEFAULTS = {
+    # batch: most queue items a worker merges into one call
+    'features': {'workers': 1, 'mode': 'thread', 'batch': 1},
+    'inference': {'workers': 1, 'mode': 'thread', 'batch': 16},
+    'alerting': {'workers': 1, 'mode': 'thread', 'batch': 16},
+}
+
+def put(q, item, running, timeout=0.1):
+    """Blocking put that gives up once running is cleared; returns whether the item was queued"""
+    try:
+        q.put_nowait(item)
+        return True
+    except queue.Full:
+        metrics.inc('pipeline_backpressure_waits')
+    while True:
+        try:
+            q.put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            if not running.is_set():
+                return False
+
+def queue_depth(q):
+    """Items waiting in a thread or process queue (approximate)"""
+    try:
+        return q.qsize()
+    except NotImplementedError:
+        return -1
+
+def _in_worker_process():
+    return multiprocessing.parent_process() is not None
+
+def run_worker_process(log_setup, target, *args):
+    """Entry point of a worker process: log through the parent's listener, then run the stage loop"""
+    configure_worker_logging(*log_setup)
+    target(*args)
+
+def run_stage(factory, inbox, outbox, running, slot, batch=1):
+    """Worker loop shared by stage threads and processes"""
+    handler = factory(stats=slot)
+    sample_rss = _in_worker_process()
+    stopping = False
+    while not stopping:
+        items = inbox.get()
+        if items is STOP:
+            break
+        slot.heartbeat()
+        if sample_rss:
+            slot.sample_rss()
+        # Merge whatever else is already waiting into one call
+        for _ in range(batch - 1):
+            try:
+                more = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if more is STOP:
+                stopping = True
+                break
+            items = items + more
+        try:
+            results = handler.process(items)
+        except Exception as e:
+            slot.add('stage_errors')
+            logger.error(f"Error in pipeline stage: {e}")
+            continue
+        if results and outbox is not None and not put(outbox, results, running):
+            return
+    results = handler.flush()
+    if results and outbox is not None:
+        put(outbox, results, running)
+
+def run_ring_stage(factory, ring_name, consumer, outbox, running, slot, max_records=512, interface='ring'):
+    """Worker loop for a process stage fed from a PacketRing instead of a queue"""
+    handler = factory(stats=slot)
+    ring = PacketRing.attach(ring_name)
+    try:
+        while True:
+            slot.heartbeat()
+            slot.sample_rss()
+            frames = ring.read_frames(consumer, max_records)
+            if not frames:
+                if ring.finished(consumer) or not running.is_set():
+                    break
+                ring.wait(consumer, timeout=0.1)
+                continue
+            packets = [{'timestamp': timestamp, 'raw_data': frame, 'length': len(frame),
+                        'interface': interface} for frame, timestamp in frames]
+            try:
+                results = handler.process(packets)
+            except Exception as e:
+                slot.add('stage_errors')
+                logger.error(f"Error in pipeline stage: {e}")
+                continue
+            if results and not put(outbox, results, running):
+                return
+        results = handler.flush()
+        if results:
+            put(outbox, results, running)
+    finally:
+        ring.close()
+
+class FeatureStage:
+    """Packets -> fixed-size windows of aggregated features, attributed to their dominant source"""
+
+    def __init__(self, analyzer, window=100, stats=None):
+        self.analyzer = analyzer
+        self.window = window
+        self.stats = stats
+        self.pending = []
+
+    def process(self, packets):
+        self.pending.extend(packets)
+        windows = []
+        while len(self.pending) >= self.window:
+            windows.append(self._window(self.pending[:self.window]))
+            del self.pending[:self.window]
+        self._count(len(packets), len(windows))
+        return windows
+
+    def flush(self):
+        windows = [self._window(self.pending)] if self.pending else []
+        self.pending = []
+        self._count(0, len(windows))
+        return windows
+
+    def _count(self, packets, windows):
+        if self.stats is not None:
+            self.stats.add('packets_parsed', packets)
+            self.stats.add('windows_built', windows)
+            self.stats.set('pending_packets', len(self.pending))
+
+    def _window(self, packets):
+        infos = [self.analyzer.extract_packet_info(packet) for packet in packets]
+        sources = Counter(info.get('src_ip') for info in infos)
+        source = sources.most_common(1)[0][0]
+        packet_info = next(info for info in infos if info.get('src_ip') == source)
+        features = self.analyzer.create_traffic_features(packets)
+        return features, packet_info, len(packets), packets[0]['timestamp']
+
+class InferenceStage:
+    """Windows -> verdicts, scoring a whole batch of windows per model call"""
+
+    def __init__(self, engine, stats=None):
+        self.engine = engine
+        self.stats = stats
+
+    def process(self, windows):
+        windows = [window for window in windows if window[0] is not None]
+        if not windows:
+            return []
+        verdicts = self.engine.analyze_batch([window[0] for window in windows],
+                                             [window[1] for window in windows])
+        if self.stats is not None:
+            self.stats.add('windows_scored', len(windows))
+        return [(verdict, packet_info, count, timestamp)
+                for verdict, (_, packet_info, count, timestamp) in zip(verdicts, windows)]
+
+    def flush(self):
+        return []
+
+class AlertStage:
+    """Counts verdicts, records every threat event and hands each threat to the alert system
+
+    Every threat verdict is counted in threats. Repeats are the alert
+    system's to suppress (its dedupe_window): alerts counts the threats it
+    raised an alert for, and only those reach on_threat.
+    """
+
+    def __init__(self, alert_system=None, on_threat=None, event_store=None, stats=None):
+        self.alert_system = alert_system
+        self.on_threat = on_threat
+        self.event_store = event_store
+        self.stats = stats
+
+    def process(self, verdicts):
+        now = time.time()
+        packets = 0
+        threats = 0
+        raised = 0
+        for (is_threat, threat_type, confidence), packet_info, count, timestamp in verdicts:
+            packets += count
+            metrics.observe('pipeline_latency', max(now - timestamp, 0.0))
+            if not is_threat:
+                continue
+            threats += 1
+            source = packet_info.get('src_ip', 'Unknown')
+            if self.event_store is not None:
+                self.event_store.record(source, threat_type, confidence, packet_info, packets=count)
+            if self.alert_system is not None and \
+                    self.alert_system.send_alert(threat_type, confidence, source, packet_info) is False:
+                continue
+            raised += 1
+            if self.on_threat is not None:
+                self.on_threat(threat_type, confidence, source)
+        if self.stats is not None:
+            self.stats.add('packets_processed', packets)
+            self.stats.add('threats', threats)
+            self.stats.add('alerts', raised)
+        return []
+
+    def flush(self):
+        return []
+
+class Stage:
+    """A pool of thread or process workers between two bounded queues"""
+
+    def __init__(self, name, factory, workers=1, mode='thread', batch=1, process_safe=False):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown mode for pipeline stage {name}: {mode}")
+        if mode == 'process' and not process_safe:
+            raise ValueError(f"Pipeline stage {name} shares engine state and can only run in threads")
+        self.name = name
+        self.factory = factory
+        self.workers = max(1, int(workers))
+        self.mode = mode
+        self.batch = max(1, int(batch))
+        self.inbox = None
+        self.outbox = None
+        self.ring = None  # Set when the stage is fed from shared memory instead of inbox
+        self.ring_args = ()
+        self.handles = []
+        self.slots = []
+
+    def start(self, running, context, stats):
+        for index in range(self.workers):
+            self.slots.append(stats.claim(f"{self.name}-{index}"))
+            self.handles.append(self._spawn(index, running, context))
+
+    def _spawn(self, index, running, context):
+        slot = self.slots[index]
+        if self.ring is not None:
+            target = run_ring_stage
+            args = (self.factory, self.ring.name, index, self.outbox, running, slot) + self.ring_args
+        else:
+            target = run_stage
+            args = (self.factory, self.inbox, self.outbox, running, slot, self.batch)
+        name = f"{self.name}-{index}"
+        if self.mode == 'process':
+            handle = context.Process(target=run_worker_process, args=(worker_logging(context), target) + args,
+                                     name=name, daemon=True)
+        else:
+            handle = threading.Thread(target=target, args=args, name=name, daemon=True)
+        handle.start()
+        return handle
+
+    def restart_crashed(self, running, context, stats):
+        """Replace worker processes that died abnormally; returns how many were restarted
+
+        A replacement takes over the dead worker's ring consumer index (its
+        chunks would otherwise never be released) and its stats slot, whose
+        counters are first folded into the retired totals.
+        """
+        restarted = 0
+        for index, handle in enumerate(self.handles):
+            if self.mode != 'process' or handle.is_alive() or handle.exitcode in (0, None):
+                continue
+            logger.error(f"Pipeline worker {handle.name} died (exit code {handle.exitcode}); restarting")
+            slot = self.slots[index]
+            stats.release(slot.index)
+            self.slots[index] = stats.claim(f"{self.name}-{index}", index=slot.index)
+            self.handles[index] = self._spawn(index, running, context)
+            restarted += 1
+        return restarted
+
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for handle in self.handles:
+            handle.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not any(handle.is_alive() for handle in self.handles)
+
+    def terminate(self):
+        for handle in self.handles:
+            if self.mode == 'process' and handle.is_alive():
+                handle.terminate()
+
+class Pipeline:
+    """Capture -> features -> inference -> alerting, connected by bounded queues
+
+    A capture thread moves packets in batches into the first queue. Every
+    queue is bounded, so a slow stage makes the ones before it wait: replay
+    sources slow down, and live capture drops at its own buffer (counted in
+    packets_dropped). The features stage is stateless and may run in worker
+    processes, which by default read frames from a shared-memory PacketRing
+    rather than unpickling them from a queue; inference and alerting share
+    the engine's state and run in threads. stop() lets every stage drain
+    before the next one is told to stop.
+
+    Each worker counts its work in its own row of a SharedStats table, so
+    status() sees worker processes too without any IPC; supervise() replaces
+    worker processes that crash. Worker processes keep their own metrics
+    registry, so stage histograms only cover work done in this process.
+    """
+
+    def __init__(self, capture, engine, analyzer=None, alert_system=None, on_threat=None,
+                 window=100, batch_size=500, queue_size=64, stages=None,
+                 start_method='spawn', transport='ring', ring_capacity=32768, ring_bytes=64 << 20,
+                 event_store=None):
+        if analyzer is None:
+            from src.network.packet_analyzer import PacketAnalyzer
+            analyzer = PacketAnalyzer()
+        self.capture = capture
+        self.engine = engine
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.started_at = None
+        self.finished = threading.Event()
+
+        settings = {name: {**defaults, **((stages or {}).get(name) or {})}
+                    for name, defaults in STAGE_DEFAULTS.items()}
+        self.stages = [
+            Stage('features', partial(FeatureStage, analyzer, window), process_safe=True,
+                  **settings['features']),
+            Stage('inference', partial(InferenceStage, engine), **settings['inference']),
+            Stage('alerting', partial(AlertStage, alert_system, on_threat, event_store),
+                  **settings['alerting']),
+        ]
+        # Retired row + capture thread + every worker, with room for nothing else
+        self.shared_stats = SharedStats(slots=2 + sum(stage.workers for stage in self.stages))
+        self.capture_slot = None
+        self.final_stats = None
+
+        uses_processes = any(stage.mode == 'process' for stage in self.stages)
+        # Spawned rather than forked: a fork could inherit locks held by other threads
+        self.context = multiprocessing.get_context(start_method)
+        self.running = self.context.Event() if uses_processes else threading.Event()
+        for previous, stage in zip([None] + self.stages, self.stages):
+            if stage.mode == 'process' or (previous is not None and previous.mode == 'process'):
+                stage.inbox = self.context.Queue(queue_size)
+            else:
+                stage.inbox = queue.Queue(queue_size)
+            if previous is not None:
+                previous.outbox = stage.inbox
+        self.capture_thread = None
+
+        self.ring = None
+        features = self.stages[0]
+        if features.mode == 'process' and transport == 'ring' and not ring_supported():
+            logger.warning(f"Shared-memory ring needs x86-64 store ordering; using queues on {platform.machine()}")
+            transport = 'queue'
+        if features.mode == 'process' and transport == 'ring':
+            self.ring = PacketRing(ring_capacity, ring_bytes, consumers=features.workers,
+                                   chunk=max(1, batch_size // 2))
+            features.ring = self.ring
+            features.ring_args = (batch_size, capture.interface)
+        elif transport not in ('ring', 'queue'):
+            raise ValueError(f"Unknown pipeline transport: {transport}")
+
+    def start(self):
+        """Start the stage workers, then the capture source"""
+        self.running.set()
+        self.finished.clear()
+        self.started_at = time.time()
+        for stage in self.stages:
+            stage.start(self.running, self.context, self.shared_stats)
+        self.capture_slot = self.shared_stats.claim('capture')
+        if not self.capture.is_capturing:
+            self.capture.start_capture()
+        self.capture_thread = threading.Thread(target=self._capture_loop, name='pipeline-capture')
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+        logger.info("Pipeline started: " + ", ".join(
+            f"{stage.name} x{stage.workers} ({stage.mode})" for stage in self.stages))
+
+    def _capture_loop(self):
+        """Move captured packets into the first stage, then drain the stages in order"""
+        capture = self.capture
+        inbox = self.stages[0].inbox
+        ring = self.ring
+        slot = self.capture_slot
+        while True:
+            slot.heartbeat()
+            packets = capture.get_packets(self.batch_size)
+            if not packets:
+                done = not capture.is_capturing or getattr(capture, 'finished', False)
+                if done and not capture.packets_queue:
+                    break
+                time.sleep(0.001)
+                continue
+            slot.add('packets_captured', len(packets))
+            if ring is not None:
+                if not self._write_ring(packets):
+                    break
+            elif not put(inbox, packets, self.running):
+                break
+        self._drain()
+
+    def _write_ring(self, packets):
+        """Copy frames into the ring, waiting for room; returns False if abandoned"""
+        frames = [packet['raw_data'] for packet in packets]
+        timestamps = [packet['timestamp'] for packet in packets]
+        written = self.ring.write_batch(frames, timestamps, wait=False)
+        if written < len(frames):
+            metrics.inc('pipeline_backpressure_waits')
+        while written < len(frames):
+            if not self.running.is_set():
+                return False
+            written += self.ring.write_batch(frames[written:], timestamps[written:], timeout=0.1)
+        return True
+
+    def _drain(self):
+        for stage in self.stages:
+            if stage.ring is not None:
+                stage.ring.close_writer()
+            else:
+                for _ in range(stage.workers):
+                    put(stage.inbox, STOP, self.running)
+            while not stage.join(0.5):
+                if not self.running.is_set():
+                    return  # Abandoned by stop()
+        processed = self.shared_stats.totals()['counters']['packets_processed']
+        logger.info(f"Pipeline drained after {processed} packets")
+        self.finished.set()
+
+    def supervise(self):
+        """Restart crashed worker processes and reclaim their stats slots; call periodically"""
+        if self.started_at is None or self.final_stats is not None or not self.running.is_set():
+            return 0
+        restarted = sum(stage.restart_crashed(self.running, self.context, self.shared_stats)
+                        for stage in self.stages)
+        if restarted:
+            metrics.inc('pipeline_worker_restarts', restarted)
+        self.shared_stats.reap()
+        return restarted
+
+    def join(self, timeout=None):
+        """Wait for a finite source to be fully processed; returns False on timeout"""
+        return self.finished.wait(timeout)
+
+    def stop(self, timeout=10.0):
+        """Stop capturing and let queued work drain; anything left after timeout is abandoned
+
+        Also call this once a finite source has been processed, to release the ring.
+        """
+        if self.started_at is None:
+            self._close_stats()
+            return True
+        self.capture.stop_capture()
+        drained = self.finished.wait(timeout)
+        if not drained:
+            logger.error(f"Pipeline did not drain within {timeout}s; abandoning queued work")
+            self.running.clear()
+            for stage in self.stages:
+                stage.terminate()
+        self._close_ring()
+        self._close_stats()
+        return drained
+
+    def _close_ring(self):
+        ring, self.ring = self.ring, None
+        if ring is not None:
+            ring.close()
+
+    def _close_stats(self):
+        """Keep the final totals readable, then free the shared table"""
+        if self.final_stats is not None:
+            return
+        self.final_stats = {**self.shared_stats.totals(), 'workers': self.shared_stats.workers()}
+        self.capture_slot = None
+        for stage in self.stages:
+            stage.slots = []
+        try:
+            self.shared_stats.close()
+        except BufferError:
+            # An abandoned thread still holds its row; the mapping goes when it does
+            logger.error("Pipeline stats still in use by an abandoned worker")
+
+    def stats(self):
+        """Pipeline counters and gauges summed over every worker, plus one entry per worker"""
+        if self.final_stats is not None:
+            return self.final_stats
+        return {**self.shared_stats.totals(), 'workers': self.shared_stats.workers()}
+
+    def status(self):
+        """Throughput, counters and queue depth per stage; also published as gauges"""
+        stats = self.stats()
+        counters = stats['counters']
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        depths = {'capture': len(self.capture.packets_queue)}
+        depths.update({stage.name: queue_depth(stage.inbox) for stage in self.stages})
+        ring = self.ring
+        if self.stages[0].ring is not None:
+            depths['features'] = len(ring) if ring is not None else 0
+        for name, depth in depths.items():
+            metrics.set_gauge(f"pipeline_queue_depth_{name}", depth)
+        return {
+            'running': self.started_at is not None and not self.finished.is_set(),
+            'packets_captured': counters['packets_captured'],
+            'packets_processed': counters['packets_processed'],
+            'windows': counters['windows_scored'],
+            'threats': counters['threats'],
+            'alerts': counters['alerts'],
+            'stage_errors': counters['stage_errors'],
+            'pps': round(counters['packets_processed'] / elapsed, 1) if elapsed else 0.0,
+            'stages': {
+                stage.name: {'workers': stage.workers, 'mode': stage.mode,
+                             'queue_depth': depths[stage.name], 'queue_size': self.queue_size}
+                for stage in self.stages
+            },
+            'capture_queue_depth': depths['capture'],
+            'workers': stats['workers'],
+        }
@@ -0,0 +1,180 @@
+import bisect
+import ipaddress
+import socket
+from collections import defaultdict
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+def ip_to_int(ip):
+    """(version, integer) for an address string"""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except OSError:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+
+def parse_prefix(prefix):
+    """(version, network as integer, prefix length) for 'a.b.c.d/n', an address or an ip_network"""
+    if not isinstance(prefix, str):
+        network = ipaddress.ip_network(prefix, strict=False)
+        return network.version, int(network.network_address), network.prefixlen
+
+    address, _, length = prefix.partition('/')
+    try:
+        version, network = ip_to_int(address)
+        bits = ADDRESS_BITS[version]
+        length = int(length) if length else bits
+    except (OSError, ValueError):
+        raise ValueError(f"Invalid prefix {prefix!r}")
+    if not 0 <= length <= bits:
+        raise ValueError(f"Invalid prefix length in {prefix!r}")
+    return version, network >> (bits - length) << (bits - length), length
+
+def format_prefix(version, network, length):
+    """Prefix string; full-length prefixes are written as plain addresses"""
+    address = ipaddress.IPv4Address(network) if version == 4 else ipaddress.IPv6Address(network)
+    if length == ADDRESS_BITS[version]:
+        return str(address)
+    return f"{address}/{length}"
+
+class PrefixTable:
+    """Longest-prefix-match table over IPv4/IPv6 prefixes
+
+    Prefixes are kept in one dict per (version, prefix length), keyed by the
+    network bits as an integer. A lookup probes the populated lengths from
+    longest to shortest, so it costs at most one dict hit per distinct length
+    instead of a walk down a bit-by-bit trie.
+    """
+
+    def __init__(self, prefixes=None):
+        self.tables = {4: {}, 6: {}}
+        self.lengths = {4: [], 6: []}
+        self._ancestors = None
+        for entry in prefixes or []:
+            if isinstance(entry, tuple):
+                self.add(*entry)
+            else:
+                self.add(entry)
+
+    def __len__(self):
+        return sum(len(table) for family in self.tables.values() for table in family.values())
+
+    def __contains__(self, ip):
+        return self.lookup(ip) is not None
+
+    def add(self, prefix, value=True):
+        """Add or replace a prefix"""
+        version, network, length = parse_prefix(prefix)
+        table = self.tables[version].get(length)
+        if table is None:
+            table = self.tables[version][length] = {}
+            self.lengths[version] = sorted(self.tables[version], reverse=True)
+        table[network >> (ADDRESS_BITS[version] - length)] = value
+        self._ancestors = None
+
+    def remove(self, prefix):
+        """Remove a prefix; returns whether it was present"""
+        version, network, length = parse_prefix(prefix)
+        table = self.tables[version].get(length)
+        if table is None or table.pop(network >> (ADDRESS_BITS[version] - length), None) is None:
+            return False
+        if not table:
+            del self.tables[version][length]
+            self.lengths[version] = sorted(self.tables[version], reverse=True)
+        self._ancestors = None
+        return True
+
+    def lookup(self, ip):
+        """Value of the longest prefix containing ip (a string or (version, int)), or None"""
+        version, address = ip_to_int(ip) if isinstance(ip, str) else ip
+        bits = ADDRESS_BITS[version]
+        tables = self.tables[version]
+        for length in self.lengths[version]:
+            value = tables[length].get(address >> (bits - length))
+            if value is not None:
+                return value
+        return None
+
+    def match(self, ip):
+        """Longest matching prefix as a string, or None"""
+        version, address = ip_to_int(ip) if isinstance(ip, str) else ip
+        bits = ADDRESS_BITS[version]
+        for length in self.lengths[version]:
+            key = address >> (bits - length)
+            if key in self.tables[version][length]:
+                return format_prefix(version, key << (bits - length), length)
+        return None
+
+    def overlaps(self, prefix):
+        """Whether any stored prefix contains or lies inside prefix"""
+        version, network, length = parse_prefix(prefix)
+        bits = ADDRESS_BITS[version]
+        for stored in self.lengths[version]:
+            if stored <= length and (network >> (bits - stored)) in self.tables[version][stored]:
+                return True
+        if self._ancestors is None:
+            self._ancestors = self._build_ancestors()
+        return (version, length, network >> (bits - length)) in self._ancestors
+
+    def _build_ancestors(self):
+        """Every (version, length, key) that has a stored prefix beneath it"""
+        ancestors = set()
+        for version, tables in self.tables.items():
+            for length, table in tables.items():
+                for key in table:
+                    for shift in range(length + 1):
+                        ancestors.add((version, length - shift, key >> shift))
+        return ancestors
+
+    def prefixes(self):
+        """All stored prefixes as (prefix string, value)"""
+        for version, tables in self.tables.items():
+            bits = ADDRESS_BITS[version]
+            for length, table in tables.items():
+                for key, value in table.items():
+                    yield format_prefix(version, key << (bits - length), length), value
+
+def aggregate(ips, max_collateral=0.25, min_prefix_v4=24, min_prefix_v6=64, exclude=None):
+    """Cover addresses with as few prefixes as the collateral threshold allows
+
+    Working down from the minimum prefix length, a prefix is used when at least
+    (1 - max_collateral) of its addresses are in ips and it doesn't overlap
+    anything in exclude; otherwise its two halves are tried. Returns
+    {prefix string: [addresses it covers]}; addresses that could not be merged
+    map to themselves.
+    """
+    families = {4: defaultdict(list), 6: defaultdict(list)}
+    for ip in ips:
+        version, address = ip_to_int(ip)
+        families[version][address].append(ip)
+
+    result = {}
+    for version, members in families.items():
+        if not members:
+            continue
+        bits = ADDRESS_BITS[version]
+        min_length = min_prefix_v4 if version == 4 else min_prefix_v6
+        addresses = sorted(members)
+
+        # (start index, end index, network, prefix length) still to be covered
+        stack = []
+        start = 0
+        while start < len(addresses):
+            network = addresses[start] >> (bits - min_length) << (bits - min_length)
+            end = bisect.bisect_left(addresses, network + (1 << (bits - min_length)), start)
+            stack.append((start, end, network, min_length))
+            start = end
+
+        while stack:
+            start, end, network, length = stack.pop()
+            if start == end:
+                continue
+            prefix = format_prefix(version, network, length)
+            if length == bits or (end - start >= (1 - max_collateral) * (1 << (bits - length))
+                                  and not (exclude and exclude.overlaps(prefix))):
+                result[prefix] = [ip for address in addresses[start:end] for ip in members[address]]
+                continue
+            middle = network + (1 << (bits - length - 1))
+            split = bisect.bisect_left(addresses, middle, start, end)
+            stack.append((split, end, middle, length + 1))
+            stack.append((start, split, network, length + 1))
+    return result
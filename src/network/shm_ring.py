@@ -0,0 +1,261 @@
+import platform
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+MAX_CONSUMERS = 64
+
+# Header words (int64)
+WRITE_SEQ, CLOSED, CAPACITY, DATA_SIZE, CONSUMERS, CHUNK = range(6)
+CURSORS = 8
+HEADER_WORDS = CURSORS + MAX_CONSUMERS
+
+# Polling interval bounds (seconds) while waiting on the other side
+MIN_BACKOFF = 0.00005
+MAX_BACKOFF = 0.002
+
+def ring_supported():
+    """Whether this machine orders stores strongly enough for the ring (x86-64)"""
+    return platform.machine().lower() in ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+
+class PacketRing:
+    """Single-producer, multi-consumer ring of frames in shared memory
+
+    Frames are copied once into a circular data region; per-record metadata
+    (sequence number, start, length, timestamp) sits in a slot array, so
+    consumers find frames by offset and nothing is pickled. Records are dealt
+    out in chunks of `chunk` consecutive records, consumer k taking chunks
+    k, k + N, k + 2N, ...
+
+    Synchronisation is by sequence numbers only. The producer writes the
+    frame and slot fields, then the slot's sequence number, then advances
+    the shared write sequence. Each consumer publishes a cursor (every
+    record below it is done with) and the producer never overwrites a slot
+    or byte range a cursor hasn't passed. Every header word has a single
+    writer, so no locks are needed.
+
+    There are no memory barriers either: the protocol relies on stores
+    becoming visible to other cores in program order, which x86-64 (TSO)
+    guarantees and ARM and POWER don't. On those machines a consumer could
+    see a new sequence number before the frame it publishes, so the ring
+    is x86-64 only; Pipeline falls back to queues elsewhere.
+    """
+
+    def __init__(self, capacity=65536, data_size=64 << 20, consumers=1, chunk=64, name=None):
+        if not 1 <= consumers <= MAX_CONSUMERS:
+            raise ValueError(f"consumers must be between 1 and {MAX_CONSUMERS}")
+        size = HEADER_WORDS * 8 + capacity * 32 + data_size
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.owner = True
+        self._map(capacity, data_size)
+        self.header[:] = 0
+        self.header[CAPACITY], self.header[DATA_SIZE] = capacity, data_size
+        self.header[CONSUMERS], self.header[CHUNK] = consumers, chunk
+        self.slot_seq[:] = -1
+        self._init_state()
+
+    @classmethod
+    def attach(cls, name):
+        """Open an existing ring by name, e.g. from a worker process"""
+        ring = cls.__new__(cls)
+        if sys.version_info >= (3, 13):
+            ring.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            ring.shm = shared_memory.SharedMemory(name=name)
+        ring.owner = False
+        header = np.ndarray(HEADER_WORDS, dtype=np.int64, buffer=ring.shm.buf)
+        ring._map(int(header[CAPACITY]), int(header[DATA_SIZE]))
+        ring._init_state()
+        return ring
+
+    def _map(self, capacity, data_size):
+        buf = self.shm.buf
+        offset = HEADER_WORDS * 8
+        self.header = np.ndarray(HEADER_WORDS, dtype=np.int64, buffer=buf)
+        self.slot_seq = np.ndarray(capacity, dtype=np.int64, buffer=buf, offset=offset)
+        self.slot_start = np.ndarray(capacity, dtype=np.int64, buffer=buf, offset=offset + capacity * 8)
+        self.slot_length = np.ndarray(capacity, dtype=np.int64, buffer=buf, offset=offset + capacity * 16)
+        self.slot_time = np.ndarray(capacity, dtype=np.float64, buffer=buf, offset=offset + capacity * 24)
+        self.data_offset = offset + capacity * 32
+        self.data = buf[self.data_offset:self.data_offset + data_size]
+        self.capacity = capacity
+        self.data_size = data_size
+
+    def _init_state(self):
+        self.consumers = int(self.header[CONSUMERS])
+        self.chunk = int(self.header[CHUNK])
+        # Producer side: next sequence number and monotonic byte position
+        self._seq = int(self.header[WRITE_SEQ])
+        self._head = 0
+        self._min_cursor = 0
+        # Consumer side: next sequence number to examine, per consumer
+        self._next = {}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        """Records written but not yet released by every consumer"""
+        return int(self.header[WRITE_SEQ] - self.header[CURSORS:CURSORS + self.consumers].min())
+
+    # Producer
+
+    def _room(self, seq, head):
+        """(free slots, free bytes) given the last published consumer cursors"""
+        oldest = int(self.slot_start[self._min_cursor % self.capacity]) if self._min_cursor < seq else head
+        return self.capacity - (seq - self._min_cursor), self.data_size - (head - oldest)
+
+    def write_batch(self, frames, timestamps=None, wait=True, timeout=None):
+        """Append frames; returns how many were written
+
+        Consecutive frames are laid out back to back, so each run that fits
+        before the end of the data region is copied with one join. When the
+        ring is full, waits for consumers (up to timeout) if wait is set,
+        otherwise stops early so the caller can drop the rest.
+        """
+        count = len(frames)
+        lengths = np.fromiter(map(len, frames), dtype=np.int64, count=count)
+        if count and lengths.max() > self.data_size:
+            raise ValueError(f"Frame of {lengths.max()} bytes does not fit the ring")
+        ends = np.cumsum(lengths)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        backoff = MIN_BACKOFF
+        written = 0
+        while written < count:
+            seq, head = self._seq, self._head
+            position = head % self.data_size
+            to_region_end = self.data_size - position
+            base = int(ends[written - 1]) if written else 0
+            pad = to_region_end if lengths[written] > to_region_end else 0
+
+            slots, free = self._room(seq, head)
+            if slots <= 0 or free < pad + lengths[written]:
+                self._min_cursor = int(self.header[CURSORS:CURSORS + self.consumers].min())
+                slots, free = self._room(seq, head)
+            if slots <= 0 or free < pad + lengths[written]:
+                if not wait or (deadline is not None and time.monotonic() >= deadline):
+                    break
+                # Back off so a full ring doesn't spin the CPU the consumers need
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = MIN_BACKOFF
+            if pad:
+                # Frames never wrap; skip to the start of the region
+                head += pad
+                position = 0
+                free -= pad
+
+            # Longest run that fits in the slots, the free bytes and before the region end
+            limit = min(free, self.data_size - position)
+            run = int(np.searchsorted(ends[written:], base + limit, side='right'))
+            run = min(run, slots, count - written)
+            total = int(ends[written + run - 1]) - base
+            self.data[position:position + total] = b''.join(frames[written:written + run])
+
+            seqs = np.arange(seq, seq + run, dtype=np.int64)
+            indices = seqs % self.capacity
+            self.slot_start[indices] = head + (ends[written:written + run] - lengths[written:written + run] - base)
+            self.slot_length[indices] = lengths[written:written + run]
+            self.slot_time[indices] = time.time() if timestamps is None else timestamps[written:written + run]
+            # Sequence numbers last: a slot is only readable once its number matches
+            self.slot_seq[indices] = seqs
+            self.header[WRITE_SEQ] = seq + run
+            self._seq = seq + run
+            self._head = head + total
+            written += run
+        return written
+
+    def close_writer(self):
+        """Tell consumers no more records are coming"""
+        self.header[CLOSED] = 1
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    # Consumers
+
+    def _owned_from(self, seq, consumer):
+        """First sequence number >= seq in a chunk that belongs to consumer"""
+        chunk_id = seq // self.chunk
+        skip = (consumer - chunk_id) % self.consumers
+        return seq if skip == 0 else (chunk_id + skip) * self.chunk
+
+    def read(self, consumer, max_records=256):
+        """(offsets, lengths, timestamps) of this consumer's next records, without copying
+
+        Offsets index into self.data. The records stay valid until release().
+        """
+        next_seq = self._next.get(consumer)
+        if next_seq is None:
+            next_seq = int(self.header[CURSORS + consumer])
+        write_seq = int(self.header[WRITE_SEQ])
+
+        ranges = []
+        taken = 0
+        seq = self._owned_from(next_seq, consumer)
+        while seq < write_seq and taken < max_records:
+            end = min((seq // self.chunk + 1) * self.chunk, write_seq, seq + max_records - taken)
+            ranges.append(np.arange(seq, end, dtype=np.int64))
+            taken += end - seq
+            seq = self._owned_from(end, consumer)
+        # Everything before the next owned record is either read now or someone else's
+        self._next[consumer] = min(seq, write_seq)
+
+        if not ranges:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+        seqs = np.concatenate(ranges)
+        slots = seqs % self.capacity
+        if not np.array_equal(self.slot_seq[slots], seqs):
+            raise RuntimeError("Ring slot overwritten before it was released")
+        offsets = self.slot_start[slots] % self.data_size
+        return offsets, self.slot_length[slots].copy(), self.slot_time[slots].copy()
+
+    def release(self, consumer):
+        """Let the producer reuse everything this consumer has read or skipped"""
+        if consumer in self._next:
+            self.header[CURSORS + consumer] = self._next[consumer]
+
+    def read_frames(self, consumer, max_records=256):
+        """Copies of this consumer's next frames as [(bytes, timestamp)], released immediately"""
+        offsets, lengths, timestamps = self.read(consumer, max_records)
+        data = self.data
+        frames = [(bytes(data[offset:offset + length]), timestamp) for offset, length, timestamp
+                  in zip(offsets.tolist(), lengths.tolist(), timestamps.tolist())]
+        self.release(consumer)
+        return frames
+
+    def wait(self, consumer, timeout=None):
+        """Poll, backing off, until this consumer has records or the ring is finished
+
+        Returns whether records are available.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        backoff = MIN_BACKOFF
+        while True:
+            next_seq = self._next.get(consumer, int(self.header[CURSORS + consumer]))
+            if self._owned_from(next_seq, consumer) < int(self.header[WRITE_SEQ]):
+                return True
+            if self.closed or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def finished(self, consumer):
+        """Whether the writer has closed and this consumer has seen every record"""
+        if not self.closed:
+            return False
+        next_seq = self._next.get(consumer, int(self.header[CURSORS + consumer]))
+        return self._owned_from(next_seq, consumer) >= int(self.header[WRITE_SEQ])
+
+    def close(self):
+        """Detach from the shared memory; the owner also removes it"""
+        self.header = self.slot_seq = self.slot_start = self.slot_length = self.slot_time = None
+        self.data.release()
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
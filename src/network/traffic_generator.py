@@ -0,0 +1,393 @@
+import struct
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Scenario labels follow ThreatClassifier.threat_classes
+SCENARIO_LABELS = {
+    'normal': 0,
+    'port_scan': 1,
+    'syn_flood': 2,
+    'malware': 3,
+    'brute_force': 4
+}
+
+DEFAULT_MIX = {
+    'normal': 0.7,
+    'port_scan': 0.05,
+    'syn_flood': 0.15,
+    'malware': 0.05,
+    'brute_force': 0.05
+}
+
+ETH_HEADER_LEN = 14
+IP_HEADER_LEN = 20
+TCP_HEADER_LEN = 20
+UDP_HEADER_LEN = 8
+MAX_PAYLOAD = 1400
+FRAME_STRIDE = ETH_HEADER_LEN + IP_HEADER_LEN + TCP_HEADER_LEN + MAX_PAYLOAD
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_PSH, TCP_ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+PCAP_GLOBAL_HEADER = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+PCAP_RECORD_DTYPE = np.dtype([('sec', '<u4'), ('usec', '<u4'), ('incl', '<u4'), ('orig', '<u4')])
+
+class FrameBatch:
+    """Raw frames packed back to back in one contiguous byte buffer"""
+
+    def __init__(self, buffer, offsets, lengths, timestamps, labels):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.lengths = lengths
+        self.timestamps = timestamps
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def frame(self, index):
+        """Bytes of a single frame"""
+        start = self.offsets[index]
+        return self.buffer[start:start + self.lengths[index]].tobytes()
+
+    def to_packets(self, interface='replay'):
+        """Convert to the packet dicts produced by PacketCapture"""
+        raw = self.buffer.tobytes()
+        packets = []
+        for start, length, timestamp, label in zip(
+                self.offsets.tolist(), self.lengths.tolist(),
+                self.timestamps.tolist(), self.labels.tolist()):
+            packets.append({
+                'timestamp': timestamp,
+                'raw_data': raw[start:start + length],
+                'length': length,
+                'interface': interface,
+                'label': label
+            })
+        return packets
+
+    @classmethod
+    def concat(cls, batches):
+        """Join several batches into one"""
+        lengths = np.concatenate([b.lengths for b in batches])
+        offsets = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        return cls(
+            np.concatenate([b.buffer for b in batches]),
+            offsets,
+            lengths,
+            np.concatenate([b.timestamps for b in batches]),
+            np.concatenate([b.labels for b in batches])
+        )
+
+class TrafficGenerator:
+    """Bulk generator of labeled Ethernet/IPv4/TCP/UDP frames"""
+
+    def __init__(self, seed=42, target_ip='192.168.1.10', chunk_size=65536):
+        self.rng = np.random.default_rng(seed)
+        self.target_ip = _ip_to_int(target_ip)
+        self.chunk_size = chunk_size
+        self.client_pool = _ip_to_int('10.0.0.0') + self.rng.integers(1, 65534, 2048)
+        self.payload_pool = self._build_payload_pool()
+        self.payload_prefix = np.zeros((len(self.payload_pool), MAX_PAYLOAD // 2 + 1), dtype=np.int64)
+        np.cumsum(self.payload_pool.view('>u2'), axis=1, out=self.payload_prefix[:, 1:])
+
+    def _build_payload_pool(self):
+        """Payload templates: 0-15 web, 16-31 login attempts, 32-63 high-entropy"""
+        pool = np.zeros((64, MAX_PAYLOAD), dtype=np.uint8)
+        for i in range(16):
+            text = (f"GET /page/{i} HTTP/1.1\r\nHost: intranet.local\r\n"
+                    f"User-Agent: Mozilla/5.0\r\nAccept: */*\r\n\r\n").encode()
+            pool[i] = np.frombuffer((text * (MAX_PAYLOAD // len(text) + 1))[:MAX_PAYLOAD], np.uint8)
+        for i in range(16, 32):
+            text = f"USER admin\r\nPASS guess{i:04d}\r\n".encode()
+            pool[i] = np.frombuffer((text * (MAX_PAYLOAD // len(text) + 1))[:MAX_PAYLOAD], np.uint8)
+        pool[32:] = self.rng.integers(0, 256, (32, MAX_PAYLOAD), dtype=np.uint8)
+        pool[32:, :4] = np.frombuffer(b'MZ\x90\x00', np.uint8)
+        return pool
+
+    def _scenario_fields(self, scenario, n, start_time, pps):
+        """Header fields for n packets of one scenario"""
+        rng = self.rng
+        fields = {
+            'timestamp': start_time + np.cumsum(rng.exponential(1.0 / pps, n)),
+            'label': np.full(n, SCENARIO_LABELS[scenario], dtype=np.uint8),
+            'protocol': np.full(n, 6, dtype=np.uint8),
+            'src_ip': np.zeros(n, dtype=np.uint32),
+            'dst_ip': np.full(n, self.target_ip, dtype=np.uint32),
+            'src_port': rng.integers(32768, 61000, n).astype(np.uint16),
+            'dst_port': np.zeros(n, dtype=np.uint16),
+            'tcp_flags': np.full(n, TCP_PSH | TCP_ACK, dtype=np.uint8),
+            'ttl': rng.choice(np.array([64, 128], dtype=np.uint8), n),
+            'window': np.full(n, 64240, dtype=np.uint16),
+            'payload_len': np.zeros(n, dtype=np.int64),
+            'payload_template': np.zeros(n, dtype=np.int64)
+        }
+
+        if scenario == 'normal':
+            fields['src_ip'] = rng.choice(self.client_pool, n).astype(np.uint32)
+            udp = rng.random(n) < 0.2
+            fields['protocol'][udp] = 17
+            fields['dst_port'] = rng.choice(np.array([80, 443, 443, 22, 25, 8080], dtype=np.uint16), n)
+            fields['dst_port'][udp] = 53
+            fields['tcp_flags'] = rng.choice(
+                np.array([TCP_ACK, TCP_PSH | TCP_ACK, TCP_PSH | TCP_ACK, TCP_SYN, TCP_FIN | TCP_ACK],
+                         dtype=np.uint8), n)
+            fields['payload_len'] = np.minimum(rng.exponential(400, n).astype(np.int64), MAX_PAYLOAD)
+            fields['payload_len'][fields['tcp_flags'] == TCP_SYN] = 0
+            fields['payload_template'] = rng.integers(0, 16, n)
+        elif scenario == 'syn_flood':
+            # Spoofed sources from the whole address space
+            fields['src_ip'] = rng.integers(0x01000000, 0xdf000000, n, dtype=np.uint32)
+            fields['dst_port'][:] = 80
+            fields['tcp_flags'][:] = TCP_SYN
+            fields['ttl'] = rng.integers(32, 255, n).astype(np.uint8)
+            fields['window'][:] = 1024
+        elif scenario == 'port_scan':
+            scanners = _ip_to_int('203.0.113.0') + rng.integers(1, 255, 4)
+            fields['src_ip'] = np.repeat(scanners, -(-n // 4))[:n].astype(np.uint32)
+            fields['dst_port'] = (np.arange(n) % 65535 + 1).astype(np.uint16)
+            fields['tcp_flags'][:] = TCP_SYN
+            fields['window'][:] = 1024
+        elif scenario == 'brute_force':
+            attackers = _ip_to_int('198.51.100.0') + rng.integers(1, 255, 8)
+            fields['src_ip'] = rng.choice(attackers, n).astype(np.uint32)
+            fields['dst_port'] = rng.choice(np.array([22, 21, 3389], dtype=np.uint16), n)
+            fields['payload_len'] = rng.integers(20, 80, n)
+            fields['payload_template'] = rng.integers(16, 32, n)
+        elif scenario == 'malware':
+            infected = rng.choice(self.client_pool, 4)
+            fields['src_ip'] = rng.choice(infected, n).astype(np.uint32)
+            fields['dst_ip'] = (_ip_to_int('185.220.0.0') + rng.integers(1, 65534, n)).astype(np.uint32)
+            fields['dst_port'] = rng.choice(np.array([4444, 6667, 8081, 1337], dtype=np.uint16), n)
+            fields['payload_len'] = rng.integers(200, MAX_PAYLOAD + 1, n)
+            fields['payload_template'] = rng.integers(32, 64, n)
+        else:
+            raise ValueError(f"Unsupported scenario: {scenario}")
+
+        return fields
+
+    def generate(self, scenario, n_packets, start_time=0.0, pps=10000):
+        """Generate a batch of frames for a single scenario"""
+        fields = self._scenario_fields(scenario, n_packets, start_time, pps)
+        return self._build_batch(fields)
+
+    def generate_mix(self, n_packets, mix=None, start_time=0.0, pps=10000):
+        """Generate interleaved frames from several scenarios, ordered by time"""
+        mix = mix or DEFAULT_MIX
+        names = list(mix)
+        weights = np.array([mix[name] for name in names], dtype=np.float64)
+        counts = self.rng.multinomial(n_packets, weights / weights.sum())
+
+        parts = [self._scenario_fields(name, count, start_time, pps * mix[name] / weights.sum())
+                 for name, count in zip(names, counts) if count > 0]
+        fields = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        order = np.argsort(fields['timestamp'], kind='stable')
+        return self._build_batch({key: value[order] for key, value in fields.items()})
+
+    def iter_batches(self, n_packets, batch_size=10000, mix=None, start_time=0.0, pps=10000):
+        """Yield consecutive mixed batches until n_packets have been produced"""
+        produced = 0
+        while produced < n_packets:
+            count = min(batch_size, n_packets - produced)
+            batch = self.generate_mix(count, mix, start_time, pps)
+            start_time = float(batch.timestamps[-1])
+            produced += count
+            yield batch
+
+    def training_set(self, analyzer, window=100, windows_per_scenario=40):
+        """Window features and scenario labels for bootstrapping the models"""
+        X, y = [], []
+        for scenario, label in SCENARIO_LABELS.items():
+            packets = self.generate(scenario, window * windows_per_scenario).to_packets()
+            for start in range(0, len(packets), window):
+                X.append(analyzer.create_traffic_features(packets[start:start + window]))
+                y.append(label)
+        return np.array(X), np.array(y)
+
+    def _build_batch(self, fields):
+        """Assemble frames chunk by chunk and pack them into one buffer"""
+        n = len(fields['timestamp'])
+        buffers, lengths = [], []
+        for start in range(0, n, self.chunk_size):
+            chunk = {key: value[start:start + self.chunk_size] for key, value in fields.items()}
+            frames, frame_lengths = self._build_frames(chunk)
+            mask = np.arange(FRAME_STRIDE) < frame_lengths[:, None]
+            buffers.append(frames[mask])
+            lengths.append(frame_lengths)
+
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        offsets = np.zeros(n, dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        buffer = np.concatenate(buffers) if buffers else np.zeros(0, dtype=np.uint8)
+        return FrameBatch(buffer, offsets, lengths, fields['timestamp'].astype(np.float64),
+                          fields['label'])
+
+    def _build_frames(self, f):
+        """Write headers, payloads and checksums into a (n, FRAME_STRIDE) array"""
+        n = len(f['timestamp'])
+        frames = np.zeros((n, FRAME_STRIDE), dtype=np.uint8)
+        is_tcp = f['protocol'] == 6
+        l4_len = np.where(is_tcp, TCP_HEADER_LEN, UDP_HEADER_LEN) + f['payload_len']
+        ip_len = IP_HEADER_LEN + l4_len
+        frame_lengths = ETH_HEADER_LEN + ip_len
+
+        # Ethernet: locally administered MACs derived from the addresses
+        frames[:, 0] = 0x02
+        _put32(frames, 2, f['dst_ip'])
+        frames[:, 6] = 0x02
+        _put32(frames, 8, f['src_ip'])
+        _put16(frames, 12, np.full(n, 0x0800))
+
+        # IPv4
+        ip = ETH_HEADER_LEN
+        frames[:, ip] = 0x45
+        _put16(frames, ip + 2, ip_len)
+        _put16(frames, ip + 4, self.rng.integers(0, 65536, n))
+        _put16(frames, ip + 6, np.full(n, 0x4000))  # Don't fragment
+        frames[:, ip + 8] = f['ttl']
+        frames[:, ip + 9] = f['protocol']
+        _put32(frames, ip + 12, f['src_ip'])
+        _put32(frames, ip + 16, f['dst_ip'])
+        _put16(frames, ip + 10, _fold_checksum(_word_sum(frames[:, ip:ip + IP_HEADER_LEN])))
+
+        # TCP/UDP headers
+        l4 = ip + IP_HEADER_LEN
+        _put16(frames, l4, f['src_port'])
+        _put16(frames, l4 + 2, f['dst_port'])
+        tcp_rows = np.flatnonzero(is_tcp)
+        udp_rows = np.flatnonzero(~is_tcp)
+        seq = self.rng.integers(0, 2 ** 32, len(tcp_rows), dtype=np.uint64).astype(np.int64)
+        frames[tcp_rows, l4 + 4] = (seq >> 24) & 0xff
+        frames[tcp_rows, l4 + 5] = (seq >> 16) & 0xff
+        frames[tcp_rows, l4 + 6] = (seq >> 8) & 0xff
+        frames[tcp_rows, l4 + 7] = seq & 0xff
+        frames[tcp_rows, l4 + 12] = 0x50
+        frames[tcp_rows, l4 + 13] = f['tcp_flags'][tcp_rows]
+        frames[tcp_rows, l4 + 14] = f['window'][tcp_rows] >> 8
+        frames[tcp_rows, l4 + 15] = f['window'][tcp_rows] & 0xff
+        frames[udp_rows, l4 + 4] = l4_len[udp_rows] >> 8
+        frames[udp_rows, l4 + 5] = l4_len[udp_rows] & 0xff
+
+        # Header words are summed before payloads land on the UDP rows
+        header_sum = _word_sum(frames[:, l4:l4 + UDP_HEADER_LEN])
+        header_sum[tcp_rows] += _word_sum(frames[tcp_rows, l4 + UDP_HEADER_LEN:l4 + TCP_HEADER_LEN])
+
+        templates = f['payload_template']
+        payload_len = f['payload_len']
+        frames[tcp_rows, l4 + TCP_HEADER_LEN:] = self.payload_pool[templates[tcp_rows]]
+        frames[udp_rows, l4 + UDP_HEADER_LEN:l4 + UDP_HEADER_LEN + MAX_PAYLOAD] = \
+            self.payload_pool[templates[udp_rows]]
+
+        # Payload words come from per-template prefix sums, so bytes past the
+        # end of a frame never need clearing
+        payload_sum = self.payload_prefix[templates, payload_len // 2]
+        odd = (payload_len & 1).astype(bool)
+        payload_sum[odd] += self.payload_pool[templates[odd], payload_len[odd] - 1].astype(np.int64) << 8
+
+        # Pseudo header: addresses, protocol and L4 length
+        pseudo = (_word_sum32(f['src_ip']) + _word_sum32(f['dst_ip'])
+                  + f['protocol'].astype(np.int64) + l4_len)
+        l4_checksum = _fold_checksum(header_sum + payload_sum + pseudo)
+        l4_checksum[~is_tcp & (l4_checksum == 0)] = 0xffff
+        checksum_offset = np.where(is_tcp, l4 + 16, l4 + 6)
+        rows = np.arange(n)
+        frames[rows, checksum_offset] = l4_checksum >> 8
+        frames[rows, checksum_offset + 1] = l4_checksum & 0xff
+
+        return frames, frame_lengths
+
+def write_pcap(batch, filepath, chunk_size=65536):
+    """Write a batch to a libpcap file"""
+    n = len(batch)
+    with open(filepath, 'wb') as f:
+        f.write(PCAP_GLOBAL_HEADER)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            count = stop - start
+            lengths = batch.lengths[start:stop]
+            timestamps = batch.timestamps[start:stop]
+            records = np.zeros(count, dtype=PCAP_RECORD_DTYPE)
+            records['sec'] = timestamps.astype(np.int64)
+            records['usec'] = ((timestamps % 1) * 1e6).astype(np.int64)
+            records['incl'] = lengths
+            records['orig'] = lengths
+
+            # Interleave 16-byte record headers with the frame bytes
+            base = batch.offsets[start]
+            data = batch.buffer[base:base + int(lengths.sum())]
+            offsets = batch.offsets[start:stop] - base
+            out = np.empty(16 * count + len(data), dtype=np.uint8)
+            record_pos = 16 * np.arange(count, dtype=np.int64) + offsets
+            out[record_pos[:, None] + np.arange(16)] = records.view(np.uint8).reshape(count, 16)
+            frame_index = np.repeat(np.arange(count, dtype=np.int64), lengths)
+            out[np.arange(len(data)) + 16 * (frame_index + 1)] = data
+            f.write(out.tobytes())
+    logger.info(f"Wrote {n} frames to {filepath}")
+
+def read_pcap(filepath):
+    """Read a libpcap file into a FrameBatch (labels are unknown, set to 0)"""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+
+    magic = struct.unpack('<I', data[:4])[0]
+    if magic in (0xa1b2c3d4, 0xa1b23c4d):
+        endian = '<'
+    elif magic in (0xd4c3b2a1, 0x4d3cb2a1):
+        endian = '>'
+    else:
+        raise ValueError(f"Not a pcap file: {filepath}")
+    ts_scale = 1e-9 if magic in (0xa1b23c4d, 0x4d3cb2a1) else 1e-6
+
+    record = struct.Struct(f'{endian}IIII')
+    chunks, lengths, timestamps = [], [], []
+    pos = len(PCAP_GLOBAL_HEADER)
+    while pos + 16 <= len(data):
+        sec, frac, incl, _ = record.unpack_from(data, pos)
+        if pos + 16 + incl > len(data):
+            break
+        chunks.append(data[pos + 16:pos + 16 + incl])
+        lengths.append(incl)
+        timestamps.append(sec + frac * ts_scale)
+        pos += 16 + incl
+    if pos < len(data):
+        logger.warning(f"Capture {filepath} ends in a partial record; ignoring it")
+
+    lengths = np.array(lengths, dtype=np.int64)
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    buffer = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+    return FrameBatch(buffer, offsets, lengths, np.array(timestamps, dtype=np.float64),
+                      np.zeros(len(lengths), dtype=np.uint8))
+
+def _ip_to_int(ip):
+    """Dotted quad to integer"""
+    return struct.unpack('!I', bytes(int(part) for part in ip.split('.')))[0]
+
+def _put16(frames, col, values):
+    """Store big-endian 16-bit values at a column"""
+    values = np.asarray(values, dtype=np.int64)
+    frames[:, col] = (values >> 8) & 0xff
+    frames[:, col + 1] = values & 0xff
+
+def _put32(frames, col, values):
+    """Store big-endian 32-bit values at a column"""
+    values = np.asarray(values, dtype=np.int64)
+    _put16(frames, col, values >> 16)
+    _put16(frames, col + 2, values & 0xffff)
+
+def _word_sum32(values):
+    """Sum of the two 16-bit halves of 32-bit values"""
+    values = values.astype(np.int64)
+    return (values >> 16) + (values & 0xffff)
+
+def _word_sum(region):
+    """Sum of the big-endian 16-bit words in each row of an even-width byte array"""
+    return np.ascontiguousarray(region).view('>u2').sum(axis=1, dtype=np.int64)
+
+def _fold_checksum(total):
+    """Fold 32-bit word sums into one's-complement checksums"""
+    total = (total & 0xffff) + (total >> 16)
+    total = (total & 0xffff) + (total >> 16)
+    return (~total) & 0xffff
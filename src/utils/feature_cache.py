@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class FeatureCache:
+    """Content-addressed cache of extracted feature arrays, bounded in size
+
+    Entries are keyed by a hash of the input file's bytes plus the feature
+    spec, so a changed capture or a new feature version never hits a stale
+    entry. Each entry is a directory of .npy files loaded memory-mapped;
+    reading an entry marks it recently used, and the least recently used
+    entries are evicted once the cache exceeds max_bytes. Input hashes are
+    remembered per (path, size, mtime), so unchanged files aren't re-read
+    just to look them up.
+    """
+
+    INDEX_NAME = "digests.json"
+
+    def __init__(self, directory, max_bytes=2 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'build_s': 0.0, 'load_s': 0.0, 'saved_s': 0.0}
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, self.INDEX_NAME)
+        self._digests = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading feature cache index: {e}")
+            return {}
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._digests, f)
+        os.replace(tmp_path, self.index_path)
+
+    def file_digest(self, path, chunk_size=1 << 20):
+        """SHA-256 of a file's contents, reused while its size and mtime are unchanged"""
+        stat = os.stat(path)
+        signature = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        with self.lock:
+            digest = self._digests.get(signature)
+        if digest is not None:
+            return digest
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self.lock:
+            # Forget older signatures of the same path
+            prefix = f"{os.path.abspath(path)}:"
+            self._digests = {key: value for key, value in self._digests.items() if not key.startswith(prefix)}
+            self._digests[signature] = digest
+            self._write_index()
+        return digest
+
+    def key(self, source_path, spec):
+        """Cache key for a source file processed under a feature spec"""
+        spec_json = json.dumps(spec, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.file_digest(source_path)}\n{spec_json}".encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Arrays of a cached entry, memory-mapped, or None on a miss"""
+        path = self._entry_path(key)
+        start = time.perf_counter()
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in meta['arrays']}
+            # The entry's mtime is its last use, for LRU eviction
+            os.utime(path)
+            build_s = float(meta.get('build_s', 0.0))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading feature cache entry {key[:12]}: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.stats['load_s'] += elapsed
+            self.stats['saved_s'] += max(build_s - elapsed, 0.0)
+        return arrays
+
+    def put(self, key, arrays, build_s=0.0, meta=None):
+        """Store arrays under key, then evict least recently used entries beyond max_bytes"""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(array))
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump({**(meta or {}), 'arrays': list(arrays), 'build_s': build_s,
+                           'created': time.time()}, f, default=str)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Another process stored the same entry first; the contents are identical
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        self.evict()
+
+    def get_or_build(self, source_path, spec, build):
+        """Cached arrays for source_path under spec, calling build() and storing its arrays on a miss"""
+        key = self.key(source_path, spec)
+        arrays = self.get(key)
+        if arrays is not None:
+            with self.lock:
+                self.stats['hits'] += 1
+            logger.info(f"Feature cache hit for {source_path}")
+            return arrays
+
+        start = time.perf_counter()
+        arrays = build()
+        build_s = time.perf_counter() - start
+        with self.lock:
+            self.stats['misses'] += 1
+            self.stats['build_s'] += build_s
+        try:
+            self.put(key, arrays, build_s, meta={'source': source_path, 'spec': spec})
+        except Exception as e:
+            logger.error(f"Error storing feature cache entry for {source_path}: {e}")
+        logger.info(f"Feature cache miss for {source_path}; built in {build_s:.2f}s")
+        return arrays
+
+    def entries(self):
+        """(path, size in bytes, last used) of every entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path) or '.tmp-' in name:
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((path, size, os.stat(path).st_mtime))
+            except FileNotFoundError:
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def prune_index(self):
+        """Forget the digests of files that have since been deleted or changed; returns how many"""
+        with self.lock:
+            stale = []
+            for signature in self._digests:
+                path, size, mtime_ns = signature.rsplit(':', 2)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    stale.append(signature)
+                    continue
+                if (str(stat.st_size), str(stat.st_mtime_ns)) != (size, mtime_ns):
+                    stale.append(signature)
+            for signature in stale:
+                del self._digests[signature]
+            if stale:
+                self._write_index()
+        return len(stale)
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes; returns how many"""
+        # The index would otherwise keep every file ever hashed
+        self.prune_index()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            # Files already mapped by a reader stay readable until it unmaps them
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            with self.lock:
+                self.stats['evictions'] += evicted
+            logger.info(f"Evicted {evicted} feature cache entries")
+        return evicted
+
+    def get_stats(self):
+        """Hit and miss counts, and time spent building against time saved by hits"""
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        entries = self.entries()
+        return {
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in stats.items()},
+            'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries)
+        }
@@ -40,3 +40,26 @@ def validate_ip_address(ip):
         return True
     except socket.error:
         return False
+
+def preload_modules(module_names):
+    """Import heavy modules in a background thread so startup isn't blocked"""
+    import importlib
+    import threading
+    import time
+    from src.utils.logger import get_logger
+    
+    logger = get_logger(__name__)
+    
+    def _preload():
+        for name in module_names:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+                logger.debug(f"Preloaded {name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                logger.warning(f"Failed to preload {name}: {e}")
+                
+    thread = threading.Thread(target=_preload, name='preload')
+    thread.daemon = True
+    thread.start()
+    return thread
@@ -1,37 +1,277 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
 import os
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Records waiting for the listener thread; beyond this they are dropped rather than block the caller
+QUEUE_SIZE = 10000
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger and message"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most burst records per call site through every interval seconds
+
+    Call sites are the key rather than messages, since f-string messages
+    differ on every call. The first record through after a suppressed run
+    reports how many were dropped; flush() logs counts still outstanding.
+    """
+
+    def __init__(self, burst=20, interval=10.0, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        self.windows = {}  # (logger, file, line) -> [window start, passed, suppressed, level]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if getattr(record, 'suppressed', 0):
+            # A summary from flush()
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = self.clock()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is not None and now - window[0] < self.interval:
+                if window[1] >= self.burst:
+                    window[2] += 1
+                    return False
+                window[1] += 1
+                return True
+            suppressed = window[2] if window is not None else 0
+            if len(self.windows) >= 10000:
+                self.windows = {site: entry for site, entry in self.windows.items()
+                                if now - entry[0] < self.interval or entry[2]}
+            self.windows[key] = [now, 1, 0, record.levelno]
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+    def flush(self):
+        """Log how many records each call site has had suppressed since its last report"""
+        with self.lock:
+            pending = [(key, window[2], window[3]) for key, window in self.windows.items() if window[2]]
+            for key, _, _ in pending:
+                self.windows[key][2] = 0
+        for (name, pathname, lineno), suppressed, level in pending:
+            record = logging.LogRecord(name, level, pathname, lineno,
+                                       f"{suppressed} similar messages suppressed", None, None)
+            record.suppressed = suppressed
+            logging.getLogger(name).handle(record)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: records arriving while the queue is full are counted and dropped
+
+    The next record to get through is followed by a note of how many were lost.
+    """
+
+    dropped = 0
+    reported = 0
+    # Set in worker processes, whose records are pickled to the parent's listener
+    pickled = False
+
+    def prepare(self, record):
+        # The listener does the formatting; only fix the message now, in case its arguments change later
+        if record.args or self.pickled:
+            record.msg = record.getMessage()
+            record.args = None
+        if self.pickled and record.exc_info:
+            # Tracebacks don't pickle; the formatter appends exc_text instead
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped != self.reported:
+            lost = self.dropped - self.reported
+            self.reported = self.dropped
+            note = logging.LogRecord(record.name, logging.WARNING, record.pathname, record.lineno,
+                                     f"{lost} log records dropped while the log queue was full", None, None)
+            try:
+                self.queue.put_nowait(note)
+            except queue.Full:
+                self.reported -= lost
+
+class _ForwardHandler(logging.Handler):
+    """Hands records from worker processes to this process's shared handler"""
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def emit(self, record):
+        self.target.handle(record)
+
+_lock = threading.RLock()
+_handler = None
+_listener = None
+_rate_limit = None
+_level = None
+_loggers = set()
+_worker_queue = None
+_worker_listener = None
+
+def _default_log_path():
+    return f"logs/firewall_{datetime.now().strftime('%Y%m%d')}.log"
+
+def _output_handlers(file_path=None, json_lines=False, log_file=True):
+    """Console handler plus one file handler, shared by every logger"""
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    if not log_file:
+        return [console_handler]
+
+    path = file_path or _default_log_path()
+    try:
+        log_dir = os.path.dirname(path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        file_handler = logging.FileHandler(path)
+    except OSError as e:
+        print(f"Cannot open log file {path} ({e}); logging to {_default_log_path()}", file=sys.stderr)
+        os.makedirs(os.path.dirname(_default_log_path()), exist_ok=True)
+        file_handler = logging.FileHandler(_default_log_path())
+    file_handler.setFormatter(JSONFormatter() if json_lines else formatter)
+    return [console_handler, file_handler]
+
+def _shared_handler():
+    """The queue handler every logger writes to, started with the default outputs on first use"""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            _handler = _QueueHandler(queue.Queue(QUEUE_SIZE))
+            # A worker process leaves the log file to its parent (see configure_worker_logging)
+            outputs = _output_handlers(log_file=multiprocessing.parent_process() is None)
+            _listener = logging.handlers.QueueListener(_handler.queue, *outputs)
+            _listener.start()
+            atexit.register(shutdown_logging)
+        return _handler
+
+def configure_logging(level=None, file_path=None, json_lines=False, rate_limit=None):
+    """Point the shared listener at new outputs and set the level and flood limits
+
+    rate_limit is {'burst': N, 'interval': seconds} per call site, or None
+    to let every record through.
+    """
+    global _listener, _rate_limit, _level
+    handler = _shared_handler()
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for output in _listener.handlers:
+                output.close()
+        _listener = logging.handlers.QueueListener(handler.queue, *_output_handlers(file_path, json_lines))
+        _listener.start()
+
+        if _rate_limit is not None:
+            handler.removeFilter(_rate_limit)
+            _rate_limit = None
+        if rate_limit:
+            _rate_limit = RateLimitFilter(rate_limit.get('burst', 20), rate_limit.get('interval', 10.0))
+            handler.addFilter(_rate_limit)
+
+        if level is not None:
+            _level = level
+            for name in _loggers:
+                logging.getLogger(name).setLevel(level)
+
+def worker_logging(context):
+    """(queue, level) for configure_worker_logging in worker processes started from context
+
+    Records the workers put on the queue are passed to this process's
+    listener, so there is one writer to the log file however many
+    processes log.
+    """
+    global _worker_queue, _worker_listener
+    handler = _shared_handler()
+    with _lock:
+        if _worker_queue is None:
+            _worker_queue = context.Queue(QUEUE_SIZE)
+            _worker_listener = logging.handlers.QueueListener(_worker_queue, _ForwardHandler(handler))
+            _worker_listener.start()
+        return _worker_queue, _level
+
+def configure_worker_logging(log_queue, level=None):
+    """Send this worker process's records to its parent's listener instead of writing them itself"""
+    global _listener, _level
+    handler = _shared_handler()
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for output in _listener.handlers:
+                output.close()
+            _listener = None
+        handler.queue = log_queue
+        handler.pickled = True
+        if level is not None:
+            _level = level
+            for name in _loggers:
+                logging.getLogger(name).setLevel(level)
+
+def shutdown_logging():
+    """Report outstanding suppressions and write out everything queued"""
+    global _listener, _worker_queue, _worker_listener
+    with _lock:
+        if _rate_limit is not None:
+            _rate_limit.flush()
+        if _worker_listener is not None:
+            # Hands what the workers sent on to the main listener before that stops
+            _worker_listener.stop()
+            _worker_queue = _worker_listener = None
+        if _listener is not None:
+            _listener.stop()
+            for output in _listener.handlers:
+                try:
+                    output.flush()
+                except (OSError, ValueError):
+                    # stdout may already be closed at interpreter exit
+                    pass
+            _listener = None
+
 def setup_logger(name, log_level=logging.INFO):
-    """Setup logger with consistent formatting"""
+    """Setup logger with consistent formatting
+
+    Every logger shares one queue handler; a single listener thread does the
+    formatting and writing, so callers never wait on the console or disk.
+    """
     logger = logging.getLogger(name)
-    
+
     if not logger.handlers:
-        logger.setLevel(log_level)
-        
-        # Create formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        
-        # File handler
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        file_handler = logging.FileHandler(
-            f"{log_dir}/firewall_{datetime.now().strftime('%Y%m%d')}.log"
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        logger.setLevel(_level if _level is not None else log_level)
+        logger.addHandler(_shared_handler())
+        with _lock:
+            _loggers.add(name)
+
     return logger
 
 def get_logger(name):
@@ -0,0 +1,216 @@
+import json
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.alert_sinks import (AlertDispatcher, CircuitBreaker, SyslogSink, WebhookSink,
+                                        create_sink)
+from src.monitoring.alert_system import AlertSystem
+
+ALERT = {'timestamp': 1700000000.0, 'threat_type': 'DDoS', 'confidence': 0.93, 'source_ip': '10.0.0.1',
+         'details': {'dst_port': 80}}
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.requests <= server.fail_first
+        time.sleep(server.delay)
+        if fail:
+            self.send_response(503)
+        else:
+            with server.lock:
+                server.received.append(body)
+            self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class StandInWebhook(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, fail_first=0):
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.received = []
+        self.delay = delay
+        self.fail_first = fail_first
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/alerts"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+class SyslogTCPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            with self.server.lock:
+                self.server.received.append(line.decode().rstrip('\n'))
+
+class StandInSyslogTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SyslogTCPHandler)
+        self.lock = threading.Lock()
+        self.received = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestAlertSinks(unittest.TestCase):
+
+    def start(self, server):
+        self.addCleanup(server.close)
+        return server
+
+    def dispatcher(self, sinks, **settings):
+        dispatcher = AlertDispatcher(sinks, **{'backoff': 0.01, **settings})
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def test_webhook_posts_json(self):
+        server = self.start(StandInWebhook())
+        dispatcher = self.dispatcher([WebhookSink(server.url)])
+
+        dispatcher.dispatch(ALERT)
+        self.assertTrue(dispatcher.flush())
+
+        self.assertEqual(server.received, [ALERT])
+        stats = dispatcher.stats()['webhook']
+        self.assertEqual((stats['delivered'], stats['failed'], stats['breaker']), (1, 0, 'closed'))
+        self.assertGreater(stats['latency']['p50_ms'], 0)
+
+    def test_webhook_retries_with_backoff(self):
+        server = self.start(StandInWebhook(fail_first=2))
+        dispatcher = self.dispatcher([WebhookSink(server.url)], retries=3)
+
+        dispatcher.dispatch(ALERT)
+        self.assertTrue(dispatcher.flush())
+
+        self.assertEqual(server.received, [ALERT])
+        stats = dispatcher.stats()['webhook']
+        self.assertEqual((stats['delivered'], stats['retried'], stats['failed']), (1, 2, 0))
+
+    def test_syslog_udp_and_tcp(self):
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.bind(('127.0.0.1', 0))
+        udp.settimeout(5)
+        self.addCleanup(udp.close)
+        tcp = self.start(StandInSyslogTCP())
+        dispatcher = self.dispatcher([
+            SyslogSink('127.0.0.1', udp.getsockname()[1], 'udp', facility='local0', name='syslog-udp'),
+            SyslogSink('127.0.0.1', tcp.server_address[1], 'tcp', facility='auth', name='syslog-tcp'),
+        ])
+
+        dispatcher.dispatch(ALERT)
+        dispatcher.dispatch({**ALERT, 'source_ip': '10.0.0.2'})
+        self.assertTrue(dispatcher.flush())
+
+        message = udp.recv(4096).decode()
+        self.assertTrue(message.startswith('<132>1 2023-11-14T22:13:20.000+00:00 '))
+        self.assertIn('SECURITY ALERT DDoS from 10.0.0.1 confidence=0.93', message)
+        self.assertTrue(wait_for(lambda: len(tcp.received) == 2))
+        self.assertTrue(all(line.startswith('<36>1 ') for line in tcp.received))
+        self.assertEqual(dispatcher.stats()['syslog-tcp']['delivered'], 2)
+
+    def test_jsonl_appends_lines(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'alerts', 'alerts.jsonl')
+        dispatcher = self.dispatcher([create_sink({'type': 'jsonl', 'path': path})])
+
+        for index in range(3):
+            dispatcher.dispatch({**ALERT, 'source_ip': f"10.0.0.{index}"})
+        self.assertTrue(dispatcher.flush())
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['source_ip'] for line in lines], ['10.0.0.0', '10.0.0.1', '10.0.0.2'])
+
+    def test_slow_sink_never_blocks_dispatch_or_other_sinks(self):
+        slow = self.start(StandInWebhook(delay=2.0))
+        fast = self.start(StandInWebhook())
+        dispatcher = self.dispatcher([WebhookSink(slow.url, timeout=0.2, name='slow'),
+                                      WebhookSink(fast.url, name='fast')],
+                                     queue_size=20, retries=1, failure_threshold=2, reset_timeout=60)
+
+        start = time.perf_counter()
+        for index in range(50):
+            dispatcher.dispatch({**ALERT, 'source_ip': f"10.0.1.{index}"})
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        self.assertTrue(dispatcher.flush(timeout=10))
+        stats = dispatcher.stats()
+        # Each queue holds 20, plus one more if its worker took the first alert before the rest arrived
+        self.assertEqual(stats['fast']['delivered'] + stats['fast']['dropped'], 50)
+        self.assertGreaterEqual(stats['fast']['delivered'], 20)
+        self.assertEqual(len(fast.received), stats['fast']['delivered'])
+        slow_stats = stats['slow']
+        self.assertEqual(slow_stats['breaker'], 'open')
+        self.assertEqual(slow_stats['delivered'], 0)
+        # One alert's two attempts trip the breaker; the rest fail fast
+        self.assertEqual(slow_stats['failed'], 1)
+        self.assertEqual(slow_stats['short_circuited'], 50 - slow_stats['dropped'] - 1)
+
+    def test_circuit_breaker_half_opens_after_timeout(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 31.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # Only one trial while half open
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        now[0] = 62.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+
+    def test_alert_system_dispatches_new_alerts_only(self):
+        server = self.start(StandInWebhook())
+        alerts = AlertSystem({'dedupe_window': 60, 'sinks': [{'type': 'webhook', 'url': server.url}]})
+        self.addCleanup(alerts.close)
+
+        alerts.send_alert('Port Scan', 0.9, '10.0.0.1', {'dst_port': 22}, now=1000.0)
+        alerts.send_alert('Port Scan', 0.9, '10.0.0.1', {'dst_port': 22}, now=1001.0)
+        self.assertTrue(alerts.dispatcher.flush())
+
+        self.assertEqual(len(server.received), 1)
+        self.assertEqual(server.received[0]['details'], {'dst_port': 22})
+        self.assertEqual(alerts.stats()['sinks']['webhook']['delivered'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import os
+import socketserver
+import threading
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.alert_system import AlertSystem
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        sent = 0
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply("250-stand-in")
+                self.reply("250 AUTH PLAIN")
+            elif command == 'AUTH':
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 Authenticated")
+            elif command in ('MAIL', 'RCPT', 'NOOP', 'RSET', 'HELO'):
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 Go ahead")
+                lines = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data.rstrip('\r\n') == '.':
+                        break
+                    lines.append(data)
+                with server.lock:
+                    server.messages.append(''.join(lines))
+                self.reply("250 Queued")
+                sent += 1
+                if server.drop_after and sent >= server.drop_after:
+                    # Hang up without a word, like a server timing out an idle session
+                    return
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drop_after=0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.drop_after = drop_after
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+class TestAlertSystem(unittest.TestCase):
+
+    def start_server(self, drop_after=0):
+        server = StandInSMTPServer(drop_after)
+        self.addCleanup(server.close)
+        return server
+
+    def make_alerts(self, server, **config):
+        alerts = AlertSystem({
+            'dedupe_window': 300,
+            'digest_interval': 3600,  # Tests flush by hand
+            'email_alerts': {
+                'enabled': True, 'smtp_server': '127.0.0.1', 'smtp_port': server.server_address[1],
+                'starttls': False, 'smtp_user': 'firewall@example.com', 'smtp_password': 'secret',
+                'recipient': 'security@example.com'
+            },
+            **config
+        })
+        self.addCleanup(alerts.close)
+        return alerts
+
+    def test_repeats_are_deduplicated(self):
+        alerts = AlertSystem({'dedupe_window': 60})
+
+        self.assertTrue(alerts.send_alert('DDoS', 0.9, '10.0.0.1', {}, now=1000.0))
+        self.assertFalse(alerts.send_alert('DDoS', 0.95, '10.0.0.1', {}, now=1030.0))
+        self.assertTrue(alerts.send_alert('Port Scan', 0.9, '10.0.0.1', {}, now=1030.0))
+        self.assertTrue(alerts.send_alert('DDoS', 0.9, '10.0.0.1', {}, now=1061.0))
+
+        stats = alerts.stats()
+        self.assertEqual((stats['raised'], stats['deduplicated'], stats['emails_sent']), (4, 1, 0))
+        self.assertEqual(len(alerts.get_recent_alerts(10)), 3)
+
+    def test_flood_becomes_one_digest_over_one_session(self):
+        server = self.start_server()
+        alerts = self.make_alerts(server)
+
+        # A DDoS: 200 sources, each raising its alert five times
+        for repeat in range(5):
+            for source in range(200):
+                alerts.send_alert('DDoS', 0.9, f"10.0.{source // 256}.{source % 256}", {}, now=1000.0 + repeat)
+        self.assertEqual(alerts.flush(), 200)
+        alerts.send_alert('Port Scan', 0.8, '10.9.9.9', {}, now=1010.0)
+        alerts.flush()
+        self.assertEqual(alerts.flush(), 0)
+
+        stats = alerts.stats()
+        self.assertEqual((stats['raised'], stats['deduplicated']), (1001, 800))
+        self.assertEqual((stats['emails_sent'], stats['emails_failed']), (2, 0))
+        self.assertEqual(len(server.messages), 2)
+        self.assertEqual((server.connections, server.logins), (1, 1))
+        self.assertIn('200 threats from 200 sources', server.messages[0])
+        self.assertIn('x5', server.messages[0])
+        self.assertIn('Port Scan from 10.9.9.9', server.messages[1])
+
+    def test_repeats_after_a_digest_count_in_the_next_one(self):
+        server = self.start_server()
+        alerts = self.make_alerts(server)
+
+        alerts.send_alert('DDoS', 0.9, '10.0.0.1', {}, now=1000.0)
+        self.assertEqual(alerts.flush(), 1)
+        for offset in range(3):
+            self.assertFalse(alerts.send_alert('DDoS', 0.9, '10.0.0.1', {}, now=1010.0 + offset))
+        self.assertEqual(alerts.flush(), 1)
+
+        self.assertEqual(len(server.messages), 2)
+        self.assertIn('Repeated 3 more times since the last digest', server.messages[1])
+
+    def test_reconnects_when_the_server_drops_the_session(self):
+        server = self.start_server(drop_after=1)
+        alerts = self.make_alerts(server)
+
+        for index in range(3):
+            alerts.send_alert('Brute Force', 0.9, f"10.0.0.{index}", {}, now=1000.0 + index)
+            alerts.flush()
+
+        self.assertEqual(len(server.messages), 3)
+        self.assertEqual(alerts.stats()['emails_failed'], 0)
+        self.assertEqual(server.connections, 3)
+
+    def test_unreachable_server_counts_failures(self):
+        server = self.start_server()
+        port = server.server_address[1]
+        server.close()
+        alerts = AlertSystem({'digest_interval': 3600, 'email_alerts': {
+            'enabled': True, 'smtp_server': '127.0.0.1', 'smtp_port': port, 'starttls': False,
+            'smtp_user': 'firewall@example.com', 'recipient': 'security@example.com'}})
+        self.addCleanup(alerts.close)
+
+        alerts.send_alert('Malware', 0.99, '10.0.0.1', {}, now=1000.0)
+        self.assertEqual(alerts.flush(), 0)
+        alerts.send_alert('Malware', 0.99, '10.0.0.1', {}, now=1010.0)
+
+        stats = alerts.stats()
+        self.assertEqual((stats['emails_failed'], stats['pending']), (1, 1))
+        self.assertEqual(alerts.pending[('10.0.0.1', 'Malware')]['count'], 2)
+
+    def test_failed_digest_is_retried(self):
+        server = self.start_server()
+        alerts = self.make_alerts(server)
+
+        class FailingOnce:
+            def __init__(self, sender):
+                self.sender, self.failed = sender, False
+
+            def send(self, message):
+                if not self.failed:
+                    self.failed = True
+                    raise OSError("connection refused")
+                self.sender.send(message)
+
+            def close(self):
+                self.sender.close()
+
+        alerts.sender = FailingOnce(alerts.sender)
+        for source in range(3):
+            alerts.send_alert('DDoS', 0.9, f"10.0.0.{source}", {}, now=1000.0)
+        self.assertEqual(alerts.flush(), 0)
+        alerts.send_alert('DDoS', 0.9, '10.0.0.1', {}, now=1001.0)
+        self.assertEqual(alerts.flush(), 3)
+
+        self.assertEqual(len(server.messages), 1)
+        self.assertIn('3 threats from 3 sources', server.messages[0])
+        self.assertIn('x2', server.messages[0])
+        stats = alerts.stats()
+        self.assertEqual((stats['emails_sent'], stats['emails_failed'], stats['pending']), (1, 1, 0))
+
+    def test_close_sends_pending_digest(self):
+        server = self.start_server()
+        alerts = AlertSystem({'digest_interval': 3600, 'email_alerts': {
+            'enabled': True, 'smtp_server': '127.0.0.1', 'smtp_port': server.server_address[1],
+            'starttls': False, 'smtp_user': 'firewall@example.com', 'recipient': ['a@example.com', 'b@example.com']}})
+
+        alerts.send_alert('DDoS', 0.9, '10.0.0.1', {})
+        alerts.close()
+
+        self.assertEqual(len(server.messages), 1)
+        self.assertIn('To: a@example.com, b@example.com', server.messages[0])
+
+if __name__ == '__main__':
+    unittest.main()
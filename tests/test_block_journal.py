@@ -0,0 +1,143 @@
+import unittest
+import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.block_journal import BlockJournal
+from src.network.enforcement import FakeBackend
+from src.network.firewall_engine import AIFirewallEngine
+
+class TestBlockJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'state', 'blocks.journal')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_replay_and_partial_tail(self):
+        journal = BlockJournal(self.path)
+        self.assertEqual(journal.open(), {})
+        journal.record_block('192.0.2.1', 2000.0, 'DDoS')
+        journal.record_block('192.0.2.0/24', 3000.0, 'Aggregated')
+        journal.record_block('192.0.2.2', 2500.0, 'Port Scan')
+        journal.record_unblock('192.0.2.1')
+        journal.close()
+
+        with open(self.path, 'ab') as f:
+            f.write(b'\x01\x00\x00')  # Torn write at the end
+
+        entries = BlockJournal(self.path).open()
+        self.assertEqual(entries, {'192.0.2.0/24': (3000.0, 'Aggregated'), '192.0.2.2': (2500.0, 'Port Scan')})
+
+    def test_torn_tail_is_cut_before_new_records(self):
+        journal = BlockJournal(self.path)
+        journal.open()
+        for i in range(3):
+            journal.record_block(f'192.0.2.{i}', 2000.0 + i, 'DDoS')
+        journal.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+
+        journal = BlockJournal(self.path)
+        self.assertEqual(sorted(journal.open()), ['192.0.2.0', '192.0.2.1'])
+        journal.record_block('198.51.100.1', 3000.0, 'Port Scan')
+        journal.record_block('198.51.100.2', 3000.0, 'Malware')
+        journal.close()
+
+        entries = BlockJournal(self.path).open()
+        self.assertEqual(sorted(entries), ['192.0.2.0', '192.0.2.1', '198.51.100.1', '198.51.100.2'])
+        self.assertEqual(entries['198.51.100.2'], (3000.0, 'Malware'))
+
+    def test_corrupt_record_ends_the_log(self):
+        journal = BlockJournal(self.path)
+        journal.open()
+        journal.record_block('192.0.2.1', 2000.0, 'DDoS')
+        journal.close()
+        with open(self.path, 'ab') as f:
+            f.write(BlockJournal._encode(1, 'x', 2000.0, 'DDoS').replace(b'x', b'\xff'))
+
+        self.assertEqual(BlockJournal(self.path).open(), {'192.0.2.1': (2000.0, 'DDoS')})
+
+    def test_long_threat_names_are_cut_on_a_character_boundary(self):
+        threat = 'Denegación ' + 'ó' * 200  # The 255-byte cut lands inside a two-byte character
+        journal = BlockJournal(self.path)
+        journal.open()
+        journal.record_block('192.0.2.1', 2000.0, threat)
+        journal.record_block('192.0.2.2', 3000.0, 'DDoS')
+        journal.close()
+
+        entries = BlockJournal(self.path).open()
+        self.assertEqual(sorted(entries), ['192.0.2.1', '192.0.2.2'])
+        self.assertTrue(threat.startswith(entries['192.0.2.1'][1]))
+
+    def test_compaction_keeps_live_entries(self):
+        journal = BlockJournal(self.path, compact_ratio=2, compact_min_records=10)
+        journal.open()
+        deadline = time.time() + 600
+        for i in range(50):
+            journal.record_block(f'198.51.100.{i}', deadline, 'DDoS')
+        for i in range(45):
+            journal.record_unblock(f'198.51.100.{i}')
+        journal.record_block('203.0.113.1', time.time() - 1, 'DDoS')  # Already expired
+
+        self.assertTrue(journal.maybe_compact())
+        self.assertFalse(journal.maybe_compact())
+        journal.record_block('203.0.113.2', deadline, 'Malware')
+        journal.close()
+
+        entries = BlockJournal(self.path).open()
+        self.assertEqual(sorted(entries), [f'198.51.100.{i}' for i in range(45, 50)] + ['203.0.113.2'])
+
+    def test_blocks_recorded_during_compaction_survive(self):
+        journal = BlockJournal(self.path)
+        journal.open()
+        deadline = time.time() + 600
+        journal.record_block('192.0.2.1', deadline, 'DDoS')
+        write_tmp = journal._write_tmp
+
+        def write_tmp_while_blocking(entries):
+            # The lock is free while the snapshot is written
+            journal.record_block('192.0.2.2', deadline, 'Malware')
+            journal.record_unblock('192.0.2.1')
+            return write_tmp(entries)
+
+        journal._write_tmp = write_tmp_while_blocking
+        self.assertTrue(journal.compact())
+        journal.close()
+
+        self.assertEqual(BlockJournal(self.path).open(), {'192.0.2.2': (deadline, 'Malware')})
+
+class TestEngineRestore(unittest.TestCase):
+
+    def test_restart_reinstalls_blocks_in_one_call(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'blocks.journal')
+            engine = AIFirewallEngine(None, None, backend=FakeBackend(), journal_path=path)
+            for i in range(20):
+                engine._block_threat({'src_ip': f'198.51.100.{i}'}, 'DDoS', 0.9)
+            engine._block_threat({'src_ip': '192.0.2.1'}, 'Port Scan', 0.9)
+            engine.expire_blocks(time.time() + 1)  # Nothing expires yet
+            engine.shutdown()
+
+            # Let one block lapse while the firewall is down
+            journal = BlockJournal(path)
+            journal.open()
+            journal.record_block('192.0.2.1', time.time() - 1, 'Port Scan')
+            journal.close()
+
+            backend = FakeBackend()
+            restarted = AIFirewallEngine(None, None, backend=backend, journal_path=path)
+            self.assertEqual(backend.commands_run, 1)
+            self.assertEqual(len(backend.entries), 20)
+            self.assertEqual(restarted.blocked_ips, {f'198.51.100.{i}' for i in range(20)})
+            self.assertEqual(restarted.analyze_traffic([0], {'src_ip': '198.51.100.3'}), (True, 'DDoS', 1.0))
+            self.assertNotIn('192.0.2.1', BlockJournal(path).open())
+            restarted.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ml_models.drift import DriftBaseline, DriftMonitor, ks, psi
+from src.ml_models.model_trainer import ModelTrainer
+
+def traffic(rng, rows, shift=0.0):
+    """Four continuous features plus one mostly-zero flag; shift moves features 0 and 1"""
+    X = rng.normal(0, 1, (rows, 5))
+    X[:, :2] += shift
+    X[:, 4] = rng.random(rows) < 0.1
+    return X
+
+class TestDrift(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+        self.train = traffic(self.rng, 5000)
+        self.baseline = DriftBaseline.fit(self.train, self.train[:, 0])
+        self.now = [0.0]
+
+    def monitor(self, **settings):
+        return DriftMonitor(self.baseline, score=lambda X: X[:, 0], clock=lambda: self.now[0],
+                            **{'min_samples': 1000, 'min_retrain_interval': 0, **settings})
+
+    def test_baseline_bins_and_round_trip(self):
+        self.assertEqual(self.baseline.n_features, 5)
+        np.testing.assert_allclose(self.baseline.expected.sum(axis=1), 1.0)
+        np.testing.assert_allclose(self.baseline.expected[0], 0.1, atol=0.01)
+        # The flag only has two distinct values, so two bins
+        self.assertEqual(len(self.baseline.cuts[4]), 1)
+
+        restored = DriftBaseline.from_dict(self.baseline.to_dict())
+        np.testing.assert_allclose(restored.feature_counts(self.train), self.baseline.feature_counts(self.train))
+        self.assertEqual(restored.n_samples, 5000)
+
+    def test_statistics(self):
+        uniform = np.full(10, 0.1)
+        self.assertAlmostEqual(float(psi(uniform, uniform)), 0.0)
+        self.assertEqual(ks(uniform, uniform), 0.0)
+        skewed = np.array([0.5] + [0.5 / 9] * 9)
+        self.assertGreater(float(psi(uniform, skewed)), 0.25)
+        self.assertAlmostEqual(ks(uniform, skewed), 0.4)
+
+    def test_incremental_counts_match_one_batch(self):
+        live = traffic(self.rng, 3000, shift=0.5)
+        whole, chunked = self.monitor(), self.monitor()
+        whole.observe(live)
+        for start in range(0, len(live), 128):
+            chunked.observe(live[start:start + 128])
+        np.testing.assert_array_equal(whole.counts, chunked.counts)
+
+    def test_stable_traffic_is_not_drift(self):
+        monitor = self.monitor()
+        monitor.observe(traffic(self.rng, 5000))
+        report = monitor.check()
+
+        self.assertFalse(report['drift'])
+        self.assertLess(report['max_feature_psi'], 0.05)
+        self.assertLess(report['score_ks'], 0.05)
+
+    def test_shift_is_drift_on_the_shifted_features(self):
+        monitor = self.monitor()
+        self.assertIsNone(monitor.check())  # Too few samples yet
+        monitor.observe(traffic(self.rng, 5000, shift=1.0))
+        report = monitor.check()
+
+        self.assertTrue(report['drift'])
+        self.assertEqual(report['drifted_features'], [0, 1])
+        self.assertGreater(report['score_ks'], 0.2)
+
+    def test_retrains_on_benign_windows_after_sustained_drift(self):
+        retrained = []
+        new_baseline = DriftBaseline.fit(traffic(self.rng, 5000, shift=1.0), self.train[:, 0] + 1.0)
+
+        def retrain(X):
+            retrained.append(X)
+            return new_baseline
+
+        monitor = self.monitor(retrain=retrain, patience=2, recent_samples=4000)
+        shifted = traffic(self.rng, 5000, shift=1.0)
+        is_anomaly = np.zeros(len(shifted), dtype=int)
+        is_anomaly[::5] = 1
+
+        monitor.observe(shifted, is_anomaly)
+        self.assertTrue(monitor.check()['drift'])
+        self.assertEqual(retrained, [])  # One drifting check isn't enough
+
+        monitor.observe(shifted, is_anomaly)
+        monitor.check()
+        monitor.wait_for_retrain(10)
+
+        self.assertEqual(len(retrained), 1)
+        benign = np.concatenate([shifted[is_anomaly == 0]] * 2)
+        np.testing.assert_array_equal(retrained[0], benign[-4000:])
+        self.assertIs(monitor.baseline, new_baseline)
+        self.assertEqual(monitor.status()['retrains'], 1)
+        self.assertEqual(monitor.counts.sum(), 0)
+
+    def test_brief_drift_does_not_retrain(self):
+        retrained = []
+        monitor = self.monitor(retrain=retrained.append, patience=2)
+
+        monitor.observe(traffic(self.rng, 5000, shift=1.0))
+        self.assertTrue(monitor.check()['drift'])
+        # The next check sees mostly normal traffic again (older counts decay by half)
+        monitor.observe(traffic(self.rng, 20000))
+        self.assertFalse(monitor.check()['drift'])
+        monitor.wait_for_retrain(10)
+
+        self.assertEqual(retrained, [])
+
+    def test_status_is_served_by_the_dashboard(self):
+        from src.monitoring.dashboard import FirewallDashboard
+        client = FirewallDashboard(port=0).app.test_client()
+        self.assertEqual(client.get('/api/drift').status_code, 503)
+
+        monitor = self.monitor()
+        monitor.observe(traffic(self.rng, 5000, shift=1.0))
+        monitor.check()
+        client = FirewallDashboard(port=0, drift_monitor=monitor).app.test_client()
+        status = client.get('/api/drift').get_json()
+
+        self.assertTrue(status['drift'])
+        self.assertEqual(status['drifted_features'], [0, 1])
+        self.assertEqual((status['retrains'], status['retraining']), (0, False))
+
+class TestTrainerBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir)
+
+    def test_baseline_saved_with_the_detector(self):
+        X = np.random.default_rng(1).normal(0, 1, (500, 6))
+        trainer = ModelTrainer(models_dir=self.models_dir)
+        detector = trainer.train_anomaly_detector(X)
+
+        baseline = trainer.load_baseline()
+        self.assertEqual(baseline.n_features, 6)
+        self.assertEqual(baseline.n_samples, 500)
+        scores = detector.decision_function(X)
+        np.testing.assert_array_equal(scores < 0, detector.predict(X) == 1)
+        np.testing.assert_allclose(baseline.score_expected.sum(), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+import unittest
+import subprocess
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.metrics import get_metrics
+from src.network.enforcement import (EnforcementQueue, FakeBackend, IpsetBackend, IptablesBackend,
+                                     NftablesBackend, PartialBlockError, create_backend)
+from src.network.firewall_engine import AIFirewallEngine
+
+class RecordingRunner:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, args, input=None):
+        self.calls.append((args, input))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestEnforcementBackends(unittest.TestCase):
+
+    def test_ipset_batches_into_one_restore(self):
+        runner = RecordingRunner()
+        backend = IpsetBackend(runner=runner)
+        backend.setup()
+        setup_calls = len(runner.calls)
+
+        ips = [f"10.0.{i // 256}.{i % 256}" for i in range(500)] + ['2001:db8::1', 'not-an-ip']
+        backend.block(ips, timeout=120)
+
+        self.assertEqual(len(runner.calls), setup_calls + 1)
+        args, payload = runner.calls[-1]
+        self.assertEqual(args, ['ipset', 'restore', '-exist'])
+        lines = payload.splitlines()
+        self.assertEqual(len(lines), 501)
+        self.assertEqual(lines[0], 'add ai_firewall_block 10.0.0.0 timeout 120')
+        self.assertEqual(lines[-1], 'add ai_firewall_block6 2001:db8::1 timeout 120')
+
+    def test_entries_with_own_timeouts_share_one_call(self):
+        runner = RecordingRunner()
+        backend = NftablesBackend(runner=runner)
+        backend.block_entries([('192.0.2.1', 30), ('192.0.2.0/24', 600)])
+        self.assertEqual(runner.calls[-1][1].splitlines(), [
+            'add element inet ai_firewall blocked4 { 192.0.2.1 timeout 30s, 192.0.2.0/24 timeout 600s }'
+        ])
+
+    def test_iptables_restore_replaces_leftover_rules(self):
+        runner = RecordingRunner()
+        IptablesBackend(runner=runner).restore({'192.0.2.1': 30}, expired=['192.0.2.2'])
+        self.assertEqual([args[1:5:3] for args, _ in runner.calls],
+                         [['-D', '192.0.2.1'], ['-D', '192.0.2.2'], ['-A', '192.0.2.1']])
+
+    def test_nftables_unblock_tolerates_missing_elements(self):
+        runner = RecordingRunner()
+        backend = NftablesBackend(runner=runner)
+        backend.unblock(['192.0.2.1', '192.0.2.2'])
+
+        args, payload = runner.calls[-1]
+        self.assertEqual(args, ['nft', '-f', '-'])
+        self.assertEqual(payload.splitlines(), [
+            'add element inet ai_firewall blocked4 { 192.0.2.1, 192.0.2.2 }',
+            'delete element inet ai_firewall blocked4 { 192.0.2.1, 192.0.2.2 }'
+        ])
+
+    def test_iptables_runs_one_command_per_address(self):
+        runner = RecordingRunner()
+        IptablesBackend(runner=runner).block(['192.0.2.1', '2001:db8::2'])
+        self.assertEqual([args for args, _ in runner.calls], [
+            ['iptables', '-A', 'INPUT', '-s', '192.0.2.1', '-j', 'DROP'],
+            ['ip6tables', '-A', 'INPUT', '-s', '2001:db8::2', '-j', 'DROP']
+        ])
+
+    def test_iptables_reports_which_addresses_were_applied(self):
+        def runner(args, input=None):
+            if args[4] == '192.0.2.3':
+                raise subprocess.CalledProcessError(1, args)
+
+        backend = IptablesBackend(runner=runner)
+        with self.assertRaises(PartialBlockError) as caught:
+            backend.block_entries([('192.0.2.1', 60), ('192.0.2.2', 60), ('192.0.2.3', 60), ('192.0.2.4', 30)])
+        self.assertEqual(caught.exception.applied, ['192.0.2.1', '192.0.2.2'])
+        self.assertEqual(caught.exception.failed, ['192.0.2.3', '192.0.2.4'])
+
+    def test_ipset_reports_chunks_applied_before_a_failure(self):
+        def runner(args, input=None):
+            if '192.0.2.3' in (input or ''):
+                raise subprocess.CalledProcessError(1, args)
+
+        backend = IpsetBackend(runner=runner, batch_size=2)
+        with self.assertRaises(PartialBlockError) as caught:
+            backend.block_entries([('192.0.2.1', 60), ('192.0.2.2', 60), ('192.0.2.3', 60), ('192.0.2.4', 30)])
+        self.assertEqual(caught.exception.applied, ['192.0.2.1', '192.0.2.2'])
+        self.assertEqual(caught.exception.failed, ['192.0.2.3', '192.0.2.4'])
+
+    def test_nftables_replace_removes_covered_addresses_first(self):
+        runner = RecordingRunner()
+        backend = NftablesBackend(runner=runner)
+        backend.replace([('198.51.100.0/24', 600)], ['198.51.100.1', '198.51.100.2'])
+
+        self.assertEqual(runner.calls[-1][1].splitlines(), [
+            'add element inet ai_firewall blocked4 { 198.51.100.1, 198.51.100.2 }',
+            'delete element inet ai_firewall blocked4 { 198.51.100.1, 198.51.100.2 }',
+            'add element inet ai_firewall blocked4 { 198.51.100.0/24 timeout 600s }'
+        ])
+
+    def test_fake_backend_expires(self):
+        clock = FakeClock()
+        backend = FakeBackend(clock=clock)
+        backend.block(['192.0.2.1'], timeout=10)
+        self.assertTrue(backend.is_blocked('192.0.2.1'))
+        clock.now += 11
+        self.assertFalse(backend.is_blocked('192.0.2.1'))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend('pf')
+
+class GatedBackend(FakeBackend):
+    """Fake backend whose block calls wait until the gate opens"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.batches = []
+
+    def _block_entries(self, entries):
+        self.gate.wait(5)
+        self.batches.append(dict(entries))
+        super()._block_entries(entries)
+
+def wait_until_taken(queue):
+    for _ in range(500):
+        if not len(queue):
+            return
+        time.sleep(0.01)
+
+class TestEnforcementQueue(unittest.TestCase):
+
+    def test_deduplicates_and_coalesces(self):
+        metrics = get_metrics()
+        metrics.reset()
+        backend = GatedBackend()
+        queue = EnforcementQueue(backend, max_delay=0.01)
+
+        # The worker holds the first request at the gate while the rest pile up
+        queue.submit('192.0.2.0', 60)
+        wait_until_taken(queue)
+        for _ in range(3):
+            for i in range(1, 50):
+                queue.submit(f'192.0.2.{i}', 60)
+        queue.submit('192.0.2.1', 120)
+        backend.gate.set()
+        self.assertTrue(queue.join(timeout=5))
+        queue.stop()
+
+        installed = [ip for batch in backend.batches for ip in batch]
+        self.assertEqual(len(installed), 50)
+        self.assertEqual(len(set(installed)), 50)
+        self.assertEqual(len(backend.batches), 2)
+        self.assertEqual(backend.batches[1]['192.0.2.1'], 120)
+        self.assertEqual(backend.batches[1]['192.0.2.2'], 60)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['enforcement_deduplicated'], 99)
+        self.assertEqual(snapshot['histograms']['enforcement_lag'].count, 50)
+
+    def test_full_queue_rejects(self):
+        backend = GatedBackend()
+        queue = EnforcementQueue(backend, maxsize=2, max_delay=0)
+        queue.submit('192.0.2.1', 60)
+        wait_until_taken(queue)
+        self.assertTrue(queue.submit('192.0.2.2', 60))
+        self.assertTrue(queue.submit('192.0.2.3', 60))
+        self.assertFalse(queue.submit('192.0.2.4', 60))
+        backend.gate.set()
+        queue.stop()
+        self.assertEqual(backend.blocked, {'192.0.2.1', '192.0.2.2', '192.0.2.3'})
+
+    def test_failed_installs_are_reported(self):
+        def failing_runner(args, input=None):
+            raise subprocess.CalledProcessError(1, args)
+
+        failed = []
+        queue = EnforcementQueue(IpsetBackend(runner=failing_runner), on_failed=failed.extend)
+        queue.submit('192.0.2.9', 60)
+        queue.join(timeout=5)
+        queue.stop()
+        self.assertEqual(failed, ['192.0.2.9'])
+
+    def test_partial_installs_report_only_the_failed_addresses(self):
+        metrics = get_metrics()
+        metrics.reset()
+
+        def runner(args, input=None):
+            if args[4] == '192.0.2.2':
+                raise subprocess.CalledProcessError(1, args)
+
+        failed = []
+        queue = EnforcementQueue(IptablesBackend(runner=runner), max_delay=0.05, on_failed=failed.extend)
+        for i in range(1, 4):
+            queue.submit(f'192.0.2.{i}', 60)
+        queue.join(timeout=5)
+        queue.stop()
+
+        self.assertEqual(failed, ['192.0.2.2', '192.0.2.3'])
+        counters = metrics.snapshot()['counters']
+        self.assertEqual((counters['ips_blocked'], counters['enforcement_failures']), (1, 2))
+        self.assertEqual(metrics.snapshot()['gauges']['enforcement_queue_depth'], 0)
+
+class TestEngineEnforcement(unittest.TestCase):
+
+    def test_engine_blocks_and_expires(self):
+        backend = FakeBackend()
+        engine = AIFirewallEngine(None, None, backend=backend, block_duration=60)
+        engine._block_threat({'src_ip': '192.0.2.7'}, 'Port Scan', 0.9)
+        self.assertTrue(engine.enforcement.join(timeout=5))
+        self.assertTrue(backend.is_blocked('192.0.2.7'))
+
+        engine.expire_blocks()
+        self.assertIn('192.0.2.7', engine.blocked_ips)
+        self.assertEqual(engine.expire_blocks(engine.suspicious_ips['192.0.2.7'] + 61), ['192.0.2.7'])
+        self.assertNotIn('192.0.2.7', engine.blocked_ips)
+
+    def test_expiry_unblocks_in_one_batch_without_set_timeouts(self):
+        runner = RecordingRunner()
+        engine = AIFirewallEngine(None, None, backend=IptablesBackend(runner=runner), block_duration=60)
+        for i in range(3):
+            engine._block_threat({'src_ip': f'192.0.2.{i}'}, 'DDoS', 0.9)
+        engine.enforcement.join(timeout=5)
+        runner.calls.clear()
+
+        engine.expire_blocks(max(engine.suspicious_ips.values()) + 61)
+        self.assertEqual(len(runner.calls), 3)
+        self.assertTrue(all(args[1] == '-D' for args, _ in runner.calls))
+        self.assertEqual(engine.blocked_ips, set())
+
+    def test_block_duration_per_threat_type(self):
+        backend = FakeBackend()
+        engine = AIFirewallEngine(None, None, backend=backend, block_duration=3600,
+                                  block_durations={'Port Scan': 60})
+        engine._block_threat({'src_ip': '192.0.2.1'}, 'Port Scan', 0.9)
+        engine._block_threat({'src_ip': '192.0.2.2'}, 'Malware', 0.9)
+        engine.enforcement.join(timeout=5)
+        blocked_at = engine.suspicious_ips['192.0.2.2']
+
+        self.assertEqual(engine.expire_blocks(blocked_at + 62), ['192.0.2.1'])
+        self.assertEqual(engine.expire_blocks(blocked_at + 3602), ['192.0.2.2'])
+        self.assertLessEqual(backend.entries['192.0.2.1'], blocked_at + 61)
+
+    def test_allow_and_deny_lists(self):
+        backend = FakeBackend()
+        engine = AIFirewallEngine(None, None, backend=backend, denylist=['198.51.100.0/24'],
+                                  allowlist=['198.51.100.7', '192.0.2.0/24'])
+        self.assertEqual(engine.analyze_traffic([0], {'src_ip': '198.51.100.8'}), (True, 'Denylisted', 1.0))
+        self.assertEqual(engine.analyze_traffic([0], {'src_ip': '198.51.100.7'}), (False, 'Allowlisted', 0.0))
+        engine._block_threat({'src_ip': '192.0.2.1'}, 'DDoS', 0.99)
+        engine.enforcement.join(timeout=5)
+        self.assertEqual(engine.blocked_ips, {'198.51.100.8'})
+
+    def test_dense_blocks_are_aggregated(self):
+        backend = FakeBackend()
+        engine = AIFirewallEngine(None, None, backend=backend, allowlist=['203.0.113.0/24'])
+        attackers = [f'198.51.100.{i}' for i in range(200)] + [f'203.0.113.{i}' for i in range(200)]
+        for ip in attackers:
+            engine._block_threat({'src_ip': ip}, 'DDoS', 0.9)
+        engine.enforcement.join(timeout=5)
+
+        groups = engine.aggregate_blocks()
+        self.assertEqual(set(groups), {'198.51.100.0/24'})
+        self.assertEqual(engine.blocked_ips, {'198.51.100.0/24'})
+        self.assertEqual(set(backend.entries), {'198.51.100.0/24'})
+        self.assertTrue(backend.is_blocked('198.51.100.250'))
+
+        # New offenders inside the prefix need no further rules
+        engine._block_threat({'src_ip': '198.51.100.230'}, 'DDoS', 0.9)
+        engine.enforcement.join(timeout=5)
+        self.assertEqual(set(backend.entries), {'198.51.100.0/24'})
+
+        engine.expire_blocks(time.time() + 3601)
+        self.assertEqual(engine.blocked_ips, set())
+        self.assertEqual(len(engine.blocked_prefixes), 0)
+
+    def test_nftables_aggregation_is_one_transaction(self):
+        runner = RecordingRunner()
+        engine = AIFirewallEngine(None, None, backend=NftablesBackend(runner=runner))
+        for i in range(200):
+            engine._block_threat({'src_ip': f'198.51.100.{i}'}, 'DDoS', 0.9)
+        engine.enforcement.join(timeout=5)
+        runner.calls.clear()
+
+        self.assertEqual(set(engine.aggregate_blocks()), {'198.51.100.0/24'})
+        self.assertEqual(len(runner.calls), 1)
+        lines = runner.calls[0][1].splitlines()
+        self.assertEqual([line.split(' {')[0] for line in lines], [
+            'add element inet ai_firewall blocked4',
+            'delete element inet ai_firewall blocked4',
+            'add element inet ai_firewall blocked4'
+        ])
+        self.assertTrue(lines[2].startswith('add element inet ai_firewall blocked4 { 198.51.100.0/24 timeout '))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.dashboard import FirewallDashboard
+from src.monitoring.event_store import EventStore
+
+# Recent enough that the writer's own pruning leaves the events alone
+START = float(int(time.time()) - 3600)
+
+class TestEventStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = EventStore(os.path.join(self.directory, 'events.db'), retention_days=1).open()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def fill(self, count=250):
+        for index in range(count):
+            self.store.record(f"10.0.0.{index % 5}", 'Port Scan' if index % 2 else 'DDoS', 0.9,
+                              {'dst_ip': '192.168.1.1', 'dst_port': 22, 'protocol': 6},
+                              packets=100, timestamp=START + index)
+        self.assertTrue(self.store.flush())
+
+    def test_keyset_pages_cover_every_event_once(self):
+        self.fill()
+        seen = []
+        page = self.store.query(limit=100)
+        while True:
+            seen.extend(event['id'] for event in page['events'])
+            if page['next'] is None:
+                break
+            page = self.store.query(limit=100, before=page['next'])
+
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 250)
+        newest = self.store.query(limit=1)['events'][0]
+        self.assertEqual((newest['ts'], newest['source_ip'], newest['dst_port']), (START + 249, '10.0.0.4', 22))
+
+    def test_filters(self):
+        self.fill()
+        events = self.store.query(limit=1000, source_ip='10.0.0.1', threat_type='Port Scan')['events']
+        self.assertEqual(len(events), 25)
+        self.assertTrue(all(event['source_ip'] == '10.0.0.1' for event in events))
+
+        window = self.store.query(limit=1000, since=START + 100, until=START + 109)['events']
+        self.assertEqual([event['ts'] for event in window], [START + t for t in range(109, 99, -1)])
+        self.assertEqual(self.store.query(since=START + 1000)['events'], [])
+
+    def test_filtered_pages_use_indexes(self):
+        self.fill()
+        with self.store._reader() as connection:
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM events WHERE id < 100 AND source_ip = '10.0.0.1' "
+                "ORDER BY id DESC LIMIT 10").fetchall()
+        self.assertIn('events_source', str(plan))
+
+    def test_prune_drops_expired_events(self):
+        self.fill(10)
+        self.assertEqual(self.store.prune(now=START + 86400 + 5), 5)
+        self.assertEqual([event['ts'] for event in self.store.query()['events']][-1], START + 5)
+
+    def test_queries_from_new_threads_reuse_connections(self):
+        self.fill(3)
+        pages = []
+        for _ in range(5):
+            # Like the dashboard, which serves each request on a new thread
+            thread = threading.Thread(target=lambda: pages.append(self.store.query(limit=1)))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(self.store._readers.qsize(), 1)
+
+    def test_failed_batch_does_not_stop_later_writes(self):
+        self.store.queue.put(('not enough columns',))
+        self.assertTrue(self.store.flush())
+        self.fill(3)
+
+        self.assertEqual(len(self.store.query()['events']), 3)
+
+    def test_record_never_blocks(self):
+        store = EventStore(os.path.join(self.directory, 'unopened.db'), queue_size=2)
+        results = [store.record('10.0.0.1', 'DDoS', 0.9) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+class TestEventsEndpoint(unittest.TestCase):
+
+    def test_events_api(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        client = FirewallDashboard().app.test_client()
+        self.assertEqual(client.get('/api/events').status_code, 503)
+
+        store = EventStore(os.path.join(directory, 'events.db')).open()
+        self.addCleanup(store.close)
+        for index in range(5):
+            store.record(f"10.0.0.{index}", 'DDoS', 0.95)
+        store.flush()
+        dashboard = FirewallDashboard(event_store=store)
+        client = dashboard.app.test_client()
+
+        page = client.get('/api/events?limit=2').get_json()
+        self.assertEqual([event['source_ip'] for event in page['events']], ['10.0.0.4', '10.0.0.3'])
+        page = client.get(f"/api/events?limit=2&before={page['next']}").get_json()
+        self.assertEqual([event['source_ip'] for event in page['events']], ['10.0.0.2', '10.0.0.1'])
+        self.assertEqual(len(client.get('/api/events?source_ip=10.0.0.0').get_json()['events']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
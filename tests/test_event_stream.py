@@ -0,0 +1,129 @@
+import json
+import time
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.dashboard import FirewallDashboard
+from src.monitoring.event_stream import EventBroadcaster
+
+def parse(chunk):
+    """[(id, event, data)] from a chunk of the stream; comments come back as (None, 'comment', text)"""
+    events = []
+    for block in chunk.decode().strip().split('\n\n'):
+        if block.startswith(':'):
+            events.append((None, 'comment', block[1:].strip()))
+            continue
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+class TestEventBroadcaster(unittest.TestCase):
+
+    def setUp(self):
+        self.state = {'packets': 0, 'threats': 0}
+        # Sampled by hand rather than on a timer
+        self.broadcaster = EventBroadcaster(lambda: dict(self.state), interval=3600, heartbeat=0.05)
+        self.addCleanup(self.broadcaster.stop)
+
+    def test_new_subscriber_gets_snapshot_then_changes(self):
+        stream = self.broadcaster.subscribe()
+        self.assertEqual(next(stream), b"retry: 2000\n\n")
+        self.assertEqual(parse(next(stream)), [(0, 'snapshot', {'packets': 0, 'threats': 0})])
+
+        self.state['packets'] = 100
+        self.broadcaster.sample()
+        self.broadcaster.sample()  # Nothing changed: no event
+        self.broadcaster.publish('activity', {'entries': ['blocked 10.0.0.1']})
+
+        self.assertEqual(parse(next(stream)), [(1, 'status', {'packets': 100}),
+                                               (2, 'activity', {'entries': ['blocked 10.0.0.1']})])
+        stream.close()
+        self.assertEqual(self.broadcaster.subscribers, 0)
+
+    def test_resume_sends_only_missed_events(self):
+        for count in range(1, 4):
+            self.state['packets'] = count
+            self.broadcaster.sample()
+
+        stream = self.broadcaster.subscribe(last_event_id=1)
+        next(stream)
+        self.assertEqual([event_id for event_id, _, _ in parse(next(stream))], [2, 3])
+        stream.close()
+
+    def test_resume_beyond_history_falls_back_to_snapshot(self):
+        broadcaster = EventBroadcaster(lambda: dict(self.state), interval=3600, history=2)
+        self.addCleanup(broadcaster.stop)
+        broadcaster.start()
+        for count in range(1, 6):
+            self.state['packets'] = count
+            broadcaster.sample()
+
+        stream = broadcaster.subscribe(last_event_id=1)
+        next(stream)
+        self.assertEqual(parse(next(stream)), [(5, 'snapshot', {'packets': 5, 'threats': 0})])
+        stream.close()
+
+    def test_idle_stream_gets_heartbeats(self):
+        stream = self.broadcaster.subscribe(last_event_id=0)
+        next(stream)
+        # Already up to date, so the first thing after the retry hint is a keepalive
+        self.assertEqual(parse(next(stream)), [(None, 'comment', 'keepalive')])
+        stream.close()
+
+    def test_sampler_stops_with_the_last_subscriber(self):
+        broadcaster = EventBroadcaster(lambda: dict(self.state), interval=0.01, heartbeat=0.05)
+        self.addCleanup(broadcaster.stop)
+        stream = broadcaster.subscribe()
+        next(stream)
+        next(stream)
+        stream.close()
+        for _ in range(50):
+            if broadcaster._thread is None:
+                break
+            time.sleep(0.01)
+        self.assertIsNone(broadcaster._thread)
+
+        # Changes made while idle reach a client resuming after the restart
+        self.state['packets'] = 7
+        stream = broadcaster.subscribe(last_event_id=0)
+        next(stream)
+        self.assertEqual(parse(next(stream)), [(1, 'status', {'packets': 7})])
+        self.assertIsNotNone(broadcaster._thread)
+        stream.close()
+
+class TestDashboardStream(unittest.TestCase):
+
+    def test_stream_pushes_activity(self):
+        dashboard = FirewallDashboard(stream_interval=3600)
+        self.addCleanup(dashboard.broadcaster.stop)
+        response = dashboard.app.test_client().get('/api/stream')
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+
+        next(chunks)
+        (event_id, event, data), = parse(next(chunks))
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['recent_activity'], ['AI Firewall started successfully'])
+
+        dashboard.update_stats(packets_processed=10, activity='Threat Detected: DDoS')
+        (_, event, data), = parse(next(chunks))
+        self.assertEqual(event, 'activity')
+        self.assertTrue(data['entries'][0].endswith('Threat Detected: DDoS'))
+
+        dashboard.broadcaster.sample()
+        self.assertEqual(parse(next(chunks))[0][1:], ('status', {'packets_processed': 10}))
+        response.close()
+
+        # A reconnecting client resumes after the last event it saw
+        response = dashboard.app.test_client().get('/api/stream', headers={'Last-Event-ID': str(event_id + 1)})
+        chunks = iter(response.response)
+        next(chunks)
+        self.assertEqual([event for _, event, _ in parse(next(chunks))], ['status'])
+        response.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.expiry import TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.5
+        self.wheel = TimerWheel(tick=1.0, slots=(8, 8, 8), clock=lambda: self.now)
+
+    def test_expires_within_one_tick_of_deadline(self):
+        rng = random.Random(7)
+        # Deadlines past every level of the wheel exercise cascading and the overflow list
+        deadlines = {key: self.now + rng.uniform(0, 2000) for key in range(2000)}
+        for key, deadline in deadlines.items():
+            self.wheel.schedule(key, deadline)
+
+        released = {}
+        current = self.now
+        while len(released) < len(deadlines):
+            current += rng.uniform(0.1, 2.5)
+            for key in self.wheel.advance(current):
+                self.assertNotIn(key, released)
+                released[key] = current
+
+        for key, deadline in deadlines.items():
+            self.assertGreaterEqual(released[key], deadline)
+            self.assertLess(released[key] - deadline, 1.0 + 2.5)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_reschedule_and_cancel(self):
+        self.wheel.schedule('a', self.now + 5)
+        self.wheel.schedule('b', self.now + 5)
+        self.wheel.schedule('a', self.now + 20)
+        self.assertTrue(self.wheel.cancel('b'))
+        self.assertFalse(self.wheel.cancel('b'))
+
+        self.assertEqual(self.wheel.advance(self.now + 10), [])
+        self.assertEqual(self.wheel.advance(self.now + 21), ['a'])
+
+    def test_past_deadline_expires_on_next_tick(self):
+        self.wheel.schedule('late', self.now - 30)
+        self.assertEqual(self.wheel.advance(self.now), [])
+        self.assertEqual(self.wheel.advance(self.now + 1), ['late'])
+
+if __name__ == '__main__':
+    unittest.main()
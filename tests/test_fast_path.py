@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.enforcement import FakeBackend
+from src.network.fast_path import FastPath
+from src.network.firewall_engine import AIFirewallEngine
+from src.network.traffic_generator import TrafficGenerator
+
+class CountingDetector:
+    """Anomaly detector stand-in that flags everything and counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return [1]
+
+class ConfidentClassifier:
+    threat_classes = {1: 'Port Scan'}
+
+    def predict(self, X):
+        return [1], [[0.01, 0.99]]
+
+class TestFastPath(unittest.TestCase):
+
+    def test_remove_by_origin(self):
+        fast_path = FastPath()
+        fast_path.add('198.51.100.1', (True, 'DDoS', 0.9))
+        fast_path.add('198.51.100.2', (True, 'Blocked', 1.0), origin='198.51.100.0/24')
+        fast_path.add('198.51.100.3', (True, 'Blocked', 1.0), origin='198.51.100.0/24')
+
+        fast_path.remove('198.51.100.0/24')
+        self.assertEqual(fast_path.lookup('198.51.100.1'), (True, 'DDoS', 0.9))
+        self.assertIsNone(fast_path.lookup('198.51.100.2'))
+        self.assertEqual(len(fast_path), 1)
+
+    def test_capture_filter(self):
+        batch = TrafficGenerator(seed=1).generate('normal', 50)
+        source = '.'.join(str(b) for b in batch.frame(0)[26:30])
+        fast_path = FastPath()
+        fast_path.add(source, (True, 'DDoS', 0.9))
+
+        skipped = [fast_path.capture_filter(batch.frame(i)) for i in range(len(batch))]
+        self.assertTrue(skipped[0])
+        self.assertEqual(sum(skipped), sum(bytes(batch.frame(i)[26:30]) == bytes(batch.frame(0)[26:30])
+                                           for i in range(len(batch))))
+        self.assertFalse(fast_path.capture_filter(b'\x00' * 20))
+
+class TestEngineFastPath(unittest.TestCase):
+
+    def test_known_sources_skip_inference(self):
+        detector = CountingDetector()
+        engine = AIFirewallEngine(detector, ConfidentClassifier(), backend=FakeBackend(),
+                                  allowlist=['192.0.2.0/24'])
+        verdict = engine.analyze_traffic([0], {'src_ip': '198.51.100.9'})
+        self.assertTrue(verdict[0])
+        self.assertEqual(detector.calls, 1)
+
+        for _ in range(5):
+            self.assertEqual(engine.analyze_traffic([0], {'src_ip': '198.51.100.9'}), verdict)
+            self.assertEqual(engine.analyze_traffic([0], {'src_ip': '192.0.2.4'}), (False, 'Allowlisted', 0.0))
+        self.assertEqual(detector.calls, 1)
+
+        engine.enforcement.join(timeout=5)
+        engine.expire_blocks(engine.suspicious_ips['198.51.100.9'] + 3601)
+        engine.analyze_traffic([0], {'src_ip': '198.51.100.9'})
+        self.assertEqual(detector.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from data_manager import DataManager
+from src.network.packet_analyzer import PacketAnalyzer
+from src.network.traffic_generator import TrafficGenerator, write_pcap
+from src.utils.feature_cache import FeatureCache
+
+class TestFeatureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FeatureCache(os.path.join(self.directory, 'cache'), max_bytes=1 << 20)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def source(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_hit_after_miss_is_memory_mapped(self):
+        path = self.source('a.pcap', b'capture bytes')
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'X': np.arange(12, dtype=np.float64).reshape(3, 4)}
+
+        first = self.cache.get_or_build(path, {'version': 1}, build)
+        second = self.cache.get_or_build(path, {'version': 1}, build)
+
+        self.assertEqual(len(builds), 1)
+        self.assertIsInstance(second['X'], np.memmap)
+        np.testing.assert_array_equal(first['X'], second['X'])
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_key_follows_content_and_spec(self):
+        path = self.source('a.pcap', b'capture bytes')
+        copy = self.source('b.pcap', b'capture bytes')
+        key = self.cache.key(path, {'version': 1})
+
+        self.assertEqual(self.cache.key(copy, {'version': 1}), key)
+        self.assertNotEqual(self.cache.key(path, {'version': 2}), key)
+
+        # Rewriting the file changes its mtime, so its digest is recomputed
+        time.sleep(0.01)
+        self.source('a.pcap', b'other capture')
+        self.assertNotEqual(self.cache.key(path, {'version': 1}), key)
+
+    def test_entry_without_build_time_is_still_a_hit(self):
+        self.cache.put('a', {'X': np.ones(3)})
+        meta_path = os.path.join(self.directory, 'cache', 'a', 'meta.json')
+        with open(meta_path) as f:
+            meta = json.load(f)
+        del meta['build_s']
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+        np.testing.assert_array_equal(self.cache.get('a')['X'], np.ones(3))
+
+    def test_index_forgets_deleted_sources(self):
+        kept = self.source('a.pcap', b'capture bytes')
+        deleted = self.source('b.pcap', b'other bytes')
+        self.cache.key(kept, {'version': 1})
+        self.cache.key(deleted, {'version': 1})
+        os.remove(deleted)
+
+        self.cache.put('c', {'X': np.ones(3)})
+
+        index = FeatureCache(os.path.join(self.directory, 'cache'))._digests
+        self.assertEqual([signature.rsplit(':', 2)[0] for signature in index], [os.path.abspath(kept)])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        block = {'X': np.zeros((400, 100))}  # About 320 KB per entry
+        for name in 'abc':
+            self.cache.put(name, block)
+            time.sleep(0.01)
+        self.assertIsNotNone(self.cache.get('a'))  # Now the most recently used
+        time.sleep(0.01)
+        self.cache.put('d', block)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('d'))
+        self.assertLessEqual(self.cache.size(), 1 << 20)
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+class TestDataManagerFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_repeat_runs_skip_parsing(self):
+        pcap = os.path.join(self.directory, 'capture.pcap')
+        write_pcap(TrafficGenerator(seed=5).generate_mix(2000), pcap)
+        manager = DataManager(base_path=os.path.join(self.directory, 'data'))
+
+        first = manager.load_capture_features(pcap, window=100)
+        second = manager.load_capture_features(pcap, window=100)
+        other_window = manager.load_capture_features(pcap, window=50)
+
+        self.assertEqual(first.shape, (20, len(PacketAnalyzer().feature_names) * 5))
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(len(other_window), 40)
+        stats = manager.get_data_statistics()['feature_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertGreater(stats['saved_s'], 0)
+
+        # A new manager over the same directory reuses the entries
+        again = DataManager(base_path=os.path.join(self.directory, 'data'))
+        np.testing.assert_array_equal(again.load_capture_features(pcap, window=100), first)
+        self.assertEqual(again.feature_cache.get_stats()['hits'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
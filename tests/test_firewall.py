@@ -3,6 +3,7 @@ import numpy as np
 from src.ml_models.anomaly_detector import AnomalyDetector
 from src.ml_models.classifier import ThreatClassifier
 from src.network.packet_analyzer import PacketAnalyzer
+from src.network.traffic_generator import TrafficGenerator
 
 class TestAIFirewall(unittest.TestCase):
     
@@ -43,6 +44,33 @@ class TestAIFirewall(unittest.TestCase):
         
         features = self.packet_analyzer.extract_features(mock_packet)
         self.assertIsNotNone(features)
+        
+    def test_packet_analyzer_generated_frames(self):
+        """Test feature extraction on generated SYN flood frames"""
+        packets = TrafficGenerator(seed=1).generate('syn_flood', 10).to_packets()
+        
+        for packet in packets:
+            features = self.packet_analyzer.extract_features(packet)
+            self.assertEqual(features[0], 54)  # Frame size
+            self.assertEqual(features[1], 6)   # TCP
+            self.assertEqual(features[3], 2)   # SYN flag
+            self.assertEqual(features[5], 80)  # Destination port
+        
+    def test_capture_path_skips_heavy_imports(self):
+        """Test capture modules load without scapy, sklearn or pandas"""
+        import os
+        import subprocess
+        import sys
+        
+        code = (
+            "import sys\n"
+            "import src.network.packet_capture, src.network.packet_analyzer, src.monitoring.dashboard\n"
+            "print([m for m in ('scapy', 'sklearn', 'pandas') if m in sys.modules])"
+        )
+        repo_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        result = subprocess.run([sys.executable, '-c', code], cwd=repo_root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], '[]')
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import gzip
+import json
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.dashboard import FirewallDashboard
+
+class TestCachedStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.dashboard = FirewallDashboard(status_max_age=60)
+        self.client = self.dashboard.app.test_client()
+
+    def test_unchanged_status_is_not_modified(self):
+        first = self.client.get('/api/status')
+        etag = first.headers['ETag']
+
+        again = self.client.get('/api/status', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.headers['ETag'], etag)
+
+        self.dashboard.update_stats(packets_processed=10)
+        changed = self.client.get('/api/status', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(changed.get_json()['packets_processed'], 10)
+
+    def test_snapshot_reused_until_content_changes(self):
+        self.dashboard.status_max_age = 0
+        snapshot = self.dashboard.status_snapshot()
+        # Same values again: checked, but not re-serialized
+        self.dashboard.update_stats()
+        self.assertIs(self.dashboard.status_snapshot(), snapshot)
+
+        self.dashboard.update_stats(ips_blocked=1)
+        self.assertIsNot(self.dashboard.status_snapshot(), snapshot)
+
+    def test_gzip_when_accepted(self):
+        self.dashboard.update_stats(activity='x' * 1000)
+        plain = self.client.get('/api/status')
+        compressed = self.client.get('/api/status', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.data)), plain.get_json())
+        self.assertNotEqual(compressed.headers['ETag'], plain.headers['ETag'])
+        self.assertLess(len(compressed.data), len(plain.data))
+
+    def test_page_is_prerendered(self):
+        page = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(page.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'AI Firewall Dashboard', gzip.decompress(page.data))
+
+        cached = self.client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': page.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main()
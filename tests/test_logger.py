@@ -0,0 +1,124 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils import logger as log_module
+from src.utils.logger import JSONFormatter, RateLimitFilter, configure_logging, configure_worker_logging, get_logger
+
+def log_from_worker(log_setup):
+    configure_worker_logging(*log_setup)
+    worker = get_logger('test.queue.worker')
+    worker.warning("from worker %d", os.getpid())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        worker.exception("failed")
+
+def make_record(message, lineno=10, name='test'):
+    return logging.LogRecord(name, logging.WARNING, __file__, lineno, message, None, None)
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def test_collapses_repeats_per_call_site(self):
+        now = [0.0]
+        limit = RateLimitFilter(burst=3, interval=10, clock=lambda: now[0])
+
+        passed = [limit.filter(make_record(f"threat {index}")) for index in range(10)]
+        self.assertEqual(passed, [True] * 3 + [False] * 7)
+        # Another call site has its own budget
+        self.assertTrue(limit.filter(make_record("other", lineno=20)))
+
+        now[0] = 10.0
+        record = make_record("threat 10")
+        self.assertTrue(limit.filter(record))
+        self.assertEqual(record.getMessage(), "threat 10 (7 similar messages suppressed)")
+        self.assertEqual(record.suppressed, 7)
+
+    def test_flush_reports_outstanding_suppressions(self):
+        limit = RateLimitFilter(burst=1, interval=60)
+        records = []
+        target = logging.getLogger('test.rate_limit_flush')
+        target.propagate = False
+        handler = logging.Handler()
+        handler.emit = records.append
+        target.addHandler(handler)
+        self.addCleanup(target.removeHandler, handler)
+
+        for index in range(5):
+            limit.filter(make_record(f"threat {index}", name='test.rate_limit_flush'))
+        limit.flush()
+        limit.flush()
+
+        self.assertEqual([record.getMessage() for record in records], ["4 similar messages suppressed"])
+
+class TestQueueLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'firewall.jsonl')
+
+    def tearDown(self):
+        # Back to the default outputs, as other tests expect
+        configure_logging(level=logging.INFO)
+        shutil.rmtree(self.directory)
+
+    def test_json_lines_through_one_listener(self):
+        configure_logging(file_path=self.path, json_lines=True, rate_limit={'burst': 2, 'interval': 60})
+        first, second = get_logger('test.queue.a'), get_logger('test.queue.b')
+        self.assertIs(first.handlers[0], second.handlers[0])
+
+        for index in range(5):
+            first.warning("Threat detected: %s from %s", 'DDoS', f"10.0.0.{index}")
+        second.info("started")
+        log_module.shutdown_logging()
+
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['message'] for line in lines],
+                         ["Threat detected: DDoS from 10.0.0.0", "Threat detected: DDoS from 10.0.0.1",
+                          "started", "3 similar messages suppressed"])
+        self.assertEqual(lines[0]['level'], 'WARNING')
+        self.assertEqual(lines[0]['logger'], 'test.queue.a')
+        self.assertEqual(lines[3]['suppressed'], 3)
+
+    def test_worker_processes_log_through_the_parent(self):
+        configure_logging(file_path=self.path, json_lines=True)
+        context = multiprocessing.get_context('spawn')
+        worker = context.Process(target=log_from_worker, args=(log_module.worker_logging(context),))
+        worker.start()
+        worker.join(60)
+        log_module.shutdown_logging()
+
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['message'] for line in lines], [f"from worker {worker.pid}", "failed"])
+        self.assertEqual(lines[0]['logger'], 'test.queue.worker')
+
+    def test_full_queue_drops_without_blocking(self):
+        handler = log_module._QueueHandler(queue.Queue(2))
+        for index in range(5):
+            handler.handle(make_record(f"record {index}"))
+        self.assertEqual(handler.dropped, 3)
+
+        handler.queue.get_nowait()
+        handler.queue.get_nowait()
+        handler.handle(make_record("after"))
+        messages = [handler.queue.get_nowait().getMessage() for _ in range(2)]
+        self.assertEqual(messages, ["after", "3 log records dropped while the log queue was full"])
+
+    def test_json_formatter(self):
+        record = make_record("blocked %s")
+        record.args = ('10.0.0.1',)
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual((entry['level'], entry['message']), ('WARNING', 'blocked 10.0.0.1'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import threading
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.metrics import MetricsRegistry, bucket_index, bucket_upper_bound, BUCKET_COUNT
+from src.monitoring.dashboard import FirewallDashboard
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_bucket_bounds_contain_values(self):
+        for value in [0, 1, 7, 8, 9, 15, 16, 1000, 123456, 10 ** 9, 10 ** 11]:
+            index = bucket_index(value)
+            self.assertLess(value, bucket_upper_bound(index))
+            if 0 < index < BUCKET_COUNT - 1:
+                self.assertGreaterEqual(value, bucket_upper_bound(index - 1))
+
+    def test_percentiles_within_bucket_precision(self):
+        for value in range(1, 1001):
+            self.metrics.observe_ns('parse', value * 1000)
+
+        histogram = self.metrics.snapshot()['histograms']['parse']
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 500e-6, delta=125e-6)
+        self.assertAlmostEqual(histogram.percentile(99), 990e-6, delta=250e-6)
+
+    def test_threads_aggregate(self):
+        def worker():
+            for _ in range(1000):
+                self.metrics.inc('packets_captured')
+                self.metrics.observe_ns('capture', 500)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.metrics.inc('packets_captured')
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['counters']['packets_captured'], 4001)
+        self.assertEqual(snapshot['histograms']['capture'].count, 4000)
+        # Finished threads were folded into the retired shard
+        self.assertEqual(len(self.metrics._shards), 1)
+
+    def test_disabled_records_nothing(self):
+        self.metrics.set_enabled(False)
+        self.metrics.inc('packets_captured')
+        with self.metrics.timer('inference'):
+            pass
+        self.assertEqual(self.metrics.snapshot()['counters'], {})
+
+    def test_prometheus_format(self):
+        self.metrics.inc('threats_detected', 3)
+        self.metrics.observe('inference', 0.002)
+        text = self.metrics.render_prometheus()
+
+        self.assertIn('firewall_threats_detected_total 3', text)
+        self.assertIn('firewall_stage_latency_seconds_bucket{stage="inference",le="+Inf"} 1', text)
+        self.assertIn('firewall_stage_latency_seconds_count{stage="inference"} 1', text)
+
+    def test_dashboard_metrics_endpoint(self):
+        dashboard = FirewallDashboard(port=0, api_token='secret')
+        client = dashboard.app.test_client()
+        auth = {'Authorization': 'Bearer secret'}
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'firewall_metrics_enabled', response.data)
+
+        self.assertEqual(client.post('/api/metrics', json={'enabled': False}).status_code, 401)
+        response = client.post('/api/metrics', json={'enabled': False}, headers=auth)
+        self.assertFalse(response.get_json()['enabled'])
+        response = client.post('/api/metrics', json={'enabled': 'true'}, headers=auth)
+        self.assertTrue(response.get_json()['enabled'])
+        self.assertEqual(client.post('/api/metrics', json={'enabled': 'no'}, headers=auth).status_code, 400)
+        self.assertEqual(client.post('/api/metrics', json={'enabled': 0}, headers=auth).status_code, 400)
+        self.assertTrue(dashboard.metrics.enabled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ml_models.model_registry import ModelRegistry
+from src.ml_models.model_trainer import ModelTrainer
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.models_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir)
+
+    def test_save_registers_versions(self):
+        first = self.registry.save('detector', {'weights': np.arange(10)},
+                                   feature_spec={'n_features': 10}, metrics={'auc': 0.9})
+        second = self.registry.save('detector', {'weights': np.arange(20)})
+
+        self.assertEqual(first['version'], 1)
+        self.assertEqual(second['version'], 2)
+        self.assertEqual(len(first['checksum']), 64)
+        self.assertEqual(first['size'], os.path.getsize(first['path']))
+        self.assertEqual(self.registry.get_entry('detector')['version'], 2)
+
+    def test_reserved_versions_are_not_handed_out_twice(self):
+        first, first_path = self.registry.new_artifact_path('detector')
+        second, second_path = self.registry.new_artifact_path('detector')
+        self.assertEqual((first, second), (1, 2))
+        self.assertNotEqual(first_path, second_path)
+
+        self.registry.release('detector', second)
+        self.assertEqual(self.registry.new_artifact_path('detector')[0], 2)
+
+    def test_load_is_memory_mapped(self):
+        self.registry.save('detector', {'weights': np.arange(1000, dtype=np.float64)})
+        payload, entry = self.registry.load('detector', verify=True)
+
+        self.assertIsInstance(payload['weights'], np.memmap)
+        self.assertEqual(payload['weights'][999], 999)
+
+    def test_set_active_version(self):
+        self.registry.save('detector', {'weights': np.zeros(5)})
+        self.registry.save('detector', {'weights': np.ones(5)})
+        self.registry.set_active('detector', 1)
+
+        payload, entry = self.registry.load('detector')
+        self.assertEqual(entry['version'], 1)
+        self.assertEqual(payload['weights'].sum(), 0)
+
+        # A second registry instance sees the persisted manifest
+        other = ModelRegistry(self.models_dir)
+        self.assertEqual(other.get_entry('detector')['version'], 1)
+        with self.assertRaises(ValueError):
+            other.set_active('detector', 7)
+
+    def test_trainer_loads_active_models(self):
+        np.random.seed(42)
+        X = np.random.normal(0, 1, (100, 20))
+        y = np.random.randint(0, 2, 100)
+
+        trainer = ModelTrainer(models_dir=self.models_dir)
+        trainer.train_anomaly_detector(X)
+        trainer.train_threat_classifier(X, y)
+
+        anomaly_detector, threat_classifier = trainer.load_models()
+        self.assertTrue(anomaly_detector.is_trained)
+        self.assertTrue(threat_classifier.is_trained)
+        self.assertEqual(
+            trainer.registry.get_entry('threat_classifier_random_forest')['feature_spec'],
+            {'n_features': 20}
+        )
+
+    def test_failed_training_registers_nothing(self):
+        X = np.empty((0, 4))
+        trainer = ModelTrainer(models_dir=self.models_dir)
+        detector = trainer.train_anomaly_detector(X)
+
+        self.assertFalse(detector.is_trained)
+        self.assertIsNone(trainer.registry.get_entry('anomaly_detector_isolation_forest'))
+        self.assertEqual(trainer.registry.list_models(), [])
+
+if __name__ == '__main__':
+    unittest.main()
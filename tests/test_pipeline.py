@@ -0,0 +1,212 @@
+import unittest
+import threading
+import time
+import signal
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from src.monitoring.alert_system import AlertSystem
+from src.monitoring.metrics import get_metrics
+from src.network.enforcement import FakeBackend
+from src.network.firewall_engine import AIFirewallEngine
+from src.network.packet_analyzer import PacketAnalyzer
+from src.network.packet_capture import ReplayCapture
+from src.network.pipeline import Pipeline
+from src.network.traffic_generator import TrafficGenerator
+
+class StubEngine:
+    """Flags one source as a threat; optionally slow, to exercise backpressure"""
+
+    def __init__(self, threat_ip=None, delay=0.0):
+        self.threat_ip = threat_ip
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def analyze_batch(self, features, packet_infos):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(len(features))
+        return [(True, 'Port Scan', 0.9) if info.get('src_ip') == self.threat_ip else (False, 'Normal', 0.0)
+                for info in packet_infos]
+
+class RecordingEvents:
+    def __init__(self):
+        self.events = []
+
+    def record(self, source_ip, threat_type, confidence, packet_info=None, packets=0):
+        self.events.append((source_ip, threat_type, packets))
+
+class ShapeRecordingDetector:
+    """Flags every other row as anomalous and records the batch sizes it was given"""
+
+    is_trained = True
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        return np.arange(len(X)) % 2 == 0
+
+class ShapeRecordingClassifier:
+    is_trained = True
+    threat_classes = {1: 'Port Scan'}
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        return np.ones(len(X), dtype=int), np.tile([0.5, 0.5], (len(X), 1))
+
+class TestEngineBatch(unittest.TestCase):
+
+    def test_one_model_call_per_batch(self):
+        detector, classifier = ShapeRecordingDetector(), ShapeRecordingClassifier()
+        engine = AIFirewallEngine(detector, classifier, backend=FakeBackend(),
+                                  allowlist=['10.9.0.0/16'])
+        infos = [{'src_ip': '10.0.0.1'}, {'src_ip': '10.9.0.1'}, {'src_ip': '10.0.0.2'},
+                 {'src_ip': '10.0.0.3'}]
+
+        verdicts = engine.analyze_batch([np.zeros(50)] * 4, infos)
+
+        self.assertEqual(detector.batches, [3])
+        self.assertEqual(classifier.batches, [2])
+        self.assertEqual([verdict[1] for verdict in verdicts],
+                         ['Port Scan', 'Allowlisted', 'Normal', 'Port Scan'])
+        # Below the confidence threshold, so nothing is blocked
+        self.assertEqual(engine.blocked_ips, set())
+        self.assertEqual(engine.analyze_traffic(np.zeros(50), {'src_ip': '10.0.0.4'})[1], 'Port Scan')
+        self.assertEqual(detector.batches, [3, 1])
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.traffic = TrafficGenerator(seed=3).generate_mix(5000)
+
+    def run_replay(self, engine, timeout=30, **kwargs):
+        pipeline = Pipeline(ReplayCapture(self.traffic), engine, PacketAnalyzer(), **kwargs)
+        pipeline.start()
+        self.assertTrue(pipeline.join(timeout))
+        pipeline.stop()
+        return pipeline
+
+    def test_replay_processes_every_packet(self):
+        engine = StubEngine()
+        pipeline = self.run_replay(engine, window=100, batch_size=250)
+
+        status = pipeline.status()
+        self.assertEqual(status['packets_captured'], 5000)
+        self.assertEqual(status['packets_processed'], 5000)
+        self.assertEqual(status['windows'], 50)
+        self.assertFalse(status['running'])
+        self.assertEqual(set(status['stages']), {'features', 'inference', 'alerting'})
+
+    def test_partial_window_is_flushed_on_drain(self):
+        self.traffic = TrafficGenerator(seed=3).generate_mix(1050)
+        pipeline = self.run_replay(StubEngine(), window=100)
+
+        self.assertEqual(pipeline.status()['packets_processed'], 1050)
+        self.assertEqual(pipeline.status()['windows'], 11)
+
+    def test_slow_inference_applies_backpressure(self):
+        metrics = get_metrics()
+        metrics.reset()
+        engine = StubEngine(delay=0.01)
+        pipeline = self.run_replay(engine, window=50, batch_size=50, queue_size=2,
+                                   stages={'inference': {'batch': 1}})
+
+        self.assertEqual(pipeline.status()['packets_processed'], 5000)
+        self.assertGreater(metrics.snapshot()['counters'].get('pipeline_backpressure_waits', 0), 0)
+
+    def test_inference_batches_queued_windows(self):
+        engine = StubEngine(delay=0.005)
+        self.run_replay(engine, window=10, batch_size=10, stages={'inference': {'batch': 16}})
+
+        self.assertEqual(sum(engine.batches), 500)
+        self.assertGreater(max(engine.batches), 1)
+
+    def test_alerts_once_per_source_and_records_every_event(self):
+        self.traffic = TrafficGenerator(seed=3).generate('port_scan', 2000)
+        source = PacketAnalyzer().extract_packet_info(self.traffic.to_packets()[0])['src_ip']
+        engine = StubEngine(threat_ip=source)
+        alerts = AlertSystem({'dedupe_window': 300})
+        self.addCleanup(alerts.close)
+        events = RecordingEvents()
+        threats = []
+
+        pipeline = self.run_replay(engine, alert_system=alerts, event_store=events,
+                                   on_threat=lambda *args: threats.append(args))
+
+        self.assertEqual(threats, [('Port Scan', 0.9, source)])
+        # Every threatening window is counted, recorded and handed to the alert system, which drops the repeats
+        self.assertGreater(len(events.events), 1)
+        self.assertEqual(pipeline.status()['threats'], len(events.events))
+        self.assertEqual(pipeline.status()['alerts'], 1)
+        self.assertEqual(set(events.events), {(source, 'Port Scan', 100)})
+        stats = alerts.stats()
+        self.assertEqual((stats['raised'], stats['deduplicated']), (len(events.events), len(events.events) - 1))
+
+    def test_feature_workers_in_processes(self):
+        for transport in ('ring', 'queue'):
+            pipeline = self.run_replay(StubEngine(), timeout=60, transport=transport,
+                                       stages={'features': {'workers': 2, 'mode': 'process'}})
+
+            self.assertEqual(pipeline.status()['packets_processed'], 5000)
+            self.assertEqual(pipeline.status()['stages']['features']['mode'], 'process')
+            self.assertIsNone(pipeline.ring)
+
+    def test_crashed_feature_worker_is_restarted(self):
+        pipeline = Pipeline(ReplayCapture(self.traffic, rate=5000, loop=True), StubEngine(), PacketAnalyzer(),
+                            stages={'features': {'workers': 2, 'mode': 'process'}})
+        pipeline.start()
+
+        def worker(label):
+            return next(entry for entry in pipeline.status()['workers'] if entry['label'] == label)
+
+        deadline = time.monotonic() + 60
+        while worker('features-0')['packets_parsed'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        victim = worker('features-0')
+        parsed_before = pipeline.stats()['counters']['packets_parsed']
+        os.kill(victim['pid'], signal.SIGKILL)
+
+        restarted = 0
+        while not restarted and time.monotonic() < deadline:
+            restarted = pipeline.supervise()
+            time.sleep(0.1)
+        self.assertEqual(restarted, 1)
+        while worker('features-0')['packets_parsed'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        replacement = worker('features-0')
+        self.assertNotEqual(replacement['pid'], victim['pid'])
+        self.assertEqual(replacement['slot'], victim['slot'])
+
+        # The dead worker's counts survive, and the ring keeps moving to the end
+        self.assertTrue(pipeline.stop(timeout=30))
+        self.assertGreater(pipeline.stats()['counters']['packets_parsed'], parsed_before)
+        self.assertGreater(pipeline.status()['packets_processed'], 0)
+
+    def test_stateful_stages_refuse_processes(self):
+        with self.assertRaises(ValueError):
+            Pipeline(ReplayCapture(self.traffic), StubEngine(),
+                     stages={'inference': {'mode': 'process'}})
+
+    def test_stop_drains_looping_replay(self):
+        engine = StubEngine()
+        pipeline = Pipeline(ReplayCapture(self.traffic, loop=True), engine, PacketAnalyzer())
+        pipeline.start()
+        time.sleep(0.3)
+
+        self.assertTrue(pipeline.stop(timeout=10))
+        status = pipeline.status()
+        self.assertEqual(status['packets_processed'], status['packets_captured'])
+        self.assertGreater(status['packets_processed'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import ipaddress
+import random
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.prefix_table import PrefixTable, aggregate
+
+class TestPrefixTable(unittest.TestCase):
+
+    def test_longest_prefix_wins(self):
+        table = PrefixTable([('10.0.0.0/8', 'deny'), ('10.1.2.0/24', 'allow'),
+                             ('10.1.2.3', 'deny'), ('2001:db8::/32', 'deny')])
+        self.assertEqual(table.lookup('10.9.9.9'), 'deny')
+        self.assertEqual(table.lookup('10.1.2.4'), 'allow')
+        self.assertEqual(table.lookup('10.1.2.3'), 'deny')
+        self.assertEqual(table.lookup('2001:db8::1'), 'deny')
+        self.assertIsNone(table.lookup('11.0.0.1'))
+        self.assertEqual(table.match('10.1.2.4'), '10.1.2.0/24')
+
+        self.assertTrue(table.remove('10.1.2.0/24'))
+        self.assertFalse(table.remove('10.1.2.0/24'))
+        self.assertEqual(table.lookup('10.1.2.4'), 'deny')
+
+    def test_matches_reference_implementation(self):
+        rng = random.Random(3)
+        networks = {ipaddress.ip_network((rng.getrandbits(32), rng.choice([8, 16, 20, 24, 28, 32])),
+                                         strict=False) for _ in range(300)}
+        table = PrefixTable([(str(network), str(network)) for network in networks])
+        for _ in range(2000):
+            if rng.random() < 0.5:
+                address = ipaddress.IPv4Address(rng.getrandbits(32))
+            else:
+                network = rng.choice(sorted(networks))
+                address = network.network_address + rng.randrange(network.num_addresses)
+            candidates = [network for network in networks if address in network]
+            expected = str(max(candidates, key=lambda n: n.prefixlen)) if candidates else None
+            self.assertEqual(table.lookup(str(address)), expected)
+
+    def test_overlaps(self):
+        table = PrefixTable(['10.1.2.0/24'])
+        self.assertTrue(table.overlaps('10.1.0.0/16'))
+        self.assertTrue(table.overlaps('10.1.2.128/25'))
+        self.assertFalse(table.overlaps('10.1.3.0/24'))
+
+class TestAggregate(unittest.TestCase):
+
+    def test_dense_ranges_become_prefixes(self):
+        dense = [f"198.51.100.{i}" for i in range(256) if i % 5]   # 80% of a /24
+        sparse = [f"203.0.113.{i}" for i in range(0, 256, 16)]     # 6% of a /24
+        groups = aggregate(dense + sparse + ['2001:db8::1'], max_collateral=0.25)
+
+        self.assertEqual(groups['198.51.100.0/24'], dense)
+        for ip in sparse + ['2001:db8::1']:
+            self.assertEqual(groups[ip], [ip])
+
+    def test_collateral_threshold_and_exclusions(self):
+        dense = [f"198.51.100.{i}" for i in range(256) if i % 5]
+        self.assertNotIn('198.51.100.0/24', aggregate(dense, max_collateral=0.1))
+
+        groups = aggregate(dense, exclude=PrefixTable(['198.51.100.200']))
+        self.assertNotIn('198.51.100.0/24', groups)
+        covered = [ip for members in groups.values() for ip in members]
+        self.assertEqual(sorted(covered), sorted(dense))
+        for prefix in groups:
+            self.assertNotIn(ipaddress.ip_address('198.51.100.200'), ipaddress.ip_network(prefix))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.profiler import SamplingProfiler, thread_tag
+from src.monitoring.dashboard import FirewallDashboard
+
+def busy_capture_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def test_collapsed_stacks_tagged_by_thread(self):
+        stop_event = threading.Event()
+        worker = threading.Thread(target=busy_capture_loop, args=(stop_event,), name='capture')
+        worker.start()
+
+        profiler = SamplingProfiler(interval=0.001)
+        self.assertTrue(profiler.start(duration=5))
+        self.assertFalse(profiler.start())
+        time.sleep(0.2)
+        profiler.stop()
+        stop_event.set()
+        worker.join()
+
+        self.assertFalse(profiler.is_running)
+        self.assertGreater(profiler.samples, 10)
+        lines = profiler.collapsed().splitlines()
+        capture_lines = [line for line in lines if line.startswith('capture;')]
+        self.assertTrue(any('busy_capture_loop' in line for line in capture_lines))
+        self.assertFalse(any(line.startswith('profiler;') for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+
+    def test_stack_limit_and_duration(self):
+        profiler = SamplingProfiler(interval=0.001, max_duration=0.05, max_stacks=1)
+        profiler.start(duration=10)
+        time.sleep(0.3)
+        self.assertFalse(profiler.is_running)
+        self.assertLessEqual(len(profiler.stacks), 1 + threading.active_count())
+
+    def test_thread_tags(self):
+        self.assertEqual(thread_tag('MainThread'), 'main')
+        self.assertEqual(thread_tag('Thread-5 (process_request_thread)'), 'flask')
+        self.assertEqual(thread_tag('cleanup'), 'cleanup')
+
+    def test_dashboard_endpoints_require_token(self):
+        client = FirewallDashboard(port=0, api_token='secret').app.test_client()
+        auth = {'Authorization': 'Bearer secret'}
+
+        self.assertEqual(client.post('/api/profiler/start').status_code, 401)
+        self.assertEqual(client.get('/api/profiler/profile',
+                                    headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+
+        response = client.post('/api/profiler/start', json={'duration': 1, 'interval': 0.001}, headers=auth)
+        self.assertEqual(response.status_code, 200)
+        time.sleep(0.05)
+        self.assertFalse(client.post('/api/profiler/stop', headers=auth).get_json()['running'])
+        self.assertEqual(client.get('/api/profiler/profile', headers=auth).status_code, 200)
+
+    def test_dashboard_without_token_refuses(self):
+        os.environ.pop('FIREWALL_API_TOKEN', None)
+        client = FirewallDashboard(port=0).app.test_client()
+        self.assertEqual(client.get('/api/profiler/status').status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import multiprocessing
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.dashboard import FirewallDashboard
+from src.monitoring.shared_stats import SharedStats
+
+def count_and_exit(slot, packets):
+    slot.add('packets_parsed', packets)
+    slot.set('pending_packets', 7)
+
+class TestSharedStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = SharedStats(slots=4)
+
+    def tearDown(self):
+        self.stats.close()
+
+    def test_totals_sum_every_slot(self):
+        first, second = self.stats.claim('a'), self.stats.claim('b')
+        first.add('packets_parsed', 10)
+        second.add('packets_parsed', 5)
+        second.set('pending_packets', 3)
+
+        totals = self.stats.totals()
+        self.assertEqual(totals['counters']['packets_parsed'], 15)
+        self.assertEqual(totals['gauges']['pending_packets'], 3)
+        self.assertEqual([worker['label'] for worker in self.stats.workers()], ['a', 'b'])
+
+    def test_runs_out_of_slots(self):
+        for label in 'abc':
+            self.stats.claim(label)
+        with self.assertRaises(RuntimeError):
+            self.stats.claim('d')
+
+    def test_dead_worker_slot_is_reclaimed(self):
+        slot = self.stats.claim('worker')
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=count_and_exit, args=(slot, 42))
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+
+        # The worker's row carries its own pid, and its writes are visible here
+        self.assertEqual(self.stats.workers()[0]['pid'], process.pid)
+        self.assertEqual(self.stats.totals()['counters']['packets_parsed'], 42)
+
+        self.assertEqual(self.stats.reap(), [slot.index])
+        self.assertEqual(self.stats.workers(), [])
+        totals = self.stats.totals()
+        self.assertEqual(totals['counters']['packets_parsed'], 42)
+        self.assertEqual(totals['gauges']['pending_packets'], 0)
+        # The freed row can be handed out again
+        self.assertEqual(self.stats.claim('replacement').index, slot.index)
+
+class StatsSource:
+    def __init__(self, stats):
+        self.shared_stats = stats
+
+    def stats(self):
+        return {**self.shared_stats.totals(), 'workers': self.shared_stats.workers()}
+
+class TestDashboardStatus(unittest.TestCase):
+
+    def test_status_reports_pipeline_totals(self):
+        stats = SharedStats(slots=3)
+        self.addCleanup(stats.close)
+        stats.claim('features-0').add('packets_processed', 300)
+        stats.claim('features-1').add('packets_processed', 200)
+        dashboard = FirewallDashboard(pipeline=StatsSource(stats))
+        dashboard.update_stats(packets_processed=1, activity='started')
+        client = dashboard.app.test_client()
+
+        status = client.get('/api/status').get_json()
+        self.assertEqual(status['packets_processed'], 500)
+        self.assertEqual(len(status['pipeline']['workers']), 2)
+        self.assertEqual(client.post('/api/test-alert').status_code, 200)
+        self.assertEqual(client.get('/api/status').get_json()['threats_detected'], 1)
+        self.assertEqual(client.get('/api/health').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
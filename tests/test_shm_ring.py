@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.shm_ring import PacketRing
+
+def frame(index, length=100):
+    return bytes([index % 256]) * length
+
+class TestPacketRing(unittest.TestCase):
+
+    def setUp(self):
+        self.rings = []
+
+    def tearDown(self):
+        for ring in self.rings:
+            ring.close()
+
+    def make_ring(self, **kwargs):
+        ring = PacketRing(**kwargs)
+        self.rings.append(ring)
+        return ring
+
+    def test_round_trip_with_timestamps(self):
+        ring = self.make_ring(capacity=16, data_size=4096)
+        frames = [frame(i, 60 + i) for i in range(10)]
+        self.assertEqual(ring.write_batch(frames, [float(i) for i in range(10)]), 10)
+
+        read = ring.read_frames(0)
+        self.assertEqual([data for data, _ in read], frames)
+        self.assertEqual([timestamp for _, timestamp in read], [float(i) for i in range(10)])
+        self.assertEqual(len(ring), 0)
+
+    def test_consumers_take_alternate_chunks(self):
+        ring = self.make_ring(capacity=64, data_size=8192, consumers=2, chunk=4)
+        ring.write_batch([frame(i) for i in range(16)])
+
+        first = [data[0] for data, _ in ring.read_frames(0)]
+        second = [data[0] for data, _ in ring.read_frames(1)]
+        self.assertEqual(first, [0, 1, 2, 3, 8, 9, 10, 11])
+        self.assertEqual(second, [4, 5, 6, 7, 12, 13, 14, 15])
+
+    def test_full_ring_waits_for_the_slowest_consumer(self):
+        ring = self.make_ring(capacity=8, data_size=8192, consumers=2, chunk=2)
+        self.assertEqual(ring.write_batch([frame(i) for i in range(12)], wait=False), 8)
+
+        # Consumer 0 alone can't free slots consumer 1 still holds
+        ring.read_frames(0)
+        self.assertEqual(ring.write_batch([frame(8)], wait=False), 0)
+        ring.read_frames(1)
+        self.assertEqual(ring.write_batch([frame(i) for i in range(8, 12)], wait=False), 4)
+
+    def test_data_region_bounds_and_no_wrapping(self):
+        ring = self.make_ring(capacity=64, data_size=1000)
+        self.assertEqual(ring.write_batch([frame(i, 300) for i in range(4)], wait=False), 3)
+        self.assertEqual(len(ring.read_frames(0, max_records=1)), 1)
+
+        # The next frame doesn't fit before the end of the region, so it starts at 0
+        self.assertEqual(ring.write_batch([frame(3, 300)], wait=False), 1)
+        offsets, lengths, _ = ring.read(0)
+        self.assertEqual(offsets.tolist(), [300, 600, 0])
+        self.assertEqual(bytes(ring.data[0:300]), frame(3, 300))
+        ring.release(0)
+
+        with self.assertRaises(ValueError):
+            ring.write_batch([b'x' * 1001])
+
+    def test_zero_copy_read_until_release(self):
+        ring = self.make_ring(capacity=4, data_size=4096)
+        ring.write_batch([frame(i) for i in range(4)])
+        offsets, lengths, _ = ring.read(0)
+        self.assertEqual(ring.write_batch([frame(4)], wait=False), 0)
+
+        ring.release(0)
+        self.assertEqual(ring.write_batch([frame(4)], wait=False), 1)
+
+    def test_finished_after_writer_closes(self):
+        ring = self.make_ring(capacity=16, data_size=4096, consumers=2, chunk=2)
+        ring.write_batch([frame(i) for i in range(3)])
+        ring.close_writer()
+
+        self.assertFalse(ring.finished(1))
+        self.assertTrue(ring.wait(1, timeout=0.1))
+        self.assertEqual(len(ring.read_frames(1)), 1)
+        self.assertTrue(ring.finished(1))
+        self.assertFalse(ring.wait(1, timeout=0.1))
+
+    def test_attach_by_name(self):
+        ring = self.make_ring(capacity=16, data_size=4096)
+        ring.write_batch([frame(7)])
+
+        reader = PacketRing.attach(ring.name)
+        try:
+            self.assertEqual(reader.read_frames(0)[0][0], frame(7))
+        finally:
+            reader.close()
+        self.assertEqual(len(ring), 0)  # Released through the shared cursor
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import time
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.monitoring.dashboard import FirewallDashboard
+from src.monitoring.timeseries import TimeSeriesStore, parse_duration
+
+START = 1_700_000_040  # A whole minute
+
+class TestTimeSeriesStore(unittest.TestCase):
+
+    def test_coarser_resolutions_aggregate_samples(self):
+        store = TimeSeriesStore()
+        for second in range(120):
+            store.record({'packet_rate': second}, START + second)
+        now = START + 119
+
+        seconds = store.query('packet_rate', '1s', duration=30, now=now)
+        self.assertEqual(seconds['t'], list(range(START + 90, START + 120)))
+        self.assertEqual(seconds['last'], list(range(90, 120)))
+
+        minutes = store.query('packet_rate', '1m', now=now)
+        self.assertEqual(minutes['t'], [START, START + 60])
+        self.assertEqual(minutes['sum'], [sum(range(60)), sum(range(60, 120))])
+        self.assertEqual(minutes['min'], [0, 60])
+        self.assertEqual(minutes['max'], [59, 119])
+        self.assertEqual(minutes['last'], [59, 119])
+        self.assertEqual(minutes['count'], [60, 60])
+
+    def test_memory_is_fixed_and_old_buckets_drop_out(self):
+        store = TimeSeriesStore({'1s': (1, 10)})
+        for second in range(25):
+            store.record({'queue_depth_features': second}, START + second)
+
+        history = store.query('queue_depth_features', now=START + 24, fields=('last',))
+        self.assertEqual(history['last'], list(range(15, 25)))
+        self.assertEqual(set(history), {'metric', 'resolution', 'step', 't', 'last'})
+        self.assertEqual(store.series['queue_depth_features']['1s'].buckets.shape, (10,))
+
+    def test_gaps_are_left_out(self):
+        store = TimeSeriesStore()
+        store.record({'ips_blocked': 1}, START)
+        store.record({'ips_blocked': 3}, START + 5)
+
+        self.assertEqual(store.query('ips_blocked', now=START + 10)['t'], [START, START + 5])
+
+    def test_rejects_unknown_queries(self):
+        store = TimeSeriesStore()
+        store.record({'ips_blocked': 1}, START)
+        with self.assertRaises(KeyError):
+            store.query('missing')
+        with self.assertRaises(ValueError):
+            store.query('ips_blocked', '5s')
+        with self.assertRaises(ValueError):
+            store.query('ips_blocked', fields=('median',))
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('90'), 90)
+        self.assertEqual(parse_duration('15m'), 900)
+        self.assertEqual(parse_duration('2h'), 7200)
+        with self.assertRaises(ValueError):
+            parse_duration('soon')
+
+class TestHistoryEndpoint(unittest.TestCase):
+
+    def test_packet_rate_history(self):
+        dashboard = FirewallDashboard()
+        base = int(time.time()) - 5
+        clock = iter([base, base + 1, base + 2])
+        dashboard.history_sampler.clock = lambda: next(clock)
+        for packets in (0, 500, 1500):
+            dashboard.update_stats(packets_processed=packets, ips_blocked=2)
+            dashboard.history_sampler.sample()
+        client = dashboard.app.test_client()
+
+        history = client.get('/api/history?metric=packet_rate&res=1s&range=1m&fields=last').get_json()
+        self.assertEqual(history['t'], [base + 1, base + 2])
+        self.assertEqual(history['last'], [500.0, 1000.0])
+        self.assertLessEqual({'ips_blocked', 'packet_rate', 'threat_rate'},
+                             set(client.get('/api/history').get_json()['metrics']))
+
+        self.assertEqual(client.get('/api/history?metric=nope').status_code, 404)
+        self.assertEqual(client.get('/api/history?metric=packet_rate&res=1d').status_code, 400)
+        self.assertEqual(client.get('/api/history?metric=packet_rate&range=later').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
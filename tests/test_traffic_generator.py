@@ -0,0 +1,81 @@
+import unittest
+import os
+import struct
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.network.traffic_generator import TrafficGenerator, FrameBatch, SCENARIO_LABELS, write_pcap, read_pcap
+
+def internet_checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return total
+
+class TestTrafficGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = TrafficGenerator(seed=7)
+
+    def test_frames_have_valid_checksums(self):
+        batch = self.generator.generate_mix(2000)
+        for i in range(len(batch)):
+            frame = batch.frame(i)
+            ip_header, l4 = frame[14:34], frame[34:]
+            pseudo = ip_header[12:20] + bytes([0, ip_header[9]]) + struct.pack('!H', len(l4))
+
+            self.assertEqual(struct.unpack('!H', ip_header[2:4])[0], len(frame) - 14)
+            self.assertEqual(internet_checksum(ip_header), 0xffff)
+            self.assertEqual(internet_checksum(pseudo + l4), 0xffff)
+
+    def test_scenarios_are_labeled(self):
+        for scenario, label in SCENARIO_LABELS.items():
+            batch = self.generator.generate(scenario, 100)
+            self.assertEqual(len(batch), 100)
+            self.assertTrue(np.all(batch.labels == label))
+
+        syn_flood = self.generator.generate('syn_flood', 50)
+        flags = [syn_flood.frame(i)[47] for i in range(50)]  # TCP flags byte
+        self.assertEqual(set(flags), {0x02})
+
+    def test_buffer_is_contiguous(self):
+        batch = self.generator.generate_mix(500)
+        self.assertTrue(batch.buffer.flags['C_CONTIGUOUS'])
+        self.assertEqual(len(batch.buffer), int(batch.lengths.sum()))
+        self.assertTrue(np.all(np.diff(batch.timestamps) >= 0))
+
+        batches = list(self.generator.iter_batches(250, batch_size=100))
+        self.assertEqual([len(b) for b in batches], [100, 100, 50])
+        self.assertEqual(len(FrameBatch.concat(batches)), 250)
+
+    def test_pcap_round_trip(self):
+        batch = self.generator.generate_mix(300)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'traffic.pcap')
+            write_pcap(batch, path, chunk_size=128)
+            loaded = read_pcap(path)
+
+        self.assertTrue(np.array_equal(loaded.buffer, batch.buffer))
+        self.assertTrue(np.array_equal(loaded.lengths, batch.lengths))
+        self.assertTrue(np.allclose(loaded.timestamps, batch.timestamps, atol=1e-5))
+
+    def test_pcap_truncated_record_is_dropped(self):
+        batch = self.generator.generate_mix(50)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'traffic.pcap')
+            write_pcap(batch, path)
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 5)
+            loaded = read_pcap(path)
+
+        self.assertEqual(len(loaded), 49)
+        self.assertTrue(np.array_equal(loaded.lengths, batch.lengths[:49]))
+        self.assertEqual(len(loaded.buffer), int(batch.lengths[:49].sum()))
+
+if __name__ == '__main__':
+    unittest.main()